@@ -0,0 +1,224 @@
+import datetime
+import hashlib
+import io
+import json
+import os
+import re
+
+
+# Headless access to the rankings of every page, for the services that need the numbers without
+# the figures. Results are computed by the same rankings cache the dashboard uses.
+API_PATH = '/api'
+# Rows of every chunk of a streamed response
+API_BATCH_ROWS = int(os.environ.get('FLOW_API_BATCH_ROWS', 10_000))
+# Longest range served, in days, since the streams of a range are counted minute by minute
+API_MAX_RANGE_DAYS = int(os.environ.get('FLOW_API_MAX_RANGE_DAYS', 366))
+
+# Rankings of every page, as returned by rankings.get_ranking
+API_RANKINGS = {
+    'daily': ['movies', 'series', 'shows', 'episodes', 'seasons', 'device_used', 'category_per_showtype',
+              'dropped_movies', 'dropped_series', 'concurrency', 'peak_concurrency'],
+    'monthly': ['movies', 'series', 'shows', 'seasons', 'country'],
+    'range': ['movies', 'series', 'shows', 'seasons', 'device_used', 'category_per_showtype', 'country',
+              'concurrency', 'peak_concurrency']}
+
+# Format of the period of every page
+PERIOD_PATTERNS = {
+    'daily': re.compile(r'\d{4}-\d{2}-\d{2}'),
+    'monthly': re.compile(r'\d{4}-\d{2}'),
+    'range': re.compile(r'\d{4}-\d{2}-\d{2}/\d{4}-\d{2}-\d{2}')}
+
+# Format of the dates of the period of every page, checked once the period matches its pattern
+PERIOD_FORMATS = {'daily': '%Y-%m-%d', 'monthly': '%Y-%m', 'range': '%Y-%m-%d'}
+
+MIMETYPES = {'json': 'application/json', 'arrow': 'application/vnd.apache.arrow.stream'}
+
+
+class APIError(Exception):
+  '''
+  Error of a request to the API, answered with its status code and message.
+
+  Arguments:
+  message(str): description of the error.
+  status(int): HTTP status code of the response.
+  '''
+
+  def __init__(self, message, status=400):
+    super().__init__(message)
+    self.message = message
+    self.status = status
+
+
+def get_etag(page, name, period, amount, output_format, version):
+  '''
+  Returns the entity tag of a result of the API, which only changes with the version of the data
+  of its period.
+
+  Arguments:
+  page(str): 'daily', 'monthly' or 'range'.
+  name(str): name of the ranking.
+  period(str): period of the ranking.
+  amount(int): amount of entries of the ranking.
+  output_format(str): 'json' or 'arrow'.
+  version(str): version of the data of the period, returned by the DataStore.
+  '''
+  return hashlib.sha1(repr((page, name, period, amount, output_format, version)).encode()).hexdigest()[:16]
+
+
+def parse_query(page, name, args):
+  '''
+  Returns the period, amount and format of a request to the API, raising an APIError when any of
+  them is invalid.
+
+  Arguments:
+  page(str): 'daily', 'monthly' or 'range'.
+  name(str): name of the ranking.
+  args(dict): query string of the request.
+  '''
+  from helpers import RANGE_SEPARATOR
+  from rankings import MAX_AMOUNT
+
+  if page not in API_RANKINGS:
+    raise APIError(f'Unknown page {page}, available pages are {list(API_RANKINGS)}', 404)
+  if name not in API_RANKINGS[page]:
+    raise APIError(f'Unknown ranking {name}, available rankings of {page} are {API_RANKINGS[page]}', 404)
+
+  period = args.get('period', '')
+  if not PERIOD_PATTERNS[page].fullmatch(period):
+    raise APIError(f'Invalid period {period!r} for {page}, expected a value like {PERIOD_PATTERNS[page].pattern}')
+
+  # The pattern lets impossible dates through, like 2021-02-30
+  try:
+    dates = [datetime.datetime.strptime(date, PERIOD_FORMATS[page]) for date in period.split(RANGE_SEPARATOR)]
+  except ValueError:
+    raise APIError(f'Invalid period {period!r} for {page}, {period} is not a valid date')
+  if dates != sorted(dates):
+    raise APIError(f'Invalid period {period!r} for {page}, the first day of a range can\'t be after the last one')
+  if (dates[-1] - dates[0]).days + 1 > API_MAX_RANGE_DAYS:
+    raise APIError(f'Invalid period {period!r} for {page}, ranges can span {API_MAX_RANGE_DAYS} days at most')
+
+  try:
+    amount = int(args.get('amount', MAX_AMOUNT))
+  except ValueError:
+    amount = 0
+  if not 1 <= amount <= MAX_AMOUNT:
+    raise APIError(f'Invalid amount {args.get("amount")!r}, expected an integer from 1 to {MAX_AMOUNT}')
+
+  output_format = args.get('format', 'json')
+  if output_format not in MIMETYPES:
+    raise APIError(f'Invalid format {output_format!r}, expected one of {list(MIMETYPES)}')
+
+  return period, amount, output_format
+
+
+def check_period(page, period, first_date, last_date):
+  '''
+  Raises an APIError when the entered range doesn't share any day with the data.
+
+  Arguments:
+  page(str): 'daily', 'monthly' or 'range'.
+  period(str): period of the ranking, already checked by parse_query.
+  first_date(datetime.date): first day with views, returned by the DataStore.
+  last_date(datetime.date): last day with views, returned by the DataStore.
+  '''
+  from helpers import parse_range
+
+  if page != 'range':
+    return
+
+  start, end = [datetime.date.fromisoformat(day) for day in parse_range(period)]
+  if end < first_date or start > last_date:
+    raise APIError(f'Invalid period {period!r} for {page}, there are views from {first_date} to {last_date}')
+
+
+def iter_json(dataframe, batch_rows=API_BATCH_ROWS):
+  '''
+  Yields a DataFrame as compact JSON, with its column names once and its rows as lists, a batch of
+  rows at a time.
+
+  Arguments:
+  dataframe(Pandas DataFrame): result to serialize.
+  batch_rows(int): rows serialized at once.
+  '''
+  yield '{"columns":' + json.dumps(dataframe.columns.to_list(), separators=(',', ':')) + ',"data":['
+
+  for start in range(0, len(dataframe), batch_rows):
+    # Pandas serializes timestamps, categoricals and missing values, and we only keep its rows
+    rows = dataframe.iloc[start:start + batch_rows].to_json(orient='values', date_format='iso')
+    yield (',' if start else '') + rows[1:-1]
+
+  yield ']}'
+
+
+def iter_arrow(dataframe, batch_rows=API_BATCH_ROWS):
+  '''
+  Yields a DataFrame in the Arrow IPC streaming format, a record batch at a time.
+
+  Arguments:
+  dataframe(Pandas DataFrame): result to serialize.
+  batch_rows(int): rows of every record batch.
+  '''
+  import pyarrow as pa
+
+  table = pa.Table.from_pandas(dataframe, preserve_index=False)
+  sink = io.BytesIO()
+
+  # The schema and every batch are written to the sink, which is emptied after every batch
+  with pa.ipc.new_stream(sink, table.schema) as writer:
+    for batch in table.to_batches(max_chunksize=batch_rows):
+      writer.write_batch(batch)
+      yield pop_bytes(sink)
+  # The end of stream marker
+  yield pop_bytes(sink)
+
+
+def pop_bytes(sink):
+  '''
+  Returns the bytes written to a BytesIO and empties it.
+
+  Arguments:
+  sink(BytesIO): buffer to empty.
+  '''
+  data = sink.getvalue()
+  sink.seek(0)
+  sink.truncate()
+  return data
+
+
+def register_api(server):
+  '''
+  Serves every ranking of every page at API_PATH/<page>/<name>, for the entered period and amount,
+  as compact JSON or Arrow IPC. Responses are streamed in batches, and carry an ETag built from the
+  version of the data of the period, so conditional requests for unchanged data aren't computed again.
+
+  Arguments:
+  server(Flask): server of the Dash app.
+  '''
+  import flask
+
+  @server.route(API_PATH)
+  def list_rankings():
+    return flask.jsonify(API_RANKINGS)
+
+  @server.route(f'{API_PATH}/<page>/<name>')
+  def get_ranking(page, name):
+    # Imported here, so registering the routes doesn't load the data modules
+    from datastore import get_store
+    from rankings import get_ranking
+
+    try:
+      period, amount, output_format = parse_query(page, name, flask.request.args)
+      check_period(page, period, get_store().first_date, get_store().last_date)
+    except APIError as error:
+      return flask.jsonify({'error': error.message}), error.status
+
+    etag = get_etag(page, name, period, amount, output_format, get_store().get_version(period))
+    if flask.request.if_none_match.contains(etag):
+      response = flask.Response(status=304)
+    else:
+      dataframe = get_ranking(page, period, amount, name)
+      chunks = iter_arrow(dataframe) if output_format == 'arrow' else iter_json(dataframe)
+      response = flask.Response(chunks, mimetype=MIMETYPES[output_format])
+
+    response.set_etag(etag)
+    return response
@@ -1,7 +1,17 @@
 import dash
 
+from api import register_api
+from metrics import METRICS_ENABLED, register_metrics
+
 app = dash.Dash(__name__,
                 suppress_callback_exceptions=True,
                 title='Datathon 2021 | Data Viz Challenge'
                 )
-server = app.server
\ No newline at end of file
+server = app.server
+
+# With FLOW_METRICS=1 the latency of every step of the requests is served at /metrics
+if METRICS_ENABLED:
+    register_metrics(server)
+
+# The rankings of every page are served as JSON or Arrow under /api, for the services that only need the numbers
+register_api(server)
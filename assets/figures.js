@@ -0,0 +1,62 @@
+// Figures are sent by the server without the flow template, which every client receives once with
+// the layout, and it's added back here before plotting them.
+// Every period is sent once with its Top 10, and the selected amount is sliced here, following how
+// the server would slice each ranking (see rankings.get_slicing).
+function filterTrace(trace, keep) {
+    var sliced = Object.assign({}, trace);
+    ['x', 'y', 'customdata'].forEach(function(key) {
+        if (Array.isArray(trace[key])) {
+            sliced[key] = trace[key].filter(function(value, index) {
+                return keep(trace.x[index], index);
+            });
+        }
+    });
+    return sliced;
+}
+
+function sliceFigure(figure, slicing, amount, colorway) {
+    if (!slicing || !figure.data) {
+        return figure.data;
+    }
+
+    if (slicing === 'head') {
+        return figure.data.map(function(trace) {
+            return filterTrace(trace, function(x, index) { return index < amount; });
+        });
+    }
+
+    // The x values come ranked, and every trace keeps the points of the first amount of them.
+    // Traces are then laid out and colored in the order plotly express gives them for that amount
+    var kept = new Set(slicing.x.slice(0, amount));
+    var traces = {};
+    figure.data.forEach(function(trace) {
+        traces[trace.name] = filterTrace(trace, function(x) { return kept.has(x); });
+    });
+    return (slicing.traces[amount] || []).map(function(name, index) {
+        var trace = traces[name];
+        if (!colorway || !colorway.length) {
+            return trace;
+        }
+        return Object.assign({}, trace, {
+            marker: Object.assign({}, trace.marker, {color: colorway[index % colorway.length]})
+        });
+    });
+}
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    flow: {
+        slice_figures: function(data, amount, template) {
+            if (!data || !data.figures) {
+                throw window.dash_clientside.PreventUpdate;
+            }
+            var colorway = template && template.layout ? template.layout.colorway : null;
+
+            return data.figures.map(function(figure, index) {
+                return Object.assign({}, figure, {
+                    data: sliceFigure(figure, data.slicing[index], amount, colorway),
+                    layout: Object.assign({}, figure.layout, {template: template})
+                });
+            });
+        }
+    }
+});
@@ -1,3 +1,4 @@
+import functools
 from os import lseek
 import plotly.io as pio
 
@@ -16,4 +17,16 @@ def get_flow_template():
     flow_template.layout.yaxis.gridcolor = '#202020'
     flow_template.layout.xaxis.categoryorder = 'total descending'
 
-    return flow_template
\ No newline at end of file
+    return flow_template
+
+
+def register_flow_template():
+    # Registering the template takes a while, so it's done once, the first time a figure is built
+    if 'flow_theme' not in pio.templates:
+        pio.templates['flow_theme'] = get_flow_template()
+
+
+@functools.lru_cache(maxsize=None)
+def get_flow_template_data():
+    # Clients receive the template once with the layout, and add it to the figures in the browser
+    return get_flow_template().to_plotly_json()
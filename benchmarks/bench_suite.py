@@ -0,0 +1,253 @@
+import argparse
+import gc
+import hashlib
+import json
+import os
+import pathlib
+import platform
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+import plotly
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import datastore
+import rankings
+from benchmarks.synthetic import get_synthetic_metadata, get_synthetic_train
+from cache import figure_cache
+from datastore import DataStore, get_peak_rss
+from filters import (count_views, get_category_per_showtype, get_country_from_watched_content, get_device_used,
+                     get_metadata_lookup, get_mostwatched_episodes, get_movie_views, get_potential_drops,
+                     get_potential_most_dropped_content, get_most_dropped_content_per_showtype, get_ranking, get_season_views, get_series_views,
+                     get_shows_watch)
+
+
+# Rows of the synthetic view log of every scale, the last one is about the size of the real one
+SCALES = [1_000_000, 10_000_000, 50_000_000]
+BASELINE_PATH = pathlib.Path(__file__).parent.joinpath('baseline.json')
+# Growth in time or memory over the baseline reported as a regression
+TOLERANCE = 0.25
+# Differences below this many seconds, or bytes, are noise and never reported
+MIN_DIFFERENCE = 0.01
+MIN_BYTES_DIFFERENCE = 2**20
+AMOUNT = rankings.MAX_AMOUNT
+
+
+####################
+# Measurements
+####################
+
+def get_digest(result):
+  '''
+  Returns a short string identifying the contents of the result of a benchmarked function, so
+  changes in the results show up next to changes in their time.
+
+  Arguments:
+  result: a Pandas DataFrame or Series, a dictionary of them, or anything plotly can serialize as JSON.
+  '''
+  if isinstance(result, dict) and any(isinstance(value, (pd.DataFrame, pd.Series)) for value in result.values()):
+    payload = repr({name: get_digest(value) for name, value in result.items()}).encode()
+  elif isinstance(result, (pd.DataFrame, pd.Series)):
+    columns = result.columns.to_list() if isinstance(result, pd.DataFrame) else [result.name]
+    payload = repr(columns).encode() + pd.util.hash_pandas_object(result).to_numpy().tobytes()
+  else:
+    payload = json.dumps(result, cls=plotly.utils.PlotlyJSONEncoder, sort_keys=True).encode()
+
+  return hashlib.sha1(payload).hexdigest()[:12]
+
+
+def measure(function, repeat=3):
+  '''
+  Runs a function once tracing the memory it allocates, and then repeat times more, and returns a
+  dictionary with its best time in seconds, its peak of memory allocated in bytes and the digest
+  of its result.
+
+  Arguments:
+  function(function): function to measure, called without arguments.
+  repeat(int): amount of timed runs. With 0 the traced run is timed instead, for functions that
+  only do their work the first time, like the properties of the DataStore.
+  '''
+  start = time.perf_counter()
+  tracemalloc.start()
+  result = function()
+  peak_bytes = tracemalloc.get_traced_memory()[1]
+  tracemalloc.stop()
+
+  seconds = [time.perf_counter() - start] if repeat == 0 else []
+  for _ in range(repeat):
+    start = time.perf_counter()
+    function()
+    seconds.append(time.perf_counter() - start)
+
+  return {'seconds': round(min(seconds), 4), 'peak_bytes': peak_bytes, 'digest': get_digest(result)}
+
+
+####################
+# Cases
+####################
+
+def get_filter_cases(store):
+  '''
+  Returns a dictionary with a function running every get_* function of the filters over the
+  whole view log, by name.
+
+  Arguments:
+  store(DataStore): store holding the synthetic datasets.
+  '''
+  df_views = store.views
+  df_movies = df_views[df_views['show_type'] == 'Película']
+  content_counts = count_views(df_views, 'content_id')
+
+  return {
+      'get_metadata_lookup': lambda: get_metadata_lookup(store.metadata, 'content_id'),
+      'get_ranking': lambda: get_ranking(content_counts, 'content_id'),
+      'get_potential_drops': lambda: get_potential_drops(df_views),
+      'get_movie_views': lambda: get_movie_views(df_views, AMOUNT),
+      'get_series_views': lambda: get_series_views(df_views, store.content_lookup, AMOUNT),
+      'get_shows_watch': lambda: get_shows_watch(df_views, store.content_lookup, AMOUNT),
+      'get_mostwatched_episodes': lambda: get_mostwatched_episodes(df_views, store.asset_lookup, AMOUNT),
+      'get_season_views': lambda: get_season_views(df_views, store.title_index, AMOUNT),
+      'get_device_used': lambda: get_device_used(df_views, store.devices),
+      'get_category_per_showtype': lambda: get_category_per_showtype(df_views, AMOUNT),
+      'get_country_from_watched_content': lambda: get_country_from_watched_content(df_views),
+      'get_potential_most_dropped_content': lambda: get_potential_most_dropped_content(df_movies, store.content_lookup, AMOUNT),
+      'get_most_dropped_content_per_showtype': lambda: get_most_dropped_content_per_showtype(df_views, store.content_lookup, AMOUNT, ['Película', 'Serie'])}
+
+
+def get_callback_cases(store):
+  '''
+  Returns a dictionary with a function running the update_graph callback of every page for the
+  last period, by name. Uncached runs clear the figure and ranking caches first, cached runs hit
+  the entries left by them.
+
+  Arguments:
+  store(DataStore): store holding the synthetic datasets, set as the shared one.
+  '''
+  from pages import daily_stats, monthly_stats
+
+  def uncached(callback, period):
+    def run():
+      figure_cache.clear()
+      rankings._get_rankings.cache_clear()
+      return callback(period)
+    return run
+
+  day, month = str(store.last_date), store.months[-1]
+
+  return {
+      'daily update_graph': uncached(daily_stats.update_graph.__wrapped__, day),
+      'daily update_graph cached': lambda: daily_stats.update_graph.__wrapped__(day),
+      'monthly update_graph': uncached(monthly_stats.update_graph.__wrapped__, month),
+      'monthly update_graph cached': lambda: monthly_stats.update_graph.__wrapped__(month)}
+
+
+def bench_scale(rows, repeat=3):
+  '''
+  Returns a dictionary with the measurements of every case for a synthetic view log of the
+  entered amount of rows, by name. Building the views and the aggregates is measured once.
+
+  Arguments:
+  rows(int): rows of the synthetic view log.
+  repeat(int): amount of timed runs of every case.
+  '''
+  df_metadata = get_synthetic_metadata()
+  store = DataStore.from_frames(get_synthetic_train(rows, df_metadata), df_metadata, version=f'synthetic-{rows}')
+  # The callbacks read the shared store
+  datastore._store = store
+
+  results = {'build views': measure(lambda: store.views, repeat=0),
+             'build cube': measure(lambda: store.cube.assets, repeat=0)}
+  for name in results:
+    print_measurement(name, results[name])
+
+  for cases in [get_filter_cases(store), get_callback_cases(store)]:
+    for name, function in cases.items():
+      results[name] = measure(function, repeat)
+      print_measurement(name, results[name])
+
+  results['peak rss'] = {'peak_bytes': get_peak_rss()}
+  datastore._store = None
+  del store
+  gc.collect()
+
+  return results
+
+
+####################
+# Baseline
+####################
+
+def compare_to_baseline(results, baseline, tolerance=TOLERANCE):
+  '''
+  Returns a list of messages with every case that got slower, allocated more memory or changed
+  its result since the baseline. Scales and cases missing from the baseline are skipped.
+
+  Arguments:
+  results(dict): measurements by scale and case, as returned by bench_scale.
+  baseline(dict): measurements stored earlier, laid out the same way.
+  tolerance(float): growth over the baseline allowed before reporting it.
+  '''
+  regressions = []
+
+  for scale, cases in results.items():
+    for name, measurement in cases.items():
+      reference = baseline.get(scale, {}).get(name)
+      if reference is None:
+        continue
+
+      if 'seconds' in reference and (measurement['seconds'] > reference['seconds'] * (1 + tolerance) and
+                                     measurement['seconds'] - reference['seconds'] > MIN_DIFFERENCE):
+        regressions.append(f'{scale} rows, {name}: {reference["seconds"]}s -> {measurement["seconds"]}s')
+      if (measurement['peak_bytes'] > reference['peak_bytes'] * (1 + tolerance) and
+          measurement['peak_bytes'] - reference['peak_bytes'] > MIN_BYTES_DIFFERENCE):
+        regressions.append(f'{scale} rows, {name}: {reference["peak_bytes"] / 2**20:.1f} MB -> {measurement["peak_bytes"] / 2**20:.1f} MB')
+      if reference.get('digest') != measurement.get('digest'):
+        regressions.append(f'{scale} rows, {name}: result changed')
+
+  return regressions
+
+
+def get_machine():
+  '''
+  Returns a dictionary describing the machine and versions the benchmarks ran on.
+  '''
+  return {'platform': platform.platform(), 'processor': platform.processor(), 'cpus': os.cpu_count(),
+          'python': platform.python_version(), 'pandas': pd.__version__}
+
+
+def print_measurement(name, measurement):
+  print(f'{name:<36}{measurement["seconds"]:>12.4f}{measurement["peak_bytes"] / 2**20:>14.1f}')
+
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='Times every filter and callback over synthetic view logs, and compares them with a baseline.')
+  parser.add_argument('--rows', type=int, nargs='+', default=SCALES, help='rows of every synthetic view log')
+  parser.add_argument('--repeat', type=int, default=3, help='timed runs of every case, the best one is kept')
+  parser.add_argument('--baseline', type=pathlib.Path, default=BASELINE_PATH, help='JSON file with the baseline')
+  parser.add_argument('--tolerance', type=float, default=TOLERANCE, help='growth over the baseline reported as a regression')
+  parser.add_argument('--save-baseline', action='store_true', help='store the results as the baseline of their scales')
+  args = parser.parse_args()
+
+  baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {'scales': {}}
+  results = {}
+
+  for rows in args.rows:
+    print(f'\n{rows} rows\n{"case":<36}{"seconds":>12}{"peak (MB)":>14}')
+    results[str(rows)] = bench_scale(rows, args.repeat)
+    print(f'Peak RSS so far: {results[str(rows)]["peak rss"]["peak_bytes"] / 2**20:.1f} MB')
+
+  regressions = compare_to_baseline(results, baseline['scales'], args.tolerance)
+
+  if args.save_baseline:
+    baseline = {'machine': get_machine(), 'scales': {**baseline['scales'], **results}}
+    args.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True) + '\n')
+    print(f'\nBaseline stored in {args.baseline}')
+  elif regressions:
+    print('\nRegressions against the baseline:')
+    print('\n'.join(regressions))
+    sys.exit(1)
+  else:
+    print('\nNo regressions against the baseline')
@@ -0,0 +1,72 @@
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import get_synthetic_views
+from filters import get_device_used, get_category_per_showtype, get_potential_most_dropped_content
+from helpers import get_clean_serie_name, get_clean_serie_names, map_strings
+
+
+####################
+# Row-wise references
+####################
+
+# These are the row-wise versions the filters used before being vectorized, kept here to check
+# that both give the same results and to measure the speedup.
+ROW_WISE = {
+    'watch_hour': lambda df: df.apply(lambda row: pd.Timestamp(row['tunein']).hour, axis=1),
+    'main_category': lambda df: df.apply(lambda row: row['category'].split('/')[0], axis=1),
+    'seconds_watched': lambda df: df.apply(lambda row: (pd.Timestamp(row['tuneout']).floor('min') - pd.Timestamp(row['tunein']).floor('min')).seconds, axis=1),
+    'clean_title': lambda df: df.apply(lambda row: get_clean_serie_name(row['title']), axis=1),
+}
+
+VECTORIZED = {
+    'watch_hour': lambda df: df['tunein'].dt.hour,
+    'main_category': lambda df: map_strings(df['category'], lambda categories: categories.str.split('/').str[0]),
+    'seconds_watched': lambda df: (df['tuneout'].dt.floor('min') - df['tunein'].dt.floor('min')).dt.seconds,
+    'clean_title': lambda df: get_clean_serie_names(df['title']),
+}
+
+FILTERS = {
+    'get_device_used': lambda df: get_device_used(df, df['device_type'].cat.categories.to_list()),
+    'get_category_per_showtype': lambda df: get_category_per_showtype(df, 10),
+    'get_potential_most_dropped_content': lambda df: get_potential_most_dropped_content(df, df, 10),
+}
+
+
+def timed(function, *args):
+  start = time.perf_counter()
+  result = function(*args)
+  return result, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='Compares the row-wise and vectorized hot paths of the filters.')
+  parser.add_argument('--rows', type=int, default=10_000_000, help='rows of the synthetic view log')
+  parser.add_argument('--reference-rows', type=int, default=200_000,
+                      help='rows the row-wise references run on, their time is extrapolated to --rows')
+  args = parser.parse_args()
+
+  df_views = get_synthetic_views(args.rows)
+  df_sample = df_views.sample(min(args.reference_rows, args.rows), random_state=0)
+
+  print(f'{"operation":<36}{"row-wise (s)":>14}{"vectorized (s)":>16}{"speedup":>10}')
+
+  for name in ROW_WISE:
+    expected, reference_time = timed(ROW_WISE[name], df_sample)
+    # Outputs are checked on the sample, the vectorized time is measured on every row
+    assert VECTORIZED[name](df_sample).astype(object).equals(expected.astype(object)), name
+    _, vectorized_time = timed(VECTORIZED[name], df_views)
+    reference_time = reference_time * args.rows / len(df_sample)
+    print(f'{name:<36}{reference_time:>14.2f}{vectorized_time:>16.2f}{reference_time / vectorized_time:>9.0f}x')
+
+  for name, function in FILTERS.items():
+    _, filter_time = timed(function, df_views)
+    print(f'{name:<36}{"":>14}{filter_time:>16.2f}')
+
+  print(f'Row-wise times are extrapolated from {len(df_sample)} of {args.rows} rows.')
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+
+SHOW_TYPES = ['Serie', 'Película', 'TV', 'Web', 'Rolling', 'Musica']
+SERIE_SHOW_TYPES = ['Serie', 'Web', 'Rolling']
+DEVICE_TYPES = ['STB', 'CLOUD', 'PHONE', 'STATIONARY', 'TABLET']
+CATEGORIES = ['Drama', 'Drama/Romance', 'Drama/Crimen', 'Infantil', 'Acción', 'Acción/Aventura',
+              'Comedia', 'Comedia/Drama', 'Suspenso', 'Terror', 'Documental', 'Deportes']
+COUNTRIES = ['AR', 'US', 'BR', 'ES', 'GB', 'FR', 'MX', 'CO', 'CL', 'IT', 'DE', 'JP', 'KR', 'XK']
+
+
+def get_synthetic_metadata(assets=20000, seed=0):
+  '''
+  Returns a Pandas DataFrame shaped like metadata.csv, with one row per asset. Series episodes
+  have the season and episode in their title, like the real Flow titles.
+
+  Arguments:
+  assets(int): amount of assets to generate.
+  seed(int): seed for the random generator.
+  '''
+  rng = np.random.default_rng(seed)
+
+  show_type = np.array(SHOW_TYPES)[rng.integers(0, len(SHOW_TYPES), assets)]
+  content_id = rng.integers(0, assets // 4, assets)
+  is_serie = np.isin(show_type, SERIE_SHOW_TYPES)
+  season = rng.integers(1, 6, assets)
+  episode = rng.integers(1, 25, assets)
+
+  title = np.where(is_serie,
+                   [f'T:{s} Ep:{e:02d} Serie {c}' for s, e, c in zip(season, episode, content_id)],
+                   [f'Contenido {c}' for c in content_id])
+
+  return pd.DataFrame({'asset_id': np.arange(assets),
+                       'content_id': content_id,
+                       'title': title,
+                       'episode_title': [f'Episodio {e}' for e in episode],
+                       'show_type': pd.Categorical(show_type, categories=SHOW_TYPES),
+                       'category': pd.Categorical.from_codes(rng.integers(0, len(CATEGORIES), assets), CATEGORIES),
+                       'country_of_origin': pd.Categorical.from_codes(rng.integers(0, len(COUNTRIES), assets), COUNTRIES)})
+
+
+def get_synthetic_train(rows, df_metadata=None, days=90, start='2021-01-01', seed=0):
+  '''
+  Returns a Pandas DataFrame shaped like the view log read from train.csv, with the columns the
+  dashboard reads, sorted by tune in. Asset popularity follows a Zipf law, so the Top-N rankings
+  look like the real ones.
+
+  Arguments:
+  rows(int): amount of views to generate.
+  df_metadata(Pandas DataFrame): metadata to draw assets from, generated if not entered.
+  days(int): amount of days covered by the views.
+  start(str): first day covered by the views.
+  seed(int): seed for the random generator.
+  '''
+  rng = np.random.default_rng(seed)
+  df_metadata = get_synthetic_metadata(seed=seed) if df_metadata is None else df_metadata
+
+  asset_position = (rng.zipf(1.3, rows) - 1) % len(df_metadata)
+  seconds_in = np.sort(rng.integers(0, days * 86400, rows))
+  seconds_watched = rng.exponential(1800, rows).astype('int64')
+  tunein = np.datetime64(start, 's') + seconds_in.astype('timedelta64[s]')
+
+  return pd.DataFrame({'asset_id': df_metadata['asset_id'].to_numpy()[asset_position],
+                       'device_type': pd.Categorical.from_codes(rng.integers(0, len(DEVICE_TYPES), rows), DEVICE_TYPES),
+                       'tunein': tunein.astype('datetime64[ns]'),
+                       'tuneout': (tunein + seconds_watched.astype('timedelta64[s]')).astype('datetime64[ns]')})
+
+
+def get_synthetic_views(rows, df_metadata=None, days=90, start='2021-01-01', seed=0):
+  '''
+  Returns a Pandas DataFrame shaped like the views table of the DataStore: the synthetic view log
+  joined with the metadata of every asset, sorted by tune in.
+
+  Arguments:
+  rows(int): amount of views to generate.
+  df_metadata(Pandas DataFrame): metadata to draw assets from, generated if not entered.
+  days(int): amount of days covered by the views.
+  start(str): first day covered by the views.
+  seed(int): seed for the random generator.
+  '''
+  df_metadata = get_synthetic_metadata(seed=seed) if df_metadata is None else df_metadata
+  df_views = get_synthetic_train(rows, df_metadata, days, start, seed)
+  asset_position = pd.Index(df_metadata['asset_id']).get_indexer(df_views['asset_id'])
+
+  df_views['content_id'] = df_metadata['content_id'].to_numpy()[asset_position]
+  for column in ['title', 'show_type', 'category', 'country_of_origin']:
+    values = df_metadata[column].astype('category')
+    df_views[column] = pd.Categorical.from_codes(values.cat.codes.to_numpy()[asset_position], values.cat.categories)
+
+  return df_views
@@ -0,0 +1,185 @@
+import collections
+import functools
+import hashlib
+import json
+import os
+import pathlib
+import threading
+import time
+
+import plotly
+
+from metrics import timed_step
+
+
+# Cache limits, overridable through environment variables. Setting FLOW_CACHE_DIR makes every
+# worker read and write the same directory instead of keeping its own entries in memory.
+CACHE_SIZE = int(os.environ.get('FLOW_CACHE_SIZE', 512))
+CACHE_TTL = float(os.environ.get('FLOW_CACHE_TTL', 24 * 3600))
+CACHE_DIR = os.environ.get('FLOW_CACHE_DIR')
+
+
+class FigureCache:
+  '''
+  Bounded cache for the serialized figures of the callbacks. Entries expire after a time to live,
+  and once the cache is full the least recently used entry is evicted. Entries are kept in memory,
+  or in a directory shared by every worker when one is entered.
+
+  Arguments:
+  max_entries(int): maximum amount of entries kept.
+  ttl(float): seconds an entry is valid for after being stored.
+  directory(str): directory for the shared file-system cache, or None to keep entries in memory.
+  '''
+
+  def __init__(self, max_entries=CACHE_SIZE, ttl=CACHE_TTL, directory=None):
+    self.max_entries = max_entries
+    self.ttl = ttl
+    self.directory = pathlib.Path(directory) if directory else None
+    self.hits = 0
+    self.misses = 0
+    self._entries = collections.OrderedDict()
+    self._lock = threading.Lock()
+
+    if self.directory:
+      self.directory.mkdir(parents=True, exist_ok=True)
+
+  def _get_path(self, key):
+    return self.directory.joinpath(hashlib.sha1(repr(key).encode()).hexdigest() + '.json')
+
+  def _read(self, key):
+    if self.directory is None:
+      entry = self._entries.get(key)
+      if entry is not None:
+        self._entries.move_to_end(key)
+      return entry
+
+    path = self._get_path(key)
+    try:
+      entry = json.loads(path.read_text())
+      # The modification time of every file tracks its last use, for the LRU eviction
+      os.utime(path)
+    except (OSError, ValueError):
+      return None
+    return entry['expires'], entry['value']
+
+  def _write(self, key, entry):
+    if self.directory is None:
+      self._entries[key] = entry
+      self._entries.move_to_end(key)
+      while len(self._entries) > self.max_entries:
+        self._entries.popitem(last=False)
+      return
+
+    path = self._get_path(key)
+    # Other workers may be reading the same entry, so it's written aside and moved in place
+    tmp_path = path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+    tmp_path.write_text(json.dumps({'expires': entry[0], 'value': entry[1]}))
+    os.replace(tmp_path, path)
+
+    paths = [path for _, path in sorted(self._get_mtimes())]
+    for path in paths[:max(len(paths) - self.max_entries, 0)]:
+      path.unlink(missing_ok=True)
+
+  def _get_mtimes(self):
+    mtimes = []
+    for path in self.directory.glob('*.json'):
+      # Other workers may evict or expire the file between the listing and the stat
+      try:
+        mtimes.append((path.stat().st_mtime, path))
+      except OSError:
+        continue
+    return mtimes
+
+  def _delete(self, key):
+    if self.directory is None:
+      self._entries.pop(key, None)
+    else:
+      self._get_path(key).unlink(missing_ok=True)
+
+  def get(self, key):
+    '''
+    Returns the value stored for the entered key, or None if it is missing or expired.
+
+    Arguments:
+    key(tuple): key of the entry.
+    '''
+    with self._lock:
+      entry = self._read(key)
+      if entry is None or entry[0] < time.time():
+        self.misses += 1
+        if entry is not None:
+          self._delete(key)
+        return None
+      self.hits += 1
+      return entry[1]
+
+  def set(self, key, value):
+    '''
+    Stores a value for the entered key, evicting the least recently used entries if needed.
+
+    Arguments:
+    key(tuple): key of the entry.
+    value(str): serialized value to store.
+    '''
+    with self._lock:
+      self._write(key, (time.time() + self.ttl, value))
+
+  def clear(self):
+    '''
+    Removes every entry from the cache.
+    '''
+    with self._lock:
+      self._entries.clear()
+      if self.directory:
+        for path in self.directory.glob('*.json'):
+          path.unlink(missing_ok=True)
+
+  def get_stats(self):
+    '''
+    Returns a dictionary with the hits, misses and entries of the cache. Hits and misses are
+    counted by every process on its own.
+    '''
+    entries = len(list(self.directory.glob('*.json'))) if self.directory else len(self._entries)
+    return {'hits': self.hits, 'misses': self.misses, 'entries': entries,
+            'max_entries': self.max_entries, 'ttl': self.ttl}
+
+
+figure_cache = FigureCache(directory=CACHE_DIR)
+
+
+def memoize_figures(page, get_period=None):
+  '''
+  Decorator for the update_graph callbacks. The figures are cached as JSON under the page, the
+  inputs of the callback and the version of the data of the period, so they are only computed
+  once per period until views of that period are added.
+
+  Arguments:
+  page(str): name of the page the callback belongs to.
+  get_period(function): returns the period of the inputs of the callback, the first one by default.
+  '''
+  def decorator(function):
+
+    @functools.wraps(function)
+    def wrapper(*args):
+      # Imported here, so registering the callbacks doesn't load the data modules
+      from datastore import get_store
+
+      period = get_period(*args) if get_period else args[0]
+      key = (page, *args, get_store().get_version(period))
+      serialized_figures = figure_cache.get(key)
+
+      if serialized_figures is not None:
+        with timed_step('deserialize', page):
+          return json.loads(serialized_figures)
+
+      with timed_step('callback', page):
+        figures = function(*args)
+      with timed_step('serialize', page):
+        serialized_figures = json.dumps(figures, cls=plotly.utils.PlotlyJSONEncoder)
+      figure_cache.set(key, serialized_figures)
+
+      return figures
+
+    return wrapper
+
+  return decorator
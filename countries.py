@@ -0,0 +1,79 @@
+import json
+import logging
+import pathlib
+import unicodedata
+
+import pandas as pd
+import pycountry
+
+
+COUNTRIES_PATH = pathlib.Path(__file__).parent.joinpath('data', 'iso_3166_1.json')
+
+# User-assigned codes found in the metadata, which are not part of ISO 3166-1 nor of pycountry,
+# with the alpha_3 code commonly used in their place
+USER_ASSIGNED_COUNTRIES = {'XK': ('XKX', 'Kosovo')}
+
+logger = logging.getLogger(__name__)
+
+# Codes without alpha_3 code already logged, so every one is only logged once per process
+_unmapped_codes = set()
+
+
+def load_countries(path=COUNTRIES_PATH):
+  '''
+  Returns a Pandas DataFrame indexed by the ISO 3166-1 alpha_2 code of every country, with its
+  alpha_3 code, used by the maps, and its name in Spanish.
+
+  Arguments:
+  path(pathlib.Path): JSON file with the name of every country by alpha_2 code.
+  '''
+  with open(path, encoding='utf-8') as countries_file:
+    names = json.load(countries_file)
+
+  # Namibia's code was exported as 'NaN', and names come with decomposed accents and a leading space
+  names = {('NA' if code == 'NaN' else code): unicodedata.normalize('NFC', name).strip() for code, name in names.items()}
+  alpha_3_codes = {country.alpha_2: country.alpha_3 for country in pycountry.countries}
+
+  df_countries = pd.DataFrame({'alpha_2': list(names.keys()), 'name': list(names.values())})
+  df_countries['alpha_3'] = df_countries['alpha_2'].map(alpha_3_codes)
+  df_countries = df_countries.set_index('alpha_2')[['alpha_3', 'name']]
+
+  df_user_assigned = pd.DataFrame.from_dict(USER_ASSIGNED_COUNTRIES, orient='index', columns=['alpha_3', 'name'])
+
+  return pd.concat([df_countries.drop(df_user_assigned.index, errors='ignore'), df_user_assigned.rename_axis('alpha_2')])
+
+
+_countries = None
+
+
+def get_countries():
+  '''
+  Returns the country reference shared by the whole process, loading it on first use.
+  '''
+  global _countries
+
+  if _countries is None:
+    _countries = load_countries()
+
+  return _countries
+
+
+def map_countries(alpha_2_codes):
+  '''
+  Returns a Pandas DataFrame with the alpha_3 code and name of every entered alpha_2 code, in the
+  same order. Codes missing from the reference keep the code as name and have no alpha_3 code, so
+  they are left out of the maps, and are logged.
+
+  Arguments:
+  alpha_2_codes(list): ISO 3166-1 alpha_2 codes, as a list, Index or Series.
+  '''
+  alpha_2_codes = pd.Index(alpha_2_codes).astype(object)
+  df_countries = get_countries().reindex(alpha_2_codes)
+  df_countries['name'] = df_countries['name'].where(df_countries['name'].notna(), alpha_2_codes)
+
+  unmapped_codes = set(df_countries.index[df_countries['alpha_3'].isna()].dropna()) - _unmapped_codes
+  if unmapped_codes:
+    _unmapped_codes.update(unmapped_codes)
+    logger.warning('Countries without alpha_3 code are left out of the maps: %s', sorted(unmapped_codes))
+
+  return df_countries
@@ -0,0 +1,372 @@
+import collections
+
+import numpy as np
+import pandas as pd
+
+from filters import DROP_WINDOW, get_duration_bins, get_watch_seconds
+from helpers import build_date_index
+from metrics import timed
+
+
+# Metadata every views count is broken down by
+ASSET_COLUMNS = ['asset_id', 'content_id', 'title', 'show_type', 'category', 'country_of_origin']
+
+# Per day aggregates of a period: views and drops per asset, views per device and hour, views per
+# content and bin of watch duration, and the changes in the amount of active streams per minute and device
+CubeSlice = collections.namedtuple('CubeSlice', ['assets', 'devices', 'durations', 'streams'])
+
+# Views are counted as active streams for a day at most, so a broken tune out doesn't span years
+MAX_STREAM_MINUTES = 24 * 60
+
+
+@timed('merge')
+def add_asset_metadata(df_assets, df_metadata):
+  '''
+  Returns the entered per day asset counts with the metadata of every asset added.
+  The metadata is the same for every view of an asset, so it's added once per row of the cube.
+
+  Arguments:
+  df_assets(Pandas DataFrame): views and drops per day, asset_id and content_id.
+  df_metadata(Pandas DataFrame): Flow DF with all content metadata.
+  '''
+  df_asset_metadata = df_metadata[ASSET_COLUMNS].drop_duplicates(['asset_id', 'content_id']).astype({'title': 'category'})
+
+  return df_assets.merge(df_asset_metadata, on=['asset_id', 'content_id'], how='left')
+
+
+def get_active_minutes(tunein, tuneout):
+  '''
+  Returns two int64 arrays with the first and last minute every view is active, counted in minutes
+  since the epoch. Views ending before they start are only active in their first minute, and no
+  view is active for more than MAX_STREAM_MINUTES.
+
+  Arguments:
+  tunein(NumPy array): datetime64 tune in of every view.
+  tuneout(NumPy array): datetime64 tune out of every view.
+  '''
+  start = tunein.astype('datetime64[m]').astype('int64')
+  end = tuneout.astype('datetime64[m]').astype('int64')
+
+  return start, np.clip(end, start, start + MAX_STREAM_MINUTES)
+
+
+def get_stream_days(df_views):
+  '''
+  Returns a Pandas DatetimeIndex with every day some of the entered views are active in, from the
+  day of their tune in to the one of their tune out, like the streams counted by aggregate_streams.
+
+  Arguments:
+  df_views(Pandas DataFrame): Flow DF with all visualizatons.
+  '''
+  start, end = get_active_minutes(df_views['tunein'].to_numpy(), df_views['tuneout'].to_numpy())
+  first_day, last_day = start // (24 * 60), end // (24 * 60)
+
+  # Every view adds its days from the first one, numbered with offsets within the view
+  lengths = last_day - first_day + 1
+  offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+  days = np.unique(np.repeat(first_day, lengths) + offsets)
+
+  return pd.DatetimeIndex(pd.to_datetime(days * 24 * 60, unit='m'))
+
+
+def aggregate_streams(df_views):
+  '''
+  Returns a Pandas DataFrame with the events of a sweep line over the views: how much the amount of
+  active streams changes at every minute, per device. Every view is active from the minute of its
+  tune in to the minute of its tune out, both included, so it adds 1 at the first one and takes
+  it back the minute after the last one. Events are sorted by minute and device, so the memory used
+  depends on the amount of views, not on the amount of minutes between the first and the last one.
+
+  Arguments:
+  df_views(Pandas DataFrame): Flow DF with all visualizatons.
+  '''
+  devices = df_views['device_type'].astype('category')
+  is_present = devices.cat.codes.to_numpy() >= 0
+  codes = devices.cat.codes.to_numpy()[is_present].astype('int64')
+  start, end = get_active_minutes(df_views['tunein'].to_numpy()[is_present], df_views['tuneout'].to_numpy()[is_present])
+  n_devices = len(devices.cat.categories)
+
+  # Events of the same minute and device share a key, and are added up once sorted
+  keys, positions = np.unique(np.concatenate([start, end + 1]) * n_devices + np.concatenate([codes, codes]), return_inverse=True)
+  deltas = np.bincount(positions, np.repeat([1, -1], len(codes)), minlength=len(keys)).astype('int64')
+  is_change = deltas != 0
+  keys, deltas = keys[is_change], deltas[is_change]
+  minute = pd.to_datetime(keys // n_devices, unit='m')
+
+  return pd.DataFrame({'day': minute.normalize(),
+                       'minute': minute,
+                       'device_type': pd.Categorical.from_codes(keys % n_devices, devices.cat.categories),
+                       'delta': deltas.astype('int32')})
+
+
+def aggregate_views(df_views, df_metadata):
+  '''
+  Returns a CubeSlice with the amount of views and drops per day and asset, the amount of views
+  per day, device and hour, the histogram of watch durations per day and content, and the events
+  of the active streams, for all the views in the entered DF. Durations are computed once, and
+  give both drops and histograms.
+
+  Arguments:
+  df_views(Pandas DataFrame): Flow DF with all visualizatons, joined with their metadata.
+  df_metadata(Pandas DataFrame): Flow DF with all content metadata.
+  '''
+  day = df_views['tunein'].dt.normalize()
+  seconds = get_watch_seconds(df_views)
+
+  df_assets = pd.DataFrame({'day': day,
+                            'asset_id': df_views['asset_id'],
+                            'content_id': df_views['content_id'],
+                            'drops': (seconds > DROP_WINDOW[0]) & (seconds < DROP_WINDOW[1])})
+  df_assets = df_assets.groupby(['day', 'asset_id', 'content_id'], observed=True, sort=False).agg(views=('drops', 'size'), drops=('drops', 'sum')).reset_index()
+  df_assets = add_asset_metadata(df_assets, df_metadata)
+
+  df_devices = pd.DataFrame({'day': day,
+                             'device_type': df_views['device_type'],
+                             'watch_hour': df_views['tunein'].dt.hour})
+  df_devices = df_devices.groupby(['day', 'device_type', 'watch_hour'], observed=True, sort=False).size().rename('views').reset_index()
+
+  df_durations = pd.DataFrame({'day': day,
+                               'content_id': df_views['content_id'],
+                               'show_type': df_views['show_type'],
+                               'duration_bin': get_duration_bins(seconds)})
+  df_durations = df_durations.groupby(['day', 'content_id', 'show_type', 'duration_bin'], observed=True, sort=False).size().rename('views').reset_index().astype({'duration_bin': 'int8'})
+
+  return CubeSlice(*[dataframe.sort_values('day', kind='mergesort', ignore_index=True) for dataframe in [df_assets, df_devices, df_durations, aggregate_streams(df_views)]])
+
+
+def merge_cube_slices(cube_slices, df_metadata):
+  '''
+  Returns a CubeSlice adding up the aggregates of several CubeSlices, like the ones built for every
+  chunk of a view log. Days, assets and devices found in more than one of them are added together.
+
+  Arguments:
+  cube_slices(list): CubeSlices built by aggregate_views.
+  df_metadata(Pandas DataFrame): Flow DF with all content metadata.
+  '''
+  df_assets = pd.concat([cube_slice.assets[['day', 'asset_id', 'content_id', 'views', 'drops']] for cube_slice in cube_slices], ignore_index=True)
+  df_assets = df_assets.groupby(['day', 'asset_id', 'content_id'], observed=True, sort=False)[['views', 'drops']].sum().reset_index()
+  df_assets = add_asset_metadata(df_assets, df_metadata)
+
+  # Every chunk has its own device categories, so they are unified before adding them up
+  df_devices = pd.concat([cube_slice.devices for cube_slice in cube_slices], ignore_index=True).astype({'device_type': 'category'})
+  df_devices = df_devices.groupby(['day', 'device_type', 'watch_hour'], observed=True, sort=False)['views'].sum().reset_index()
+
+  df_durations = pd.concat([cube_slice.durations for cube_slice in cube_slices], ignore_index=True)
+  df_durations = df_durations.groupby(['day', 'content_id', 'show_type', 'duration_bin'], observed=True, sort=False)['views'].sum().reset_index().astype({'duration_bin': 'int8'})
+
+  # Events of the same minute and device add up, and the ones cancelling each other are left out
+  df_streams = pd.concat([cube_slice.streams for cube_slice in cube_slices], ignore_index=True).astype({'device_type': 'category'})
+  df_streams = df_streams.groupby(['day', 'minute', 'device_type'], observed=True, sort=True)['delta'].sum().reset_index()
+  df_streams = df_streams[df_streams['delta'] != 0]
+
+  return CubeSlice(*[dataframe.sort_values('day', kind='mergesort', ignore_index=True) for dataframe in [df_assets, df_devices, df_durations, df_streams]])
+
+
+class PrefixSums:
+  '''
+  Cumulative per day sums of the aggregates of every key, so the totals of any range of days are
+  the difference of two rows of the cumulative arrays, whatever the amount of days it spans.
+  Every key has one column per day with aggregates, so they take (days + 1) * keys integers per
+  summed column, however far apart the days are.
+
+  Arguments:
+  dataframe(Pandas DataFrame): per day aggregates sorted by day, like the tables of the AggregateCube.
+  keys(list): columns identifying every key, the rest of the columns are kept alongside them.
+  values(list): columns holding the amounts to add up.
+  '''
+
+  def __init__(self, dataframe, keys, values):
+    self.values = values
+    # One row per key, in the same order as the columns of the arrays
+    self.table = dataframe.drop(columns=['day', *values]).drop_duplicates(keys).reset_index(drop=True)
+    self.days = pd.DatetimeIndex(dataframe['day'].unique())
+
+    day_position = self.days.searchsorted(dataframe['day'])
+    key_position = dataframe.groupby(keys, observed=True, sort=False).ngroup().to_numpy()
+
+    self.sums = {}
+    for value in values:
+      # Row 0 is all zeros, so row d holds the totals of the days before day d
+      sums = np.zeros((len(self.days) + 1, len(self.table)), dtype='int64')
+      np.add.at(sums, (day_position + 1, key_position), dataframe[value].to_numpy())
+      self.sums[value] = np.cumsum(sums, axis=0, out=sums)
+
+  def get_totals(self, start, end):
+    '''
+    Returns a Pandas DataFrame with the totals of every key with views between the entered days,
+    both included.
+
+    Arguments:
+    start(str): first day of the range, in 'YYYY-MM-DD' format.
+    end(str): last day of the range, in 'YYYY-MM-DD' format.
+    '''
+    start, end = self.days.searchsorted(pd.Timestamp(start)), self.days.searchsorted(pd.Timestamp(end), side='right')
+    end = max(start, end)
+
+    totals = self.table.assign(**{value: self.sums[value][end] - self.sums[value][start] for value in self.values})
+
+    return totals[totals[self.values].to_numpy().any(axis=1)].reset_index(drop=True)
+
+
+class Concurrency:
+  '''
+  Amount of streams active during every minute, per device. The events of the sweep line are
+  added up per minute, and their running sum is the amount of active streams from that minute
+  until the next one with events. Only the minutes with events are kept, in a minutes * devices
+  array of int32, and any day or range is looked up from them.
+
+  Arguments:
+  df_streams(Pandas DataFrame): events of the active streams, built by aggregate_streams.
+  '''
+
+  def __init__(self, df_streams):
+    device_types = df_streams['device_type'].astype('category')
+    self.devices = device_types.cat.categories.to_list()
+    self.minutes, positions = np.unique(df_streams['minute'].to_numpy().astype('datetime64[m]').astype('int64'), return_inverse=True)
+
+    shape = (len(self.minutes), len(self.devices))
+    deltas = np.bincount(positions * shape[1] + device_types.cat.codes.to_numpy(), df_streams['delta'].to_numpy(), minlength=shape[0] * shape[1])
+    self.streams = np.cumsum(deltas.reshape(shape), axis=0).astype('int32')
+
+  def get_streams(self, start, end):
+    '''
+    Returns a Pandas DataFrame with the amount of active streams of every device, one column per
+    device, for every minute between the entered days, both included. The days are clamped to the
+    first and last day with events, so the minutes returned never outnumber the ones of the data.
+
+    Arguments:
+    start(str): first day, in 'YYYY-MM-DD' format.
+    end(str): last day, in 'YYYY-MM-DD' format.
+    '''
+    start, end = [pd.Timestamp(str(day)[:10]) for day in [start, end]]
+    if len(self.minutes):
+      first_day, last_day = pd.to_datetime(self.minutes[[0, -1]], unit='m').normalize()
+      start, end = max(start, first_day), min(end, last_day)
+    else:
+      end = start - pd.Timedelta(days=1)
+    minutes = pd.date_range(start, periods=max((end - start).days + 1, 0) * 24 * 60, freq='min', name='minute')
+    # Every minute has the streams of the last minute with events up to it
+    positions = np.searchsorted(self.minutes, minutes.to_numpy().astype('datetime64[m]').astype('int64'), side='right') - 1
+    is_known = positions >= 0
+
+    # Minutes before the first event have no active streams
+    streams = np.zeros((len(minutes), len(self.devices)), dtype='int32')
+    streams[is_known] = self.streams[positions[is_known]]
+
+    return pd.DataFrame(streams, index=minutes, columns=self.devices)
+
+
+class AggregateCube:
+  '''
+  Holds the per day aggregates of all the views, so the charts of any day or month are computed
+  from a few thousand pre-counted rows instead of the raw views. Rows are sorted by day, and
+  every day and month is located through a date index, just like the raw views in the DataStore.
+
+  Arguments:
+  cube_slice(CubeSlice): per day aggregates built by aggregate_views.
+  '''
+
+  def __init__(self, cube_slice):
+    self.assets = cube_slice.assets
+    self.devices = cube_slice.devices
+    self.durations = cube_slice.durations
+    self.streams = cube_slice.streams
+    self.indexes = {(name, period): build_date_index(dataframe['day'], period)
+                    for name, dataframe in cube_slice._asdict().items() for period in ['day', 'month']}
+    self._prefix_sums = None
+    self._concurrency = None
+
+  def append(self, cube_slice, df_metadata):
+    '''
+    Returns a new AggregateCube with the aggregates of the entered CubeSlice added. Only the days
+    present in the CubeSlice are aggregated again, the rest of the rows are kept as they are.
+
+    Arguments:
+    cube_slice(CubeSlice): per day aggregates of the new views, built by aggregate_views.
+    df_metadata(Pandas DataFrame): Flow DF with all content metadata.
+    '''
+    days = pd.concat([dataframe['day'] for dataframe in cube_slice]).unique()
+    tables = self._tables()
+    is_touched = {name: dataframe['day'].isin(days) for name, dataframe in tables.items()}
+    df_merged = merge_cube_slices([CubeSlice(*[dataframe[is_touched[name]] for name, dataframe in tables.items()]), cube_slice], df_metadata)
+
+    df_assets, df_devices, df_durations, df_streams = [pd.concat([dataframe[~is_touched[name]], merged], ignore_index=True).sort_values('day', kind='mergesort', ignore_index=True)
+                                                       for (name, dataframe), merged in zip(tables.items(), df_merged)]
+
+    return AggregateCube(CubeSlice(df_assets, df_devices.astype({'device_type': 'category'}), df_durations, df_streams.astype({'device_type': 'category'})))
+
+  def _tables(self):
+    return {'assets': self.assets, 'devices': self.devices, 'durations': self.durations, 'streams': self.streams}
+
+  def _slice(self, period, key):
+    return CubeSlice(*[dataframe.iloc[slice(*self.indexes[(name, period)].get(key, (0, 0)))]
+                       for name, dataframe in self._tables().items()])
+
+  @timed('slice')
+  def slice_day(self, date):
+    '''
+    Returns a CubeSlice with the aggregates of the entered day.
+
+    Arguments:
+    date(str): day in 'YYYY-MM-DD' format.
+    '''
+    return self._slice('day', str(date)[:10])
+
+  @timed('slice')
+  def slice_month(self, month):
+    '''
+    Returns a CubeSlice with the per day aggregates of every day of the entered month.
+
+    Arguments:
+    month(str): month in 'YYYY-MM' format.
+    '''
+    return self._slice('month', str(month)[:7])
+
+  @timed('slice')
+  def slice_range(self, start, end):
+    '''
+    Returns a CubeSlice with the totals of every asset, and of every device and hour, between the
+    entered days, both included. Totals come from prefix sums built on first use, so any range
+    costs the same, whatever the amount of days it spans. Duration histograms and stream events
+    are kept per day.
+
+    Arguments:
+    start(str): first day of the range, in 'YYYY-MM-DD' format.
+    end(str): last day of the range, in 'YYYY-MM-DD' format.
+    '''
+    if self._prefix_sums is None:
+      self.build_sums()
+
+    # The histograms have a row per content and bin, too many to keep their sums for every day
+    days = [pd.Timestamp(start), pd.Timestamp(end) + pd.Timedelta(days=1)]
+
+    return CubeSlice(*[prefix_sums.get_totals(start, end) for prefix_sums in self._prefix_sums],
+                     *[dataframe.iloc[slice(*dataframe['day'].searchsorted(days))] for dataframe in [self.durations, self.streams]])
+
+  @timed('slice')
+  def get_streams(self, start, end):
+    '''
+    Returns a Pandas DataFrame with the amount of active streams of every device, one column per
+    device, for every minute between the entered days, both included. The running sums of the
+    stream events are built on first use.
+
+    Arguments:
+    start(str): first day, in 'YYYY-MM-DD' format.
+    end(str): last day, in 'YYYY-MM-DD' format.
+    '''
+    if self._concurrency is None:
+      self.build_sums()
+
+    return self._concurrency.get_streams(start, end)
+
+  def build_sums(self):
+    '''
+    Builds the prefix sums used by slice_range and the running sums used by get_streams, when they
+    aren't built yet. A gunicorn master that preloads the app builds them before forking, so every
+    worker reads the same copy instead of building its own on first use.
+    '''
+    if self._prefix_sums is None:
+      self._prefix_sums = (PrefixSums(self.assets, ['asset_id', 'content_id'], ['views', 'drops']),
+                           PrefixSums(self.devices, ['device_type', 'watch_hour'], ['views']))
+    if self._concurrency is None:
+      self._concurrency = Concurrency(self.streams)
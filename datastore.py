@@ -0,0 +1,723 @@
+import argparse
+import hashlib
+import logging
+import os
+import pathlib
+import resource
+import sys
+import threading
+import time
+
+import pandas as pd
+import pyarrow.feather as feather
+
+from cube import AggregateCube, aggregate_views, get_stream_days, merge_cube_slices
+from encoding import decode, encode_like, encode_metadata
+from helpers import build_date_index, parse_range, parse_serie_titles
+
+
+DATA_PATH = pathlib.Path(os.environ.get('FLOW_DATA_PATH', pathlib.Path(__file__).parent.joinpath('data'))).resolve()
+
+# Low cardinality columns are stored as categoricals, so every row holds a small integer
+# code instead of a full Python string
+CATEGORY_COLUMNS = ['show_type', 'device_type', 'category', 'country_of_origin']
+DATE_COLUMNS = ['tunein', 'tuneout']
+
+# Columns of the joined views table, taken from the view log and from the metadata
+VIEW_TRAIN_COLUMNS = ['asset_id', 'device_type', 'tunein', 'tuneout']
+VIEW_METADATA_COLUMNS = ['content_id', 'title', 'show_type', 'category', 'country_of_origin']
+
+# Setting FLOW_STREAMING=1 reads train.csv in chunks of FLOW_CHUNK_SIZE rows and only keeps their per day
+# aggregates, so the memory used doesn't grow with the size of the view log
+STREAMING = os.environ.get('FLOW_STREAMING', '0') == '1'
+CHUNK_SIZE = int(os.environ.get('FLOW_CHUNK_SIZE', 1_000_000))
+
+# Setting FLOW_DROP_DIR makes every worker append the new CSV files found in that directory,
+# checking it every FLOW_DROP_INTERVAL seconds
+DROP_DIR = os.environ.get('FLOW_DROP_DIR')
+DROP_INTERVAL = float(os.environ.get('FLOW_DROP_INTERVAL', 60))
+
+# Views tuned in before FLOW_MIN_DATE, or after the time they are loaded, come from broken clocks and
+# are left out of the views and the aggregates
+MIN_DATE = pd.Timestamp(os.environ.get('FLOW_MIN_DATE', '2000-01-01'))
+
+logger = logging.getLogger(__name__)
+
+
+def get_memory_usage(dataframe):
+  '''
+  Returns the amount of bytes used by a DataFrame, including the contents of object columns.
+  The table of values of categorical columns is counted once, even when several columns share it.
+
+  Arguments:
+  dataframe(Pandas DataFrame): any DataFrame.
+  '''
+  is_categorical = [isinstance(dtype, pd.CategoricalDtype) for dtype in dataframe.dtypes]
+  tables = {id(dataframe[column].cat.categories): dataframe[column].cat.categories
+            for column, categorical in zip(dataframe.columns, is_categorical) if categorical}
+
+  return int(dataframe.loc[:, [not categorical for categorical in is_categorical]].memory_usage(deep=True).sum() +
+             sum(dataframe[column].cat.codes.nbytes for column, categorical in zip(dataframe.columns, is_categorical) if categorical) +
+             sum(table.memory_usage(deep=True) for table in tables.values()))
+
+
+def get_peak_rss():
+  '''
+  Returns the peak resident set size of the process so far, in bytes.
+  '''
+  peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  # Linux reports it in kilobytes, macOS in bytes
+  return peak_rss if sys.platform == 'darwin' else peak_rss * 1024
+
+
+def read_view_log(path, chunk_size=None):
+  '''
+  Returns a Pandas DataFrame with the views of a CSV file laid out like train.csv, with
+  categorical device types and parsed tune in and tune out timestamps. When a chunk size
+  is entered, an iterator of DataFrames of at most that amount of rows is returned instead.
+
+  Arguments:
+  path(pathlib.Path): path of the CSV file.
+  chunk_size(int): amount of rows of every chunk, or None to read the whole file at once.
+  '''
+  return pd.read_csv(path,
+                     dtype={column: 'category' for column in CATEGORY_COLUMNS},
+                     parse_dates=DATE_COLUMNS,
+                     chunksize=chunk_size)
+
+
+def read_train_csv(data_path=DATA_PATH, chunk_size=None):
+  '''
+  Returns a Pandas DataFrame with the Flow view history parsed from train.csv, or an iterator
+  of chunks of it when a chunk size is entered.
+
+  Arguments:
+  data_path(pathlib.Path): directory containing the train.csv file.
+  chunk_size(int): amount of rows of every chunk, or None to read the whole file at once.
+  '''
+  return read_view_log(f'{data_path}/train.csv', chunk_size)
+
+
+def get_cache_path(data_path=DATA_PATH):
+  '''
+  Returns the path of the columnar cache that is kept next to train.csv.
+
+  Arguments:
+  data_path(pathlib.Path): directory containing the train.csv file.
+  '''
+  return pathlib.Path(data_path).joinpath('train.feather')
+
+
+def is_cache_fresh(data_path=DATA_PATH):
+  '''
+  Returns True if the columnar cache exists and is not older than train.csv.
+
+  Arguments:
+  data_path(pathlib.Path): directory containing the train.csv file.
+  '''
+  cache_path = get_cache_path(data_path)
+
+  if not cache_path.exists():
+    return False
+
+  return cache_path.stat().st_mtime >= pathlib.Path(data_path).joinpath('train.csv').stat().st_mtime
+
+
+def build_cache(data_path=DATA_PATH):
+  '''
+  Parses train.csv once and writes it as an uncompressed Feather (Arrow IPC) file, which
+  can later be opened memory-mapped. Returns the path of the written cache.
+
+  Arguments:
+  data_path(pathlib.Path): directory containing the train.csv file.
+  '''
+  start = time.perf_counter()
+  cache_path = get_cache_path(data_path)
+  # We write to a temporary file and move it in place, so workers starting at the same time
+  # never open a half written cache
+  tmp_path = cache_path.with_name(f'{cache_path.name}.{os.getpid()}.tmp')
+
+  # Rows are stored sorted by tune in, so every day and month is a contiguous block of rows
+  df_train = read_train_csv(data_path).sort_values('tunein', kind='mergesort', ignore_index=True)
+  df_train.to_feather(tmp_path, compression='uncompressed')
+  os.replace(tmp_path, cache_path)
+
+  logger.info('Built %s in %.3fs', cache_path, time.perf_counter() - start)
+
+  return cache_path
+
+
+def load_train(data_path=DATA_PATH):
+  '''
+  Returns a Pandas DataFrame with the Flow view history. The data is read memory-mapped from
+  the columnar cache, which is rebuilt first if it is missing or older than train.csv.
+
+  Arguments:
+  data_path(pathlib.Path): directory containing the train.csv file.
+  '''
+  if not is_cache_fresh(data_path):
+    build_cache(data_path)
+
+  # Uncompressed Arrow buffers are mapped straight from the OS page cache, so forked workers
+  # share the same physical pages and numeric columns are converted without copying them
+  table = feather.read_table(get_cache_path(data_path), memory_map=True)
+
+  return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def get_files_version(paths):
+  '''
+  Returns a short string identifying the current contents of the entered files, built from
+  their names, sizes and modification times.
+
+  Arguments:
+  paths(list): paths of the files.
+  '''
+  file_stats = [(path.name, path.stat().st_size, path.stat().st_mtime_ns) for path in map(pathlib.Path, paths)]
+
+  return hashlib.sha1(repr(file_stats).encode()).hexdigest()[:12]
+
+
+def get_dataset_version(data_path=DATA_PATH):
+  '''
+  Returns a short string identifying the current contents of train.csv and metadata.csv.
+  Every worker reading the same files gets the same version.
+
+  Arguments:
+  data_path(pathlib.Path): directory containing the train.csv and metadata.csv files.
+  '''
+  return get_files_version([pathlib.Path(data_path).joinpath(name) for name in ['train.csv', 'metadata.csv']])
+
+
+def drop_invalid_views(df_train):
+  '''
+  Returns the views of the entered log tuned in from MIN_DATE up to the current time, logging the
+  amount of views left out.
+
+  Arguments:
+  df_train(Pandas DataFrame): Flow DF with all visualizatons.
+  '''
+  is_valid = df_train['tunein'].between(MIN_DATE, pd.Timestamp.now())
+
+  if is_valid.all():
+    return df_train
+
+  logger.warning('Left out %s views tuned in before %s, in the future or without tune in', int((~is_valid).sum()), MIN_DATE.date())
+  return df_train[is_valid]
+
+
+def build_views(df_train, df_metadata):
+  '''
+  Returns a Pandas DataFrame with every view joined with the metadata of its asset, sorted by
+  tune in. Only the columns used by the filters are kept, and titles are stored as categoricals.
+  Views with a tune in out of range are left out by drop_invalid_views.
+
+  Arguments:
+  df_train(Pandas DataFrame): Flow DF with all visualizatons.
+  df_metadata(Pandas DataFrame): Flow DF with all content metadata.
+  '''
+  df_metadata = df_metadata[['asset_id'] + VIEW_METADATA_COLUMNS].astype({'title': 'category'})
+  # The asset ids of the log are encoded with the table of the metadata, so they are joined on the codes
+  df_views = encode_like(drop_invalid_views(df_train[VIEW_TRAIN_COLUMNS]), df_metadata).merge(df_metadata, on='asset_id')
+
+  if not df_views['tunein'].is_monotonic_increasing:
+    df_views = df_views.sort_values('tunein', kind='mergesort', ignore_index=True)
+
+  return df_views
+
+
+def concat_views(df_views, df_new_views):
+  '''
+  Returns a Pandas DataFrame with the new views added to the joined views table, sorted by tune in.
+
+  Arguments:
+  df_views(Pandas DataFrame): views table built by build_views.
+  df_new_views(Pandas DataFrame): views table of the new views, built by build_views.
+  '''
+  df_views = pd.concat([df_views, df_new_views], ignore_index=True)
+
+  if not df_views['tunein'].is_monotonic_increasing:
+    df_views = df_views.sort_values('tunein', kind='mergesort', ignore_index=True)
+
+  # Categories differ between files, so the device types are unified again
+  return df_views.astype({'device_type': 'category'})
+
+
+def build_lookup(df_metadata, key):
+  '''
+  Returns a Pandas DataFrame with the metadata of the first asset found for every key,
+  indexed by that key.
+
+  Arguments:
+  df_metadata(Pandas DataFrame): Flow DF with all content metadata.
+  key(str): 'content_id' or 'asset_id'.
+  '''
+  # Lookups only hold one row per key, so they are kept decoded
+  return decode(df_metadata.drop_duplicates(key).set_index(key))
+
+
+def build_title_index(df_metadata):
+  '''
+  Returns a Pandas DataFrame indexed by asset id with the content id, the serie title without
+  season and episode, and the season and episode numbers of every asset. Titles are parsed once
+  per asset, so the rankings only look them up.
+
+  Arguments:
+  df_metadata(Pandas DataFrame): Flow DF with all content metadata.
+  '''
+  df_assets = decode(df_metadata[['asset_id', 'content_id', 'title']].drop_duplicates('asset_id').set_index('asset_id'))
+  df_titles = parse_serie_titles(df_assets['title'])
+
+  return pd.concat([df_assets[['content_id']], df_titles.astype({'clean_title': 'category'})], axis=1)
+
+
+def load_metadata(data_path=DATA_PATH):
+  '''
+  Returns a Pandas DataFrame with the Flow content metadata, with categorical show types,
+  categories and countries of origin, and dictionary-encoded ids and titles.
+
+  Arguments:
+  data_path(pathlib.Path): directory containing the metadata.csv file.
+  '''
+  df_metadata = pd.read_csv(f'{data_path}/metadata.csv',
+                            delimiter=';',
+                            dtype={column: 'category' for column in CATEGORY_COLUMNS})
+
+  return encode_metadata(df_metadata)
+
+
+class Ingestion:
+  '''
+  Adds up the per day aggregates of view logs fed one chunk at a time. Only the aggregates and
+  the views per device are kept, so the memory used depends on the amount of days and assets,
+  not on the amount of views. Merging regroups every table, so the aggregates of the chunks are
+  kept pending until they hold as many rows as the ones already merged, and merged all at once.
+  Every row is then regrouped a few times, instead of once per chunk.
+
+  Arguments:
+  df_metadata(Pandas DataFrame): Flow DF with all content metadata.
+  '''
+
+  def __init__(self, df_metadata):
+    self.df_metadata = df_metadata
+    self.cube_slice = None
+    self._pending = []
+    self._pending_rows = 0
+    self.device_counts = pd.Series(dtype='int64')
+    self.rows = 0
+    self.seconds = 0.0
+
+  def add_chunk(self, df_train):
+    '''
+    Adds the views of a chunk of the view log to the aggregates.
+
+    Arguments:
+    df_train(Pandas DataFrame): chunk of the Flow view log.
+    '''
+    cube_slice = aggregate_views(build_views(df_train, self.df_metadata), self.df_metadata)
+    self._pending.append(cube_slice)
+    self._pending_rows += sum(len(dataframe) for dataframe in cube_slice)
+    if self.cube_slice is None or self._pending_rows >= sum(len(dataframe) for dataframe in self.cube_slice):
+      self.merge()
+    self.device_counts = self.device_counts.add(df_train['device_type'].value_counts(), fill_value=0).astype('int64')
+    self.rows += len(df_train)
+
+  def merge(self):
+    '''
+    Merges the pending aggregates of the chunks into the ones already merged, and returns the
+    resulting CubeSlice.
+    '''
+    cube_slices = [self.cube_slice, *self._pending] if self.cube_slice is not None else self._pending
+    if len(cube_slices) > 1:
+      self.cube_slice = merge_cube_slices(cube_slices, self.df_metadata)
+    elif cube_slices:
+      self.cube_slice = cube_slices[0]
+    self._pending = []
+    self._pending_rows = 0
+
+    return self.cube_slice
+
+  def read_csv(self, data_path=DATA_PATH, chunk_size=CHUNK_SIZE):
+    '''
+    Adds every view of train.csv to the aggregates, reading it in chunks, and returns the
+    resulting CubeSlice. Progress is logged after every chunk.
+
+    Arguments:
+    data_path(pathlib.Path): directory containing the train.csv file.
+    chunk_size(int): amount of rows read at once.
+    '''
+    start = time.perf_counter()
+    rows = 0
+
+    for df_train in read_train_csv(data_path, chunk_size):
+      self.add_chunk(df_train)
+      rows += len(df_train)
+      seconds = time.perf_counter() - start
+      logger.info('Ingested %s rows in %.1fs, %.0f rows/s, peak RSS %.1f MB',
+                  rows, seconds, rows / seconds, get_peak_rss() / 2**20)
+
+    cube_slice = self.merge()
+    self.seconds += time.perf_counter() - start
+
+    return cube_slice
+
+  def get_stats(self):
+    '''
+    Returns a dictionary with the rows ingested, their throughput and the peak resident set size.
+    '''
+    return {'rows_ingested': self.rows,
+            'rows_per_second': round(self.rows / max(self.seconds, 1e-9)),
+            'peak_rss': get_peak_rss()}
+
+
+class DataStore:
+  '''
+  Holds the Flow datasets shared by every page of the dashboard. Each dataset is read
+  from disk only once per process, the first time it is requested. In streaming mode the
+  aggregates are built from train.csv in chunks, and the views are only loaded if requested.
+  New views can be appended afterwards from CSV drops, without reading the history again.
+
+  Arguments:
+  data_path(pathlib.Path): directory containing the train.csv and metadata.csv files.
+  streaming(bool): build the aggregates reading train.csv in chunks.
+  chunk_size(int): amount of rows read at once in streaming mode.
+  '''
+
+  def __init__(self, data_path=DATA_PATH, streaming=STREAMING, chunk_size=CHUNK_SIZE):
+    self.data_path = data_path
+    self.streaming = streaming
+    self.chunk_size = chunk_size
+    self.stats = {}
+    self._train = None
+    self._metadata = None
+    self._views = None
+    self._cube = None
+    self._version = None
+    self.day_index = {}
+    self.month_index = {}
+    self.devices = []
+    self.device_counts = None
+    self.content_lookup = None
+    self.asset_lookup = None
+    self.title_index = None
+    self.drops = []
+    self._drop_versions = []
+    self._period_drop_versions = {}
+    # Reentrant, since loading the aggregates loads the views and the metadata, and appending loads the aggregates
+    self._lock = threading.RLock()
+
+  @classmethod
+  def from_frames(cls, df_train, df_metadata, version='frames'):
+    '''
+    Returns a DataStore holding datasets already in memory instead of reading them from disk, like
+    the synthetic ones of the benchmarks. Their views and aggregates are built as usual.
+
+    Arguments:
+    df_train(Pandas DataFrame): view log laid out like the one read from train.csv.
+    df_metadata(Pandas DataFrame): content metadata laid out like the one read from metadata.csv.
+    version(str): version of the datasets, used by the figure cache.
+    '''
+    store = cls(data_path=None, streaming=False)
+    store._train = store._load('train', lambda data_path: df_train)
+    store._metadata = store._load('metadata', lambda data_path: encode_metadata(df_metadata))
+    store._version = version
+
+    return store
+
+  def _load(self, name, loader):
+    start = time.perf_counter()
+    loaded = loader(self.data_path)
+    # Loaders return a DataFrame, or a tuple of them like the CubeSlice
+    dataframes = loaded if isinstance(loaded, tuple) else [loaded]
+    self.stats[name] = {'rows': sum(len(dataframe) for dataframe in dataframes),
+                        'seconds': round(time.perf_counter() - start, 3),
+                        'bytes': sum(get_memory_usage(dataframe) for dataframe in dataframes)}
+    logger.info('Loaded %s: %s rows in %ss, %.1f MB',
+                name, self.stats[name]['rows'], self.stats[name]['seconds'], self.stats[name]['bytes'] / 2**20)
+    return loaded
+
+  def _load_views(self):
+    # Checked again once the lock is held, so a warm up and a request starting together load the views once
+    if self._views is None:
+      with self._lock:
+        if self._views is None:
+          if self.data_path is not None:
+            self._version = get_dataset_version(self.data_path)
+          df_metadata = self.metadata
+          # The raw view log is only needed to build the joined table, so we don't keep it around
+          df_train = self._train if self._train is not None else self._load('train', load_train)
+          df_views = self._load('views', lambda data_path: build_views(df_train, df_metadata))
+          self.stats['train']['resident'] = self._train is not None
+          # In streaming mode drops may have been appended before the views are requested
+          for path in self.drops:
+            df_views = concat_views(df_views, build_views(read_view_log(path), df_metadata))
+
+          self.day_index = build_date_index(df_views['tunein'], 'day')
+          self.month_index = build_date_index(df_views['tunein'], 'month')
+          if self.device_counts is None:
+            self._set_device_counts(df_train['device_type'].value_counts())
+          self._load_lookups()
+          self._views = df_views
+    return self._views
+
+  def _set_device_counts(self, device_counts):
+    # Devices are ranked over the whole history, so every chart lists them in the same order
+    self.device_counts = device_counts
+    self.devices = device_counts.sort_values(ascending=False, kind='mergesort').keys().to_list()
+
+  def _load_lookups(self):
+    self.content_lookup = build_lookup(self.metadata, 'content_id')
+    self.asset_lookup = build_lookup(self.metadata, 'asset_id')
+    self.title_index = build_title_index(self.metadata)
+
+  def _load_streaming_cube(self):
+    self._version = get_dataset_version(self.data_path)
+    ingestion = Ingestion(self.metadata)
+    cube_slice = self._load('cube', lambda data_path: ingestion.read_csv(data_path, self.chunk_size))
+    self.stats['cube'].update(ingestion.get_stats())
+
+    self._set_device_counts(ingestion.device_counts)
+    self._load_lookups()
+    return AggregateCube(cube_slice)
+
+  def _combine_versions(self, drop_versions):
+    if not drop_versions:
+      return self._version
+    return hashlib.sha1(repr([self._version, *drop_versions]).encode()).hexdigest()[:12]
+
+  @property
+  def train(self):
+    if self._train is None:
+      with self._lock:
+        if self._train is None:
+          self._train = self._load('train', load_train)
+    return self._train
+
+  @property
+  def metadata(self):
+    if self._metadata is None:
+      with self._lock:
+        if self._metadata is None:
+          self._metadata = self._load('metadata', load_metadata)
+    return self._metadata
+
+  @property
+  def views(self):
+    return self._load_views()
+
+  @property
+  def cube(self):
+    if self._cube is None:
+      with self._lock:
+        if self._cube is None:
+          if self.streaming:
+            self._cube = self._load_streaming_cube()
+          else:
+            df_views = self._load_views()
+            self._cube = AggregateCube(self._load('cube', lambda data_path: aggregate_views(df_views, self.metadata)))
+    return self._cube
+
+  @property
+  def version(self):
+    if self.streaming:
+      self.cube
+    else:
+      self._load_views()
+    return self._combine_versions(self._drop_versions)
+
+  def get_version(self, period):
+    '''
+    Returns a short string identifying the data of the entered day, month or range of days. It only
+    changes when views of that period are appended, so the cached figures of every other period
+    remain valid.
+
+    Arguments:
+    period(str): day in 'YYYY-MM-DD' format, month in 'YYYY-MM' format, or range built by format_range.
+    '''
+    self.version
+    days = parse_range(period)
+
+    if days is None:
+      return self._combine_versions(self._period_drop_versions.get(str(period), []))
+
+    # Ranges change with the views appended to any of their days
+    return self._combine_versions([drop_version for day in pd.date_range(*days).strftime('%Y-%m-%d')
+                                   for drop_version in self._period_drop_versions.get(day, [])])
+
+  def append_views(self, path):
+    '''
+    Adds the views of a CSV drop laid out like train.csv to the aggregates, and to the views and
+    their date indexes when they are loaded, without reading the history again. Returns the list
+    of days and months that changed.
+
+    Arguments:
+    path(pathlib.Path): path of the CSV file.
+    '''
+    path = pathlib.Path(path).resolve()
+
+    with self._lock:
+      start = time.perf_counter()
+      cube = self.cube
+      df_train = read_view_log(path)
+      df_views = build_views(df_train, self.metadata)
+
+      if self._views is not None:
+        self._views = concat_views(self._views, df_views)
+        self.day_index = build_date_index(self._views['tunein'], 'day')
+        self.month_index = build_date_index(self._views['tunein'], 'month')
+      if self._train is not None:
+        self._train = pd.concat([self._train, df_train], ignore_index=True)
+      self._set_device_counts(self.device_counts.add(df_train['device_type'].value_counts(), fill_value=0).astype('int64'))
+      self._cube = cube.append(aggregate_views(df_views, self.metadata), self.metadata)
+
+      # Only the cached figures of the periods with new views are computed again
+      drop_version = get_files_version([path])
+      # Views running past midnight add streams to the days after the one they started
+      days = get_stream_days(df_views)
+      periods = sorted(set(days.strftime('%Y-%m-%d')) | set(days.strftime('%Y-%m')))
+      for period in periods:
+        self._period_drop_versions.setdefault(period, []).append(drop_version)
+      self._drop_versions.append(drop_version)
+      self.drops.append(path)
+
+      logger.info('Appended %s: %s views of %s periods in %.3fs', path, len(df_views), len(periods), time.perf_counter() - start)
+
+    return periods
+
+  # Dates are taken from the aggregates, which are available in both modes
+  @property
+  def first_date(self):
+    return self.cube.assets['day'].iloc[0].date()
+
+  @property
+  def last_date(self):
+    return self.cube.assets['day'].iloc[-1].date()
+
+  @property
+  def months(self):
+    return list(self.cube.indexes[('assets', 'month')])
+
+  def slice_day(self, date):
+    '''
+    Returns the views that started on the entered day, as a slice of the views DataFrame.
+
+    Arguments:
+    date(str): day in 'YYYY-MM-DD' format.
+    '''
+    df_views = self._load_views()
+    start, end = self.day_index.get(str(date)[:10], (0, 0))
+    return df_views.iloc[start:end]
+
+  def slice_month(self, month):
+    '''
+    Returns the views that started on the entered month, as a slice of the views DataFrame.
+
+    Arguments:
+    month(str): month in 'YYYY-MM' format.
+    '''
+    df_views = self._load_views()
+    start, end = self.month_index.get(str(month)[:7], (0, 0))
+    return df_views.iloc[start:end]
+
+  def report(self):
+    '''
+    Returns a dictionary with the rows, load time in seconds and bytes in memory of every
+    loaded dataset, plus the total bytes still held by the store.
+    '''
+    return {**self.stats, 'total_bytes': sum(entry['bytes'] for entry in self.stats.values() if entry.get('resident', True))}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+  '''
+  Returns the DataStore shared by the whole process, creating it on first use.
+  '''
+  global _store
+
+  if _store is None:
+    with _store_lock:
+      if _store is None:
+        _store = DataStore()
+
+  return _store
+
+
+class DropWatcher(threading.Thread):
+  '''
+  Background thread that appends to the store every new CSV file found in a directory. Files are
+  appended in name order, so they should be moved into the directory once completely written.
+
+  Arguments:
+  store(DataStore): store the views are appended to.
+  directory(pathlib.Path): directory the CSV drops arrive to.
+  interval(float): seconds between every check of the directory.
+  '''
+
+  def __init__(self, store, directory, interval=DROP_INTERVAL):
+    super().__init__(name='flow-drop-watcher', daemon=True)
+    self.store = store
+    self.directory = pathlib.Path(directory)
+    self.interval = interval
+    self.failed = set()
+
+  def poll(self):
+    '''
+    Appends the CSV files of the directory that weren't appended yet, and returns the periods
+    that changed.
+    '''
+    periods = set()
+    for path in sorted(self.directory.glob('*.csv')):
+      path = path.resolve()
+      if path in self.store.drops or path in self.failed:
+        continue
+      try:
+        periods.update(self.store.append_views(path))
+      except Exception:
+        # A broken drop is skipped, instead of being retried on every check
+        self.failed.add(path)
+        logger.exception('Failed to append %s', path)
+    return sorted(periods)
+
+  def run(self):
+    while True:
+      self.poll()
+      time.sleep(self.interval)
+
+
+def watch_drops(directory=DROP_DIR, store=None):
+  '''
+  Starts appending the CSV drops of a directory in a background thread and returns it.
+
+  Arguments:
+  directory(pathlib.Path): directory the CSV drops arrive to.
+  store(DataStore): store the views are appended to, the shared one by default.
+  '''
+  watcher = DropWatcher(store or get_store(), directory)
+  watcher.start()
+
+  return watcher
+
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='Builds the columnar cache of train.csv.')
+  parser.add_argument('data_path', nargs='?', default=DATA_PATH, type=pathlib.Path,
+                      help='directory containing the train.csv file')
+  parser.add_argument('--force', action='store_true', help='rebuild the cache even if it is up to date')
+  parser.add_argument('--stream', action='store_true',
+                      help='only build the aggregates reading train.csv in chunks, and report the throughput and peak memory')
+  parser.add_argument('--chunk-size', default=CHUNK_SIZE, type=int, help='amount of rows read at once with --stream')
+  args = parser.parse_args()
+
+  logging.basicConfig(level=logging.INFO)
+
+  if args.stream:
+    store = DataStore(args.data_path, streaming=True, chunk_size=args.chunk_size)
+    store.cube
+    logger.info('%s', store.report())
+  elif args.force or not is_cache_fresh(args.data_path):
+    build_cache(args.data_path)
+  else:
+    logger.info('%s is up to date', get_cache_path(args.data_path))
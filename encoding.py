@@ -0,0 +1,78 @@
+import pandas as pd
+
+
+# Columns stored as integer codes into a table of their distinct values. Both text columns share
+# a single string table, so every distinct string is held once per worker
+ID_COLUMNS = ['asset_id', 'content_id']
+TEXT_COLUMNS = ['title', 'episode_title']
+
+
+def build_table(values):
+  '''
+  Returns a Pandas CategoricalDtype whose categories are the distinct entered values, in order of
+  appearance. Values are stored as the smallest integer code able to index the table.
+
+  Arguments:
+  values(list): values of the table, as a list, array or Series.
+  '''
+  values = pd.Series(values).dropna()
+
+  return pd.CategoricalDtype(pd.unique(values.to_numpy()))
+
+
+def encode_metadata(df_metadata):
+  '''
+  Returns the Flow content metadata with its ids and texts dictionary-encoded, as categoricals.
+  Every id column gets its own table, and the titles and episode titles share a single string table.
+  Already encoded metadata is returned as it is.
+
+  Arguments:
+  df_metadata(Pandas DataFrame): Flow DF with all content metadata.
+  '''
+  columns = [column for column in ID_COLUMNS + TEXT_COLUMNS if column in df_metadata.columns]
+  if all(isinstance(df_metadata[column].dtype, pd.CategoricalDtype) for column in columns):
+    return df_metadata
+
+  text_columns = [column for column in TEXT_COLUMNS if column in df_metadata.columns]
+  text_table = build_table(pd.concat([df_metadata[column].astype(object) for column in text_columns]))
+
+  dtypes = {column: build_table(df_metadata[column]) for column in ID_COLUMNS if column in df_metadata.columns}
+  dtypes.update({column: text_table for column in text_columns})
+
+  return df_metadata.astype(dtypes)
+
+
+def encode_like(dataframe, df_encoded):
+  '''
+  Returns the entered DF with the id and text columns it shares with an encoded DF encoded with
+  the same tables, so both can be merged and grouped on the codes. Values missing from a table
+  get a missing code.
+
+  Arguments:
+  dataframe(Pandas DataFrame): DF with plain ids or texts, like the view log.
+  df_encoded(Pandas DataFrame): DF encoded by encode_metadata.
+  '''
+  dtypes = {column: df_encoded[column].dtype for column in ID_COLUMNS + TEXT_COLUMNS
+            if column in dataframe.columns and column in df_encoded.columns
+            and isinstance(df_encoded[column].dtype, pd.CategoricalDtype)
+            and dataframe[column].dtype != df_encoded[column].dtype}
+
+  return dataframe.astype(dtypes) if dtypes else dataframe
+
+
+def decode(dataframe):
+  '''
+  Returns the entered DF with its encoded id and text columns, and index, back to their plain
+  values. Meant for the few rows that are shown, like the Top-N of a ranking or the lookups.
+
+  Arguments:
+  dataframe(Pandas DataFrame): DF with columns encoded by encode_metadata.
+  '''
+  dtypes = {column: dataframe[column].cat.categories.dtype for column in ID_COLUMNS + TEXT_COLUMNS
+            if column in dataframe.columns and isinstance(dataframe[column].dtype, pd.CategoricalDtype)}
+  dataframe = dataframe.astype(dtypes) if dtypes else dataframe
+
+  if isinstance(dataframe.index, pd.CategoricalIndex):
+    dataframe = dataframe.set_axis(dataframe.index.astype(dataframe.index.categories.dtype))
+
+  return dataframe
@@ -0,0 +1,54 @@
+import concurrent.futures
+import os
+import threading
+
+
+# How the independent computations of a callback are run: 'thread' fans them out to a thread pool,
+# where pandas and NumPy release the GIL, 'process' to a pool of forked processes, which also runs
+# pure Python work such as building figures in parallel, and 'sequential' runs them one after another.
+EXECUTOR_MODE = os.environ.get('FLOW_EXECUTOR', 'thread')
+EXECUTOR_WORKERS = int(os.environ.get('FLOW_EXECUTOR_WORKERS', min(8, os.cpu_count() or 1)))
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(mode=EXECUTOR_MODE, workers=EXECUTOR_WORKERS):
+  '''
+  Returns the pool of the entered mode shared by the whole process, creating it on first use, or
+  None when the tasks should run sequentially. Pools are created lazily, so gunicorn workers forked
+  from a preloaded master each get their own.
+
+  Arguments:
+  mode(str): 'thread', 'process' or 'sequential'.
+  workers(int): amount of threads or processes of the pool.
+  '''
+  if mode == 'sequential' or workers < 2:
+    return None
+
+  with _pools_lock:
+    key = (mode, workers, os.getpid())
+    if key not in _pools:
+      pool_class = concurrent.futures.ProcessPoolExecutor if mode == 'process' else concurrent.futures.ThreadPoolExecutor
+      _pools[key] = pool_class(max_workers=workers)
+    return _pools[key]
+
+
+def run_tasks(tasks, mode=EXECUTOR_MODE, workers=EXECUTOR_WORKERS):
+  '''
+  Runs every task and returns a dictionary with their results, in the same order as the tasks.
+  Tasks run in a pool when one is available for the mode, or sequentially otherwise.
+
+  Arguments:
+  tasks(dict): callables without arguments, by name. They must be picklable for the 'process' mode.
+  mode(str): 'thread', 'process' or 'sequential'.
+  workers(int): amount of threads or processes of the pool.
+  '''
+  pool = get_pool(mode, workers)
+
+  if pool is None:
+    return {name: task() for name, task in tasks.items()}
+
+  futures = {name: pool.submit(task) for name, task in tasks.items()}
+
+  return {name: future.result() for name, future in futures.items()}
@@ -0,0 +1,145 @@
+import copy
+import re
+import threading
+
+import pandas as pd
+import plotly.express as px
+
+from metrics import timed
+
+
+# Figures with the same arguments and traces only differ in their data arrays and title, so
+# they are built once with plotly express and copied afterwards. Other kinds are always built.
+FIGURE_BUILDERS = {'bar': px.bar, 'line': px.line, 'choropleth': px.choropleth}
+SKELETON_KINDS = ['bar', 'line']
+
+# Hover label and position of every custom data column in the hover template plotly express writes
+CUSTOMDATA_PATTERN = re.compile(r'(?:^|<br>)([^<]*?)=%\{customdata\[(\d+)\]')
+
+_skeletons = {}
+_skeletons_lock = threading.Lock()
+
+
+def trim_figure(figure):
+  '''
+  Returns a figure as a dictionary without its template. Every client receives the template
+  once with the layout, and adds it to the figures in the browser.
+
+  Arguments:
+  figure(plotly Figure): any figure.
+  '''
+  figure = figure.to_plotly_json()
+  figure['layout'].pop('template', None)
+
+  return figure
+
+
+def get_trace_groups(data_frame, color):
+  '''
+  Returns a list of (name, DataFrame) tuples with the rows of every trace plotly express builds
+  for the entered DF, in the same order.
+
+  Arguments:
+  data_frame(Pandas DataFrame): data of the figure.
+  color(str): column every trace is colored by, or None for a single trace.
+  '''
+  if color is None:
+    return [('', data_frame)]
+
+  return [(str(name), group) for name, group in data_frame.groupby(color, sort=False, observed=True)]
+
+
+def get_custom_columns(skeleton, hover_data, labels):
+  '''
+  Returns the list of columns plotly express put in the custom data of a figure, in order, read
+  from the hover template of its first trace. Returns None when a hover label can't be matched to
+  a column, so the figure isn't reused.
+
+  Arguments:
+  skeleton(dict): figure built by plotly express, without template.
+  hover_data(list): columns shown on hover.
+  labels(dict): labels shown instead of the names of some columns.
+  '''
+  if not skeleton['data']:
+    return []
+
+  columns_by_label = {(labels or {}).get(column, column): column for column in hover_data or []}
+  custom_labels = sorted(CUSTOMDATA_PATTERN.findall(skeleton['data'][0].get('hovertemplate', '')), key=lambda match: int(match[1]))
+
+  if any(label not in columns_by_label for label, _ in custom_labels):
+    return None
+
+  return [columns_by_label[label] for label, _ in custom_labels]
+
+
+def get_values(column):
+  '''
+  Returns the values of a column the way plotly express adds them to a trace. Datetimes are
+  converted to Python datetimes, which are serialized without nanoseconds.
+
+  Arguments:
+  column(Pandas Series): column of the data of the figure.
+  '''
+  if pd.api.types.is_datetime64_any_dtype(column):
+    return column.dt.to_pydatetime()
+
+  return column.to_numpy()
+
+
+def fill_skeleton(skeleton, groups, title, x, y, custom_columns):
+  '''
+  Returns a copy of a figure skeleton with the data arrays of every trace and the title replaced.
+
+  Arguments:
+  skeleton(dict): figure built by plotly express, without template.
+  groups(list): (name, DataFrame) tuples of every trace, as returned by get_trace_groups.
+  title(str): title of the figure.
+  x(str): column of the x axis.
+  y(str): column of the y axis.
+  custom_columns(list): columns of the custom data, as returned by get_custom_columns.
+  '''
+  figure = {'data': [], 'layout': copy.deepcopy(skeleton['layout'])}
+  figure['layout']['title']['text'] = title
+
+  for trace, (name, group) in zip(skeleton['data'], groups):
+    trace = {**trace, 'x': get_values(group[x]), 'y': get_values(group[y])}
+    if custom_columns:
+      trace['customdata'] = group[custom_columns].to_numpy()
+    figure['data'].append(trace)
+
+  return figure
+
+
+@timed('figure')
+def build_figure(kind, data_frame, title, **kwargs):
+  '''
+  Returns the figure plotly express builds for the entered arguments, as a dictionary without its
+  template. Bar and line figures are built from a skeleton when one with the same arguments and
+  traces was built before, which only swaps in the data arrays and the title.
+
+  Arguments:
+  kind(str): 'bar', 'line' or 'choropleth'.
+  data_frame(Pandas DataFrame): data of the figure.
+  title(str): title of the figure.
+  kwargs: rest of the arguments of the plotly express function.
+  '''
+  if kind not in SKELETON_KINDS:
+    return trim_figure(FIGURE_BUILDERS[kind](data_frame=data_frame, title=title, **kwargs))
+
+  groups = get_trace_groups(data_frame, kwargs.get('color'))
+  key = (kind, repr(sorted(kwargs.items())), tuple(name for name, _ in groups))
+  skeleton = _skeletons.get(key)
+
+  if skeleton is not None:
+    figure, custom_columns = skeleton
+    return fill_skeleton(figure, groups, title, kwargs['x'], kwargs['y'], custom_columns)
+
+  figure = trim_figure(FIGURE_BUILDERS[kind](data_frame=data_frame, title=title, **kwargs))
+  custom_columns = get_custom_columns(figure, kwargs.get('hover_data'), kwargs.get('labels'))
+
+  # Only reused if plotly express built the traces and custom data we expect, otherwise they're always built
+  if [trace.get('name', '') for trace in figure['data']] == [name for name, _ in groups] and custom_columns is not None:
+    with _skeletons_lock:
+      _skeletons[key] = (figure, custom_columns)
+
+  return figure
@@ -1,23 +1,229 @@
+import os
+
+import numpy as np
 import pandas as pd
-import plotly.express as px
-import pycountry
-from datetime import datetime
+
+from countries import map_countries
+from helpers import map_strings
+from metrics import timed
+
+
+# Views that lasted more than the first and less than the second amount of seconds are drops
+DROP_WINDOW = (int(os.environ.get('FLOW_DROP_MIN_SECONDS', 60)), int(os.environ.get('FLOW_DROP_MAX_SECONDS', 300)))
+
+# Lower bound in minutes of every bin of the duration histograms: one bin per minute for the first
+# half hour, where drops are defined, and wider ones afterwards. The last bin has no upper bound.
+DURATION_BINS = np.array([*range(31), 45, 60, 90, 120, 180, 240], dtype='int32')
+
+
+# 0. Metadata lookups
+# The DataStore precomputes one lookup per key, indexed by it, so the filters only need to
+# deduplicate the metadata when they receive the raw metadata DF.
+@timed('filter')
+def get_metadata_lookup(df_metadata, key):
+  '''
+  Returns a Pandas DataFrame with the metadata of the first asset found for every key,
+  indexed by that key. Lookups already indexed by the key are returned as they are.
+
+  Arguments:
+  df_metadata(Pandas DataFrame): Flow DF with all content metadata, or a lookup built by the DataStore.
+  key(str): 'content_id' or 'asset_id'.
+  '''
+  if df_metadata.index.name == key:
+    return df_metadata
+
+  return df_metadata.drop_duplicates(key).set_index(key)
+
+
+@timed('merge')
+def add_metadata(df_top, df_metadata, left_on, key):
+  '''
+  Returns the entered Pandas DataFrame with the metadata of every row added as new columns.
+
+  Arguments:
+  df_top(Pandas DataFrame): DF with the top ranked entries.
+  df_metadata(Pandas DataFrame): Flow DF with all content metadata, or a lookup built by the DataStore.
+  left_on(str): column of df_top holding the key.
+  key(str): 'content_id' or 'asset_id'.
+  '''
+  df_with_metadata = df_top.join(get_metadata_lookup(df_metadata, key), on=left_on)
+  df_with_metadata[key] = df_with_metadata[left_on]
+
+  return df_with_metadata
+
+
+# Views counting
+# Every filter can work on the raw views, where each row is a single view, or on a slice of the
+# AggregateCube, where each row already holds the amount of views of its keys in a 'views' column.
+def count_views(dataframe, keys, column='views', amount=None):
+  '''
+  Returns a Pandas Series with the amount of views of every key, sorted from the most to the
+  least viewed. Keys without views are left out.
+
+  Arguments:
+  dataframe(Pandas DataFrame): Flow DF with all visualizatons, or a slice of the AggregateCube.
+  keys(str or list): column, or list of columns, to count the views of.
+  column(str): column holding the amount of views when the DF is aggregated.
+  amount(int): if entered, only the most viewed amount of keys are returned.
+  '''
+  # Dictionary-encoded keys are counted on their integer codes, and only the ranked ones are decoded
+  if isinstance(keys, str) and isinstance(dataframe[keys].dtype, pd.CategoricalDtype):
+    return count_codes(dataframe[keys], dataframe[column] if column in dataframe.columns else None, amount)
+
+  if column in dataframe.columns:
+    counts = dataframe.groupby(keys, observed=True, sort=False)[column].sum()
+  else:
+    counts = dataframe.groupby(keys, observed=True, sort=False).size()
+
+  counts = counts[counts > 0]
+
+  # Only the top of the ranking is needed, so we select it instead of sorting every key
+  return counts.nlargest(amount) if amount is not None else counts.sort_values(ascending=False)
+
+
+def count_codes(keys, weights=None, amount=None):
+  '''
+  Returns a Pandas Series with the amount of views of every key of a categorical Series, like
+  count_views does. Views are added up per code with a bincount, keys are ranked in order of
+  appearance, like a groupby, and only the returned ones are decoded.
+
+  Arguments:
+  keys(Pandas Series): categorical Series with the key of every row.
+  weights(Pandas Series): amount of views of every row, or None if every row is a single view.
+  amount(int): if entered, only the most viewed amount of keys are returned.
+  '''
+  codes = keys.cat.codes.to_numpy()
+  is_present = codes >= 0
+  codes = codes[is_present]
+
+  totals = np.bincount(codes, weights[is_present].to_numpy() if weights is not None else None, minlength=len(keys.cat.categories))
+  present_codes = pd.unique(codes)
+  counts = pd.Series(totals[present_codes].astype(weights.dtype if weights is not None else 'int64'), index=present_codes)
+  counts = counts[counts > 0]
+
+  counts = counts.nlargest(amount) if amount is not None else counts.sort_values(ascending=False)
+  counts.index = pd.Index(keys.cat.categories.take(counts.index.to_numpy()), name=keys.name)
+
+  return counts
+
+
+@timed('filter')
+def get_ranking(counts, key):
+  '''
+  Returns a Pandas DataFrame with one row per key and its views, from a Series built by count_views.
+
+  Arguments:
+  counts(Pandas Series): views per key, sorted from the most to the least viewed.
+  key(str): name of the new column holding the keys.
+  '''
+  return pd.DataFrame({key: counts.index.to_numpy(), 'views': counts.to_numpy()})
+
+
+def get_watch_seconds(dataframe):
+  '''
+  Returns a Pandas Series with the seconds every view lasted, as int32. Timestamps are truncated
+  to the minute, as they were when the drop definition was set, so every duration is a whole
+  amount of minutes. Views ending before they start get a negative duration.
+
+  Arguments:
+  dataframe(Pandas DataFrame): Flow DF with all visualizatons.
+  '''
+  tunein, tuneout = [pd.to_datetime(dataframe[column]).to_numpy().astype('datetime64[m]') for column in ['tunein', 'tuneout']]
+  limits = np.iinfo('int32')
+  seconds = np.clip((tuneout - tunein).astype('int64') * 60, limits.min, limits.max)
+
+  return pd.Series(seconds.astype('int32'), index=dataframe.index)
+
+
+@timed('filter')
+def get_potential_drops(dataframe, window=DROP_WINDOW):
+  '''
+  Returns a boolean Pandas Series that is True for every view that lasted more than window[0]
+  and less than window[1] seconds, 1 and 5 minutes by default.
+
+  Arguments:
+  dataframe(Pandas DataFrame): Flow DF with all visualizatons.
+  window(tuple): seconds a view lasts more than and less than to be a drop.
+  '''
+  seconds_watched = get_watch_seconds(dataframe)
+
+  return (seconds_watched > window[0]) & (seconds_watched < window[1])
+
+
+def get_duration_bins(seconds):
+  '''
+  Returns a numpy array with the bin of DURATION_BINS every duration falls into, as int8.
+  Negative durations get -1.
+
+  Arguments:
+  seconds(Pandas Series): seconds every view lasted, built by get_watch_seconds.
+  '''
+  return (np.searchsorted(DURATION_BINS * 60, np.asarray(seconds), side='right') - 1).astype('int8')
+
+
+def get_window_bins(window):
+  '''
+  Returns a boolean numpy array that is True for every bin of DURATION_BINS whose views are all
+  drops for the entered window. Raises a ValueError when a bin is only partly inside the window,
+  as its drops can't be told apart from the rest of its views.
+
+  Arguments:
+  window(tuple): seconds a view lasts more than and less than to be a drop.
+  '''
+  # Durations are whole minutes, so every bin holds the minutes from its lower bound to the next one's, excluded
+  lower = DURATION_BINS * 60
+  upper = np.append(DURATION_BINS[1:] - 1, np.iinfo('int16').max) * 60
+  is_inside = (lower > window[0]) & (upper < window[1])
+  is_outside = (upper <= window[0]) | (lower >= window[1])
+
+  if not (is_inside | is_outside).all():
+    raise ValueError(f'The drop window {window} splits a bin of the duration histograms, whose bounds are {DURATION_BINS.tolist()} minutes')
+
+  return is_inside
+
+
+# A drop window set through the environment that splits a bin stops the startup, instead of every daily ranking
+get_window_bins(DROP_WINDOW)
+
+
+def get_drops(dataframe, window=DROP_WINDOW):
+  '''
+  Returns a Pandas Series with the amount of drops of every row of the entered DF.
+  Rows of the duration histograms of the AggregateCube hold the drops of any window, the asset
+  aggregates only the ones of DROP_WINDOW, and every raw view is a drop or not.
+
+  Arguments:
+  dataframe(Pandas DataFrame): Flow DF with all visualizatons, or a slice of the AggregateCube.
+  window(tuple): seconds a view lasts more than and less than to be a drop.
+  '''
+  if 'duration_bin' in dataframe.columns:
+    # Negative durations are never drops, so they are looked up in a leading False
+    is_drop = np.append(False, get_window_bins(window))[dataframe['duration_bin'].to_numpy().astype('int16') + 1]
+    return dataframe['views'].where(is_drop, 0)
+
+  if 'drops' in dataframe.columns:
+    if tuple(window) != DROP_WINDOW:
+      raise ValueError(f'The asset aggregates only hold the drops of {DROP_WINDOW}, use the duration histograms for other windows')
+    return dataframe['drops']
+
+  return get_potential_drops(dataframe, window).astype('int64')
 
 
 # 1. Most watched movies
+@timed('filter')
 def get_movie_views(dataframe, amount):
   '''
   Returns a dictionary with asset id, number of views and movie title for the selected
   amount of most watched movies in the entered DF.
 
   Arguments:
-  dataframe(Pandas DataFrame): Flow DF with all visualizatons.
+  dataframe(Pandas DataFrame): Flow DF with all visualizatons, or a slice of the AggregateCube.
   amount(str): Integer showing the amount of movies to return.
   '''
   # Filter by type
   f_is_movie = dataframe['show_type'] == 'Película'
   # Get total views per movie
-  df_f_movies = dataframe[f_is_movie][['content_id', 'title']].value_counts()
+  df_f_movies = count_views(dataframe[f_is_movie], ['content_id', 'title'], amount=amount)
   # It's a multi-column value_counts so we get the keys and values and use it to return dictionary for new DF
   top_movies = [item for item in zip(df_f_movies.keys().tolist()[:amount], df_f_movies.tolist()[:amount])]
 
@@ -27,93 +233,105 @@ def get_movie_views(dataframe, amount):
 # 2. Most watched series
 # In the documentation it is specified that all series fall in three categories
 # of 'show_type': <serie>, <web> and <rolling>.
+@timed('filter')
 def get_series_views(dataframe, df_metadata, amount):
   '''
   Returns a Pandas DataFrame with asset id, number of views and series title for the selected
   amount of most watched series in the entered DF.
   
   Arguments:
-  dataframe(Pandas DataFrame): Flow DF with all visualizatons.
-  df_metadata(Pandas DataFrame): Flow DF with all content metadata.
+  dataframe(Pandas DataFrame): Flow DF with all visualizatons, or a slice of the AggregateCube.
+  df_metadata(Pandas DataFrame): Flow DF with all content metadata, or a lookup built by the DataStore.
   amount(str): Integer showing the amount of series to return.
   '''
   # Filter by type
   df_f_is_serie = dataframe['show_type'].isin(['Serie', 'Web', 'Rolling'])
 
   # Series can have multiple chapters, so we keep only the series by its content id
-  unique_series = dataframe[df_f_is_serie]['content_id'].value_counts()
+  unique_series = count_views(dataframe[df_f_is_serie], 'content_id', amount=amount)
 
-  df_unique_series = pd.DataFrame(unique_series).reset_index().rename(columns={'index': 'serie_id', 'content_id': 'views'})
+  df_unique_series = get_ranking(unique_series, 'serie_id')
 
-  return pd.merge(df_unique_series, df_metadata.drop_duplicates('content_id'), left_on='serie_id', right_on='content_id', how='left').head(amount)
+  return add_metadata(df_unique_series.head(amount), df_metadata, 'serie_id', 'content_id')
 
 
 # 3. Most watched TV shows
+@timed('filter')
 def get_shows_watch(dataframe, df_metadata, amount):
   '''
   Returns a Pandas DataFrame with asset id, number of views and show title for the selected
   amount of most watched shows in the entered DF.
   
   Arguments:
-  dataframe(Pandas DataFrame): Flow DF with all visualizatons.
-  df_metadata(Pandas DataFrame): Flow DF with all content metadata.
+  dataframe(Pandas DataFrame): Flow DF with all visualizatons, or a slice of the AggregateCube.
+  df_metadata(Pandas DataFrame): Flow DF with all content metadata, or a lookup built by the DataStore.
   amount(str): Integer showing the amount of shows to return.
   '''
   # Filter by type
   df_f_is_show = dataframe['show_type'].isin(['TV'])
 
-  unique_shows = dataframe[df_f_is_show]['content_id'].value_counts()
+  unique_shows = count_views(dataframe[df_f_is_show], 'content_id', amount=amount)
 
-  pd_shows_unicos = pd.DataFrame(unique_shows).reset_index().rename(columns={'index': 'show_id', 'content_id': 'views'})
+  pd_shows_unicos = get_ranking(unique_shows, 'show_id')
 
-  return pd.merge(pd_shows_unicos, df_metadata.drop_duplicates('content_id'), left_on='show_id', right_on='content_id', how='left').head(amount)
+  return add_metadata(pd_shows_unicos.head(amount), df_metadata, 'show_id', 'content_id')
 
 
 # 4. Most watched episodes
 # On top of general information about show type, since series are the most watched content, let's also
 # get information about the most watched episodes
+@timed('filter')
 def get_mostwatched_episodes(dataframe, df_metadata, amount):
   '''
   Returns a Pandas DataFrame with asset id, number of views and episode title for the selected
   amount of most watched serie episode in the entered DF.
   
   Arguments:
-  dataframe(Pandas DataFrame): Flow DF with all visualizatons.
-  df_metadata(Pandas DataFrame): Flow DF with all content metadata.
+  dataframe(Pandas DataFrame): Flow DF with all visualizatons, or a slice of the AggregateCube.
+  df_metadata(Pandas DataFrame): Flow DF with all content metadata, or a lookup built by the DataStore.
   amount(str): Integer showing the amount of episodes to return.
   '''
   # Filter by type
   df_f_is_serie = dataframe['show_type'].isin(['Serie', 'Web', 'Rolling'])
 
-  mostwatched_episodes = dataframe[df_f_is_serie]['asset_id'].value_counts()
+  mostwatched_episodes = count_views(dataframe[df_f_is_serie], 'asset_id', amount=amount)
 
-  pd_mostwatched_episodes = pd.DataFrame(mostwatched_episodes).reset_index().rename(columns={'index': 'serie_id', 'asset_id': 'views'})
+  pd_mostwatched_episodes = get_ranking(mostwatched_episodes, 'serie_id')
 
-  return pd.merge(pd_mostwatched_episodes, df_metadata.drop_duplicates('asset_id'), left_on='serie_id', right_on='asset_id', how='left').head(amount)
+  return add_metadata(pd_mostwatched_episodes.head(amount), df_metadata, 'serie_id', 'asset_id')
 
 
 # 5 - Connections per device per hour
 # The idea is to see what devices the client use to consume content, and to see
 # how media consumption devices vary through the day
+@timed('filter')
 def get_device_used(dataframe, complete_dataframe):
   '''
   Returns a list of dictionaries with device type, hour of day and amount of views for all the
   content watched in the first DF.
   
   Arguments:
-  dataframe(Pandas DataFrame): Flow DF with all visualizatons.
-  complete_dataframe(Pandas DataFrame): Unfiltered train dataframe to get all available categories.
+  dataframe(Pandas DataFrame): Flow DF with all visualizatons, or the devices slice of the AggregateCube.
+  complete_dataframe(Pandas DataFrame): Unfiltered train dataframe to get all available categories,
+  or the list of devices already ranked by the DataStore.
   '''
   # We get all the available devices from the unfiltered DataFrame
-  base_views = {device: {n: 0 for n in range(24)} for device in complete_dataframe['device_type'].value_counts().keys().to_list()}
+  if isinstance(complete_dataframe, pd.DataFrame):
+    devices = complete_dataframe['device_type'].value_counts().keys().to_list()
+  else:
+    devices = complete_dataframe
 
-  df_device_per_hour = dataframe.copy()
+  base_views = {device: {n: 0 for n in range(24)} for device in devices}
 
-  df_device_per_hour['watch_hour'] = df_device_per_hour.apply(
-      lambda row: int(row['tunein'][11:13]),
-      axis=1)
-  
-  info_dict = df_device_per_hour[['device_type', 'watch_hour']].value_counts()
+  # The AggregateCube already counts views per device and hour
+  if 'views' in dataframe.columns:
+    df_device_per_hour = dataframe
+  else:
+    # We only need the device and the hour, so there's no need to copy the whole DF
+    df_device_per_hour = pd.DataFrame({'device_type': dataframe['device_type'],
+                                       'watch_hour': pd.to_datetime(dataframe['tunein']).dt.hour})
+
+  info_dict = count_views(df_device_per_hour, ['device_type', 'watch_hour'])
 
   views_per_hour_per_device = [item for item in zip(info_dict.keys().tolist(), info_dict.tolist())]
 
@@ -126,69 +344,175 @@ def get_device_used(dataframe, complete_dataframe):
 # 6 - Categories per show type
 # Now we want to get information regardin the most watched categories, and what
 # show types compose those categories
+@timed('filter')
 def get_category_per_showtype(dataframe, amount):
   '''
   Returns a list of dictionaries with device category, show type and amount of views for all the
   content watched in the entered DF.
   
   Arguments:
-  dataframe(Pandas DataFrame): Flow DF with all visualizatons.
+  dataframe(Pandas DataFrame): Flow DF with all visualizatons, or a slice of the AggregateCube.
   amount(str): Integer showing the amount of episodes to return.
   '''
   # We only keep the main show types
   filtered_showtypes = dataframe[dataframe['show_type'].isin(['Serie', 'TV', 'Película'])].copy()
   # We keep only the first (supposedly main) category listed if there are more than none
-  filtered_showtypes['main_category'] = filtered_showtypes.apply(lambda row: row['category'].split('/')[0], axis=1)
+  filtered_showtypes['main_category'] = map_strings(filtered_showtypes['category'], lambda categories: categories.str.split('/').str[0])
   # We keep all the ones that are in the top n selected categories
-  top_categories = filtered_showtypes[filtered_showtypes['main_category'].isin(filtered_showtypes['main_category'].value_counts().keys().to_list()[:amount])]
+  top_categories = filtered_showtypes[filtered_showtypes['main_category'].isin(count_views(filtered_showtypes, 'main_category', amount=amount).keys().to_list())]
 
   # We get the amount of views per device in every category
-  final_list = [combination for combination in zip(top_categories[['main_category', 'show_type']].value_counts().keys().to_list(), top_categories[['main_category', 'show_type']].value_counts().to_list())]
+  views_per_category = count_views(top_categories, ['main_category', 'show_type'])
+  final_list = [combination for combination in zip(views_per_category.keys().to_list(), views_per_category.to_list())]
 
   return [{'category': entry[0][0], 'show_type': entry[0][1], 'views': entry[1]} for entry in final_list]
 
 
 # 7 - Country of origin of all views
 # Now the idea is to see which country the most watched content comes from
+@timed('filter')
 def get_country_from_watched_content(dataset):
   '''
-  Returns a list of dictionaries with country name and amount of individually watched 
-  content for that country, for all the content watched in the entered DF.
+  Returns a list of dictionaries with country ISO alpha_3 code, name and amount of individually
+  watched content for that country, for all the content watched in the entered DF.
   
   Arguments:
-  dataframe(Pandas DataFrame): Flow DF with all visualizatons.
+  dataframe(Pandas DataFrame): Flow DF with all visualizatons, or a slice of the AggregateCube.
   '''
-  # We use the pycountry library to get all alpha_2 (2 digit) country names
-  country_list = {country.alpha_2: country.name for country in pycountry.countries}
+  df_country_from_watched_content = count_views(dataset, 'country_of_origin')
 
-  df_country_from_watched_content = dataset['country_of_origin'].value_counts()
+  # The alpha_2 (2 digit) codes are mapped all at once to the alpha_3 codes used by the map, and their names
+  df_countries = map_countries(df_country_from_watched_content.keys())
 
-  df_countries_with_total = zip(df_country_from_watched_content.keys().to_list(), df_country_from_watched_content.to_list())
+  df_countries_with_total = zip(df_countries['alpha_3'].to_list(), df_countries['name'].to_list(), df_country_from_watched_content.to_list())
 
-  return [{'country': country_list.get(entry[0]), 'views': entry[1]} for entry in df_countries_with_total]
+  return [{'iso_alpha': entry[0], 'country': entry[1], 'views': entry[2]} for entry in df_countries_with_total]
 
 
 # 8 - Potentially dropped content
 # Now we're assuming that if a user starts watching content for more than a minute, and then
 # stops watching it before 5 minutes have elapsed, the user didn't like the content and thus
 # dropped it from his watch list. The idea is to detect content that might not be a good asset.
-def get_potential_most_dropped_content(dataframe, df_metadata, amount):
+@timed('filter')
+def get_potential_most_dropped_content(dataframe, df_metadata, amount, window=DROP_WINDOW):
   '''
   Returns a Pandas DataFrame with the top selected amount of content that the user decided to
   stop watching it before 5 min had elapsed since tune in.
   
   Arguments:
-  dataframe(Pandas DataFrame): Flow DF with all visualizatons.
-  df_metadata(Pandas DataFrame): Flow DF with all content metadata.
+  dataframe(Pandas DataFrame): Flow DF with all visualizatons, or a slice of the AggregateCube.
+  df_metadata(Pandas DataFrame): Flow DF with all content metadata, or a lookup built by the DataStore.
   amount(str): Integer showing the amount of top dropped content to return.
+  window(tuple): seconds a view lasts more than and less than to be a drop.
   '''
-  df_content = dataframe.copy()
-  
-  df_content['seconds_watched'] = df_content.apply(lambda row: (datetime.strptime(row['tuneout'][:16], '%Y-%m-%d %H:%M') - datetime.strptime(row['tunein'][:16], '%Y-%m-%d %H:%M')).seconds, axis=1)
+  # If the user was 1 minute into watching the content but decided to stop before 5 mins, we consider it a drop.
+  df_drops = pd.DataFrame({'content_id': dataframe['content_id'], 'drops': get_drops(dataframe, window)})
+  drops_per_content = count_views(df_drops, 'content_id', column='drops', amount=amount)
 
-  # If the user was 1 minute into watching the content but decided to stop before 5 mins, we consider it a drop:
-  df_content_with_sec = df_content[(df_content['seconds_watched'] > 60) & (df_content['seconds_watched'] < 300)]
-  
-  drop_per_entry = [{'content_id': entry[0], 'drops': entry[1]} for entry in zip(df_content_with_sec['content_id'].value_counts().keys().to_list(), df_content_with_sec['content_id'].value_counts().to_list())]
+  df_drops = get_ranking(drops_per_content, 'content_id').rename(columns={'views': 'drops'})
+
+  return add_metadata(df_drops.head(amount), df_metadata, 'content_id', 'content_id')
+
+
+@timed('filter')
+def get_most_dropped_content_per_showtype(dataframe, df_metadata, amount, show_types, window=DROP_WINDOW):
+  '''
+  Returns a dictionary with a Pandas DataFrame for every entered show type, like the ones returned
+  by get_potential_most_dropped_content. The drops of every show type are counted in a single pass.
+
+  Arguments:
+  dataframe(Pandas DataFrame): Flow DF with all visualizatons, or a slice of the AggregateCube.
+  df_metadata(Pandas DataFrame): Flow DF with all content metadata, or a lookup built by the DataStore.
+  amount(int): amount of top dropped content of every show type to return.
+  show_types(list): show types to rank, like 'Película' or 'Serie'.
+  window(tuple): seconds a view lasts more than and less than to be a drop.
+  '''
+  # Assets of the same content may have different show types, so drops are added up per pair of
+  # show type and content. Pairs are numbered in order of appearance, so ties are ranked like count_views does
+  content_codes, contents = pd.factorize(dataframe['content_id'])
+  show_type_codes, show_type_values = pd.factorize(dataframe['show_type'])
+  is_present = (content_codes >= 0) & (show_type_codes >= 0)
+  pair_codes, pairs = pd.factorize(show_type_codes[is_present].astype('int64') * len(contents) + content_codes[is_present])
+
+  drops = np.bincount(pair_codes, get_drops(dataframe, window).to_numpy()[is_present], minlength=len(pairs))
+  df_drops = pd.DataFrame({'show_type': np.asarray(show_type_values.take(pairs // len(contents))), 'drops': drops.astype('int64')},
+                          index=pd.Index(contents.take(pairs % len(contents)), name='content_id'))
+  df_drops = df_drops[df_drops['drops'] > 0]
+
+  rankings = {}
+  for show_type in show_types:
+    drops_per_content = df_drops.loc[df_drops['show_type'] == show_type, 'drops'].nlargest(amount)
+    df_top = get_ranking(drops_per_content, 'content_id').rename(columns={'views': 'drops'})
+    rankings[show_type] = add_metadata(df_top, df_metadata, 'content_id', 'content_id')
+
+  return rankings
+
+
+# 9 - Concurrent streams
+# Views per hour hide how long every view lasts. What the CDN is sized against is the amount of
+# streams active at the same time, which the AggregateCube counts for every minute.
+@timed('filter')
+def get_concurrent_streams(df_streams, devices, frequency):
+  '''
+  Returns a list of dictionaries with time, device and the peak amount of streams active at the
+  same time in every period of the entered frequency, for every device and for all of them.
+
+  Arguments:
+  df_streams(Pandas DataFrame): active streams per minute, one column per device, built by the AggregateCube.
+  devices(list): devices already ranked by the DataStore, in the order they are shown.
+  frequency(str): Pandas frequency of the periods, like '15min' or '1H'.
+  '''
+  df_streams = df_streams.reindex(columns=devices, fill_value=0)
+  # The peak of all the devices is the one of their sum, not the sum of their peaks
+  df_peaks = df_streams.assign(Total=df_streams.sum(axis=1)).resample(frequency).max()
+
+  return [{'time': time, 'device': device, 'streams': int(streams)}
+          for time, row in zip(df_peaks.index, df_peaks.to_numpy()) for device, streams in zip(df_peaks.columns, row)]
+
+
+@timed('filter')
+def get_peak_concurrency(df_streams):
+  '''
+  Returns a list with a dictionary holding the minute with the most streams active at the same
+  time, and their amount.
+
+  Arguments:
+  df_streams(Pandas DataFrame): active streams per minute, one column per device, built by the AggregateCube.
+  '''
+  total_streams = df_streams.sum(axis=1)
+
+  if total_streams.empty:
+    return [{'time': None, 'streams': 0}]
+
+  return [{'time': total_streams.idxmax(), 'streams': int(total_streams.max())}]
+
+
+# 10 - Most watched seasons
+# Series are ranked as a whole and episodes one by one, seasons sit in between. The season of every
+# asset comes from the title index of the DataStore, so no title is parsed while ranking.
+@timed('filter')
+def get_season_views(dataframe, title_index, amount):
+  '''
+  Returns a Pandas DataFrame with content id, serie title, season and number of views for the
+  selected amount of most watched seasons in the entered DF.
+
+  Arguments:
+  dataframe(Pandas DataFrame): Flow DF with all visualizatons, or a slice of the AggregateCube.
+  title_index(Pandas DataFrame): content id, serie title, season and episode of every asset, built by the DataStore.
+  amount(int): amount of seasons to return.
+  '''
+  df_f_is_serie = dataframe['show_type'].isin(['Serie', 'Web', 'Rolling'])
+
+  # Views are counted per asset first, so only the assets with views are looked up
+  views_per_asset = count_views(dataframe[df_f_is_serie], 'asset_id')
+  df_assets = title_index.reindex(views_per_asset.index)[['content_id', 'clean_title', 'season']].assign(views=views_per_asset.to_numpy())
+  # Titles without season, like 'Ep:04 Peaky Blinders', are indexed as season -1 and left out
+  df_assets = df_assets[df_assets['season'] >= 0]
+
+  season_views = count_views(df_assets, ['content_id', 'season'], amount=amount)
+  clean_titles = df_assets.drop_duplicates(['content_id', 'season']).set_index(['content_id', 'season'])['clean_title']
 
-  return pd.DataFrame(drop_per_entry).merge(df_metadata.drop_duplicates(subset=['content_id']), on='content_id', how='left').head(amount)
+  return pd.DataFrame({'content_id': season_views.index.get_level_values('content_id'),
+                       'clean_title': clean_titles.reindex(season_views.index).to_numpy(),
+                       'season': season_views.index.get_level_values('season'),
+                       'views': season_views.to_numpy()})
@@ -0,0 +1,29 @@
+import os
+
+import startup
+
+# Settings for running the dashboard with gunicorn, read by default from the current directory:
+#   gunicorn
+# With FLOW_PRELOAD=1 the master loads the data once and forks the workers, which share its memory
+# instead of loading their own copy, so adding workers costs little more than their own caches.
+wsgi_app = 'index:server'
+bind = os.environ.get('FLOW_BIND', '0.0.0.0:3569')
+workers = int(os.environ.get('FLOW_WORKERS', 2))
+preload_app = startup.PRELOAD
+# Figures of long ranges can take a while on the first request
+timeout = 120
+
+# The threads of the background jobs wouldn't survive the fork, so the preloading master leaves
+# them to the workers
+startup.defer_jobs = preload_app
+
+
+def when_ready(server):
+    # Runs in the master once the app is loaded, right before the workers are forked
+    if preload_app:
+        startup.freeze_heap()
+
+
+def post_fork(server, worker):
+    if preload_app:
+        startup.start_deferred_jobs()
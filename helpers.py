@@ -1,3 +1,22 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+
+# Key format and pandas frequency of every date index
+DATE_INDEXES = {'day': ('%Y-%m-%d', 'D'), 'month': ('%Y-%m', 'MS')}
+
+# Date ranges are kept as a single period, like '2021-03-01/2021-03-07', with both days included
+RANGE_SEPARATOR = '/'
+
+# Words holding the season or episode number, such as 'T:3' or 'Ep:02'
+EPISODE_INFO_PATTERN = re.compile(r'(?<!\S)(?:T:|Ep:)\S*')
+# Season and episode numbers of those words
+SEASON_PATTERN = re.compile(r'(?<!\S)T:(\d+)')
+EPISODE_PATTERN = re.compile(r'(?<!\S)Ep:(\d+)')
+
+
 def get_clean_serie_name(serie_title):
   '''
   Eliminates the episode and season information from an episode name, returning the serie title alone.
@@ -14,3 +33,101 @@ def get_clean_serie_name(serie_title):
       sanitized_name.append(word)
 
   return ' '.join(sanitized_name)
+
+
+def map_strings(series, function):
+  '''
+  Returns the result of applying a vectorized string function to a Pandas Series. For categorical
+  Series the function only runs once per category, and the results are spread with the codes.
+
+  Arguments:
+  series(Pandas Series): Series with string or categorical values.
+  function(callable): receives a Series of strings and returns a Series of the same length.
+  '''
+  if not isinstance(series.dtype, pd.CategoricalDtype):
+    return function(series)
+
+  mapped_categories = function(pd.Series(series.cat.categories)).to_numpy(dtype=object)
+  codes = series.cat.codes.to_numpy()
+
+  return pd.Series(np.where(codes >= 0, mapped_categories.take(codes), np.nan), index=series.index, name=series.name)
+
+
+def get_clean_serie_names(serie_titles):
+  '''
+  Eliminates the episode and season information from every episode name in a Pandas Series,
+  returning a Series with the serie titles alone. Same output as get_clean_serie_name, computed
+  with vectorized string methods.
+
+  Arguments:
+  serie_titles(Pandas Series): contains episode titles with the strings 'T:<N>' or 'Ep:<NN>' in them.
+  '''
+  return map_strings(serie_titles, lambda titles: titles.str.replace(EPISODE_INFO_PATTERN, '', regex=True).str.split().str.join(' '))
+
+
+def parse_serie_titles(serie_titles):
+  '''
+  Returns a Pandas DataFrame with the serie title alone, the season and the episode of every episode
+  name in a Pandas Series. Titles are cleaned like get_clean_serie_names does, and seasons and
+  episodes are stored as int16, with -1 for the titles missing them, since some series have a season 0.
+
+  Arguments:
+  serie_titles(Pandas Series): contains episode titles with the strings 'T:<N>' or 'Ep:<NN>' in them.
+  '''
+  titles = serie_titles.astype(object)
+  limits = np.iinfo('int16')
+  numbers = {column: pd.to_numeric(titles.str.extract(pattern, expand=False), errors='coerce').clip(upper=limits.max).fillna(-1).astype('int16')
+             for column, pattern in [('season', SEASON_PATTERN), ('episode', EPISODE_PATTERN)]}
+
+  return pd.DataFrame({'clean_title': get_clean_serie_names(titles), **numbers}, index=serie_titles.index)
+
+
+def build_date_index(tunein, period):
+  '''
+  Returns a dictionary mapping every day or month with views to its (start, end) row offsets
+  in the entered datetime column, which must be sorted.
+
+  Arguments:
+  tunein(Pandas Series): sorted datetime64 column, such as the tune in of every view.
+  period(str): 'day' or 'month', one of the keys of DATE_INDEXES.
+  '''
+  key_format, frequency = DATE_INDEXES[period]
+
+  if tunein.empty:
+    return {}
+
+  first = tunein.iloc[0].normalize()
+  first = first.replace(day=1) if period == 'month' else first
+  # One boundary per period plus the closing one, each located with a binary search
+  boundaries = pd.date_range(first, tunein.iloc[-1], freq=frequency)
+  boundaries = boundaries.append(pd.DatetimeIndex([boundaries[-1] + pd.tseries.frequencies.to_offset(frequency)]))
+  offsets = np.searchsorted(tunein.values, boundaries.values)
+
+  return {boundary.strftime(key_format): (int(start), int(end))
+          for boundary, start, end in zip(boundaries, offsets[:-1], offsets[1:]) if end > start}
+
+
+def format_range(start, end):
+  '''
+  Returns the period of a range of days, as '<start>/<end>' with both days in 'YYYY-MM-DD' format.
+
+  Arguments:
+  start(str): first day of the range.
+  end(str): last day of the range, included.
+  '''
+  return f'{str(start)[:10]}{RANGE_SEPARATOR}{str(end)[:10]}'
+
+
+def parse_range(period):
+  '''
+  Returns the first and last day of a range period built by format_range, or None if the
+  entered period is a single day or month.
+
+  Arguments:
+  period(str): day, month or range of days.
+  '''
+  if RANGE_SEPARATOR not in str(period):
+    return None
+
+  start, end = str(period).split(RANGE_SEPARATOR)
+  return start, end
@@ -1,43 +1,95 @@
-import dash_core_components as dcc
-import dash_html_components as html
-from dash.dependencies import Input, Output
+import logging
+import time
 
-from app import app
+from startup import PRELOAD, jobs, phases, preload, start_background_jobs, timed_phase
 
-from pages import daily_stats, monthly_stats
+start = time.perf_counter()
+logging.basicConfig(level=logging.INFO)
 
+with timed_phase('import dash'):
+    import flask
 
-app.layout = html.Div([
-    dcc.Location(id='url', refresh=False),
-    html.Img(src='assets/logo.webp', id='logo'),
-    html.Hr(),
-    html.Div([
-        html.P('Mostrar reporte:'),
-        dcc.Link('Diario', href='/diario'),
-        html.P('|'),
-        dcc.Link('Mensual', href='/mensual'),
-    ], className="link-row"),
-    html.Hr(),
+    import dash_core_components as dcc
+    import dash_html_components as html
+    from dash.dependencies import Input, Output
 
-    html.Div(id='page-content', children=[]),
+    # server is the WSGI app run by gunicorn, as index:server
+    from app import app, server
 
-    html.Div(html.P(['<> with ☕ by ',
-                    html.A('Nachichuri', href='https://github.com/Nachichuri', target='_blank'),
-                    ' - Source code available on ',
-                    html.A('Github', href='https://github.com/Nachichuri/datathon21-dataviz-challenge', target='_blank')]),
-            id='credits')
-], id='main-cont')
+# Registering the pages only declares their callbacks, their data and plotting modules load on first use
+with timed_phase('register pages'):
+    from pages import daily_stats, monthly_stats, range_stats
+
+
+# The layout is served by a function, so the flow template is only built once a client asks for it
+def serve_layout():
+    from assets.template import get_flow_template_data
+
+    return html.Div([
+        dcc.Location(id='url', refresh=False),
+        dcc.Store(id='flow_template', data=get_flow_template_data()),
+        html.Img(src='assets/logo.webp', id='logo'),
+        html.Hr(),
+        html.Div([
+            html.P('Mostrar reporte:'),
+            dcc.Link('Diario', href='/diario'),
+            html.P('|'),
+            dcc.Link('Mensual', href='/mensual'),
+            html.P('|'),
+            dcc.Link('Rango', href='/rango'),
+        ], className="link-row"),
+        html.Hr(),
+
+        html.Div(id='page-content', children=[]),
+
+        html.Div(html.P(['<> with ☕ by ',
+                        html.A('Nachichuri', href='https://github.com/Nachichuri', target='_blank'),
+                        ' - Source code available on ',
+                        html.A('Github', href='https://github.com/Nachichuri/datathon21-dataviz-challenge', target='_blank')]),
+                id='credits')
+    ], id='main-cont')
+
+
+app.layout = serve_layout
 
 
 @app.callback(Output('page-content', 'children'),
               [Input('url', 'pathname')])
 def display_page(pathname):
     if pathname == '/diario':
-        return daily_stats.layout
+        return daily_stats.get_layout()
     if pathname == '/mensual':
-        return monthly_stats.layout
+        return monthly_stats.get_layout()
+    if pathname == '/rango':
+        return range_stats.get_layout()
     else:
-        return daily_stats.layout
+        return daily_stats.get_layout()
+
+
+# With FLOW_PRELOAD=1 the data is loaded before serving, instead of on the first request
+if PRELOAD:
+    preload()
+
+# The figures of every period are precomputed in the background, so the server is ready right away,
+# and new CSV drops are appended to the running store, without restarting the workers. A preloading
+# gunicorn master defers them until every worker is forked
+with timed_phase('start background jobs'):
+    start_background_jobs({'daily': daily_stats.update_graph.__wrapped__,
+                           'monthly': monthly_stats.update_graph.__wrapped__})
+
+phases['total'] = round(time.perf_counter() - start, 3)
+logging.getLogger(__name__).info('Started in %.3fs: %s', phases['total'], phases)
+
+
+@app.server.route('/warmup')
+def warmup_progress():
+    warmup = jobs['warmup']
+    return flask.jsonify(warmup.get_progress() if warmup else {'enabled': False})
+
+
+@app.server.route('/startup')
+def startup_phases():
+    return flask.jsonify(phases)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,159 @@
+import bisect
+import contextlib
+import functools
+import os
+import threading
+import time
+
+
+# Setting FLOW_METRICS=1 times every step of the callbacks and serves the histograms at /metrics,
+# in the Prometheus text format. Disabled steps aren't wrapped at all, so they cost nothing.
+METRICS_ENABLED = os.environ.get('FLOW_METRICS', '0') == '1'
+METRICS_PATH = '/metrics'
+# Upper bounds in seconds of the buckets of every histogram
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Histogram:
+  '''
+  Latency histogram with one series per set of labels, rendered in the Prometheus text format.
+  Every observation only increments a bucket, its sum and its count.
+
+  Arguments:
+  name(str): name of the metric.
+  description(str): help text of the metric.
+  label_names(tuple): names of the labels of every series.
+  buckets(tuple): upper bounds of the buckets, in increasing order.
+  '''
+
+  def __init__(self, name, description, label_names, buckets=BUCKETS):
+    self.name = name
+    self.description = description
+    self.label_names = label_names
+    self.buckets = buckets
+    self._series = {}
+    self._lock = threading.Lock()
+
+  def observe(self, labels, seconds):
+    '''
+    Records a duration in the series of the entered labels.
+
+    Arguments:
+    labels(tuple): value of every label, in the order of label_names.
+    seconds(float): duration to record.
+    '''
+    with self._lock:
+      series = self._series.get(labels)
+      if series is None:
+        # One counter per bucket plus the +Inf one, then the sum and count of the series
+        series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+      series[bisect.bisect_left(self.buckets, seconds)] += 1
+      series[-2] += seconds
+      series[-1] += 1
+
+  def render(self):
+    '''
+    Returns the histogram in the Prometheus text format, with cumulative buckets.
+    '''
+    lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+
+    with self._lock:
+      series = {labels: list(values) for labels, values in self._series.items()}
+
+    for labels, values in sorted(series.items()):
+      label_pairs = ','.join(f'{name}="{value}"' for name, value in zip(self.label_names, labels))
+      cumulative = 0
+      for bound, count in zip([*self.buckets, '+Inf'], values):
+        cumulative += count
+        lines.append(f'{self.name}_bucket{{{label_pairs},le="{bound}"}} {cumulative}')
+      lines.append(f'{self.name}_sum{{{label_pairs}}} {values[-2]}')
+      lines.append(f'{self.name}_count{{{label_pairs}}} {values[-1]}')
+
+    return '\n'.join(lines) + '\n'
+
+  def clear(self):
+    '''
+    Removes every series of the histogram.
+    '''
+    with self._lock:
+      self._series.clear()
+
+
+step_seconds = Histogram('flow_step_seconds', 'Seconds taken by every step of the dashboard requests.', ('step', 'name'))
+
+
+@contextlib.contextmanager
+def _timed_block(step, name):
+  start = time.perf_counter()
+  try:
+    yield
+  finally:
+    step_seconds.observe((step, name), time.perf_counter() - start)
+
+
+def timed_step(step, name):
+  '''
+  Returns a context manager recording the seconds taken by its block, or one doing nothing when
+  metrics are disabled.
+
+  Arguments:
+  step(str): kind of step, like 'slice', 'filter', 'figure' or 'serialize'.
+  name(str): name of the step within its kind.
+  '''
+  if not METRICS_ENABLED:
+    return contextlib.nullcontext()
+
+  return _timed_block(step, name)
+
+
+def timed(step):
+  '''
+  Decorator recording the seconds taken by every call of a function, named after it. When metrics
+  are disabled the function is returned as it is.
+
+  Arguments:
+  step(str): kind of step, like 'slice', 'filter', 'figure' or 'serialize'.
+  '''
+  def decorator(function):
+    if not METRICS_ENABLED:
+      return function
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+      start = time.perf_counter()
+      try:
+        return function(*args, **kwargs)
+      finally:
+        step_seconds.observe((step, function.__name__), time.perf_counter() - start)
+
+    return wrapper
+
+  return decorator
+
+
+def register_metrics(server):
+  '''
+  Times every request of the Flask server, and serves the histograms of the process at METRICS_PATH.
+  Steps run in process pools by the executor are timed in the pool workers, so they aren't served.
+
+  Arguments:
+  server(Flask): server of the Dash app.
+  '''
+  import flask
+
+  @server.before_request
+  def start_request_timer():
+    flask.g.metrics_start = time.perf_counter()
+
+  @server.after_request
+  def observe_request(response):
+    start = flask.g.pop('metrics_start', None)
+    # Requests are labeled by their route, so every asset doesn't get its own series
+    rule = flask.request.url_rule.rule if flask.request.url_rule else 'unmatched'
+    if start is not None and rule != METRICS_PATH:
+      step_seconds.observe(('request', rule), time.perf_counter() - start)
+    return response
+
+  @server.route(METRICS_PATH)
+  def serve_metrics():
+    return flask.Response(step_seconds.render(), mimetype='text/plain; version=0.0.4')
@@ -1,223 +1,268 @@
-import pathlib
-import pandas as pd
-import plotly.express as px
-import plotly.io as pio
-from assets.template import get_flow_template
+import functools
+
 from datetime import datetime
 
 import dash_core_components as dcc
 import dash_html_components as html
-from dash.dependencies import Input, Output
-from datetime import datetime
+from dash.dependencies import ClientsideFunction, Input, Output, State
 
-from filters import get_movie_views, get_series_views, get_shows_watch, get_mostwatched_episodes, get_device_used, get_category_per_showtype, get_potential_most_dropped_content
-from helpers import get_clean_serie_name
+from cache import memoize_figures
+from executor import run_tasks
 
 from app import app
 
-DATA_PATH = pathlib.Path(__file__).parent.joinpath("../data").resolve()
-
 ########################################
 # 1. First let's import the data
 ########################################
 
-df_base_train = pd.read_csv(f'{DATA_PATH}/train.csv')
-df_base_metadata = pd.read_csv(f'{DATA_PATH}/metadata.csv', delimiter=';')
-
-first_date = datetime.strptime(sorted(df_base_train['tunein'].str[0:10].value_counts().keys().to_list())[0], '%Y-%m-%d').date()
-last_date = datetime.strptime(sorted(df_base_train['tunein'].str[0:10].value_counts().keys().to_list())[-1], '%Y-%m-%d').date()
+# Both pages share the same store, so the datasets are only loaded and joined once per worker.
+# The store, plotly express and the rankings are imported on first use instead of when the page is
+# registered, so starting a worker doesn't wait for them (see startup.preload)
 
 
 ########################################
 # 2. App layout
 ########################################
 
-pio.templates['flow_theme'] = get_flow_template()
+def get_layout():
+    from datastore import get_store
+    from filters import DROP_WINDOW
 
-layout = html.Div([
-    html.H1('Estadísticas diarias', className='section-title'),
-    # Inputs
-    html.Div([
+    # The layout is built on every visit, so the dates picked up by appended views are offered
+    store = get_store()
+    first_date = store.first_date
+    last_date = store.last_date
+
+    return html.Div([
+        html.H1('Estadísticas diarias', className='section-title'),
+        # Inputs
+        html.Div([
+            html.Div([
+                html.H2('Fecha:'),
+                dcc.DatePickerSingle(
+                    id='date-picker-single',
+                    min_date_allowed=first_date,
+                    max_date_allowed=last_date,
+                    date=last_date,
+                    display_format='DD/MM/YYYY'
+                    )],
+                className='selector-container'),
+            html.Div([
+                html.H2('Cantidad:'),
+                dcc.Dropdown(
+                    id="slct_amount",
+                    options=[
+                        {"label": "Top 3", "value": 3},
+                        {"label": "Top 5", "value": 5},
+                        {"label": "Top 10", "value": 10}],
+                    multi=False,
+                    clearable=False,
+                    value=5,
+                    style={'width': "40%"}
+                    )],
+                className='selector-container')
+        ], className='main-selector'),
+        # Plots
+        html.Br(),
+        html.Div([
+            dcc.Graph(id='daily_series', figure={}),
+            dcc.Graph(id='daily_episodes', figure={})
+            ], className='graph-container'),
+        html.Br(),
         html.Div([
-            html.H2('Fecha:'),
-            dcc.DatePickerSingle(
-                id='date-picker-single',
-                min_date_allowed=first_date,
-                max_date_allowed=last_date,
-                date=last_date,
-                display_format='DD/MM/YYYY'
-                )],
-            className='selector-container'),
+            dcc.Graph(id='daily_movies', figure={}),
+            dcc.Graph(id='daily_shows', figure={})
+            ], className='graph-container'),
+        html.Br(),
+        dcc.Graph(id='daily_device_used', figure={}),
+        html.Br(),
+        dcc.Graph(id='daily_concurrency', figure={}),
+        html.Br(),
+        dcc.Graph(id='daily_category_per_showtype', figure={}),
+        html.Br(),
         html.Div([
-            html.H2('Cantidad:'),
-            dcc.Dropdown(
-                id="slct_amount",
-                options=[
-                    {"label": "Top 3", "value": 3},
-                    {"label": "Top 5", "value": 5},
-                    {"label": "Top 10", "value": 10}],
-                multi=False,
-                clearable=False,
-                value=5,
-                style={'width': "40%"}
-                )],
-            className='selector-container')
-    ], className='main-selector'),
-    # Plots
-    html.Br(),
-    html.Div([
-        dcc.Graph(id='daily_series', figure={}),
-        dcc.Graph(id='daily_episodes', figure={})
-        ], className='graph-container'),
-    html.Br(),
-    html.Div([
-        dcc.Graph(id='daily_movies', figure={}),
-        dcc.Graph(id='daily_shows', figure={})
-        ], className='graph-container'),
-    html.Br(),
-    dcc.Graph(id='daily_device_used', figure={}),
-    html.Br(),
-    dcc.Graph(id='daily_category_per_showtype', figure={}),
-    html.Br(),
-    html.Div([
-        dcc.Graph(id='daily_dropped_movies', figure={}),
-        dcc.Graph(id='daily_dropped_series', figure={})
-        ], className='graph-container'),
-    html.P('* Se entiende como "dropeado" al total de reproducciones que finalizaron antes de los 5 minutos de visualización.')
-])
+            dcc.Graph(id='daily_dropped_movies', figure={}),
+            dcc.Graph(id='daily_dropped_series', figure={})
+            ], className='graph-container'),
+        html.P(f'* Se entiende como "dropeado" al total de reproducciones que finalizaron entre {DROP_WINDOW[0] // 60} y {DROP_WINDOW[1] // 60} minutos de visualización.'),
+        # Figures of the period, without their template
+        dcc.Store(id='daily_figures')
+    ])
 
 
 ########################################
 # 3. Callbacks
 ########################################
 
-@app.callback(
+# The figures of a period are sent once to a store with their Top 10 and without their template.
+# The browser slices them for the selected amount and adds the template every client receives once
+# with the layout, so changing the amount doesn't reach the server (see assets/figures.js)
+app.clientside_callback(
+    ClientsideFunction(namespace='flow', function_name='slice_figures'),
     [Output(component_id='daily_series', component_property='figure'),
      Output(component_id='daily_episodes', component_property='figure'),
      Output(component_id='daily_movies', component_property='figure'),
      Output(component_id='daily_shows', component_property='figure'),
      Output(component_id='daily_device_used', component_property='figure'),
+     Output(component_id='daily_concurrency', component_property='figure'),
      Output(component_id='daily_category_per_showtype', component_property='figure'),
      Output(component_id='daily_dropped_movies', component_property='figure'),
      Output(component_id='daily_dropped_series', component_property='figure')],
-    
-    [Input(component_id='date-picker-single', component_property='date'),
-     Input(component_id='slct_amount', component_property='value')]
+    [Input(component_id='daily_figures', component_property='data'),
+     Input(component_id='slct_amount', component_property='value')],
+    [State(component_id='flow_template', component_property='data')]
+)
+
+
+@app.callback(
+    Output(component_id='daily_figures', component_property='data'),
+    [Input(component_id='date-picker-single', component_property='date')]
 )
-def update_graph(date_slctd, amount_slctd):
+@memoize_figures('daily')
+def update_graph(date_slctd):
+    from assets.template import register_flow_template
+    from figures import build_figure
+    from rankings import MAX_AMOUNT, get_rankings, get_slicing
+
+    register_flow_template()
 
     parsed_date = datetime.strptime(date_slctd, '%Y-%m-%d').strftime('%d/%m/%Y')
 
-    df_base_daily = df_base_train[df_base_train['tunein'].str.startswith(str(date_slctd))].merge(df_base_metadata, on='asset_id')
-
-    df_daily_movies = pd.DataFrame(get_movie_views(df_base_daily, amount_slctd))
-    df_daily_series = get_series_views(df_base_daily, df_base_metadata, amount_slctd)
-    # The series include season and episode in every title, so we clean it for display in a new column:
-    df_daily_series['clean_title'] = df_daily_series.apply(lambda row: get_clean_serie_name(row['title']), axis=1)
-    df_daily_shows = get_shows_watch(df_base_daily, df_base_metadata, amount_slctd)
-    df_daily_episodes = get_mostwatched_episodes(df_base_daily, df_base_metadata, amount_slctd)
-    df_daily_device_used = pd.DataFrame(get_device_used(df_base_daily, df_base_train))
-    df_daily_category_per_showtype = pd.DataFrame(get_category_per_showtype(df_base_daily, amount_slctd))
-    df_potentially_dropped_movies = get_potential_most_dropped_content(df_base_daily[df_base_daily['show_type'] == 'Película'], df_base_metadata, amount_slctd)
-    df_potentially_dropped_series = get_potential_most_dropped_content(df_base_daily[df_base_daily['show_type'] == 'Serie'], df_base_metadata, amount_slctd)
-    df_potentially_dropped_series['clean_title'] = df_potentially_dropped_series.apply(lambda row: get_clean_serie_name(row['title']), axis=1)
-
-    daily_movies = px.bar(
-        data_frame=df_daily_movies,
-        x='title',
-        y='views',
-        hover_data=['views', 'asset_id'],
-        labels={'title': 'Nombre de la película',
-                'views': 'Visualizaciones'},
-        template='flow_theme',
-        title=f'Películas más vistas el {parsed_date}'
-    )
-
-    daily_series = px.bar(
-        data_frame=df_daily_series,
-        x='clean_title',
-        y='views',
-        hover_data=['views', 'serie_id'],
-        labels={'clean_title': 'Nombre de la serie',
-                'views': 'Visualizaciones',
-                'serie_id': 'asset_id'},
-        template='flow_theme',
-        title=f'Series más vistas el {parsed_date}'
-    )
-
-    daily_shows = px.bar(
-        data_frame=df_daily_shows,
-        x='title',
-        y='views',
-        hover_data=['views', 'episode_title', 'show_id'],
-        labels={'title': 'Nombre del show',
-                'episode_title': 'Título',
-                'views': 'Visualizaciones',
-                'show_id': 'asset_id'},
-        template='flow_theme',
-        title=f'Shows de TV más vistos el {parsed_date}'
-    )
-
-    daily_episodes = px.bar(
-        data_frame=df_daily_episodes,
-        x='title',
-        y='views',
-        hover_data=['views', 'episode_title', 'serie_id'],
-        labels={'title': 'Nombre del episodio',
-                'episode_title': 'Título',
-                'views': 'Visualizaciones',
-                'serie_id': 'asset_id'},
-        template='flow_theme',
-        title=f'Episodios con más visualizaciones el {parsed_date}'
-    )
-
-    daily_device_used = px.line(
-        data_frame=df_daily_device_used,
-        x='hour',
-        y='views',
-        color='device',
-        template='flow_theme',
-        hover_data=['device', 'hour', 'views'],
-        labels={'device': 'Dispositivo',
-                'hour': 'Horario',
-                'views': 'Visualizaciones'},
-        title=f'Consumo de contenido por dispositivo el {parsed_date}'
-    )
-
-    daily_category_per_showtype = px.bar(
-        data_frame=df_daily_category_per_showtype,
-        x='category',
-        y='views',
-        color='show_type',
-        template='flow_theme',
-        hover_data=['category', 'show_type', 'views'],
-        labels={'category': 'Categoría',
-                'show_type': 'Tipo de show',
-                'views': 'Visualizaciones'},
-        title=f'Categorías con más visualizaciones el {parsed_date}'
-    )
-
-    daily_potentially_dropped_movies = px.bar(
-        data_frame=df_potentially_dropped_movies,
-        x='title',
-        y='drops',
-        hover_data=['drops', 'content_id'],
-        labels={'title': 'Nombre de la película',
-                'drops': 'Drops'},
-        template='flow_theme',
-        title=f'Películas más dropeadas* el {parsed_date}',
-    )
-
-    daily_potentially_dropped_series = px.bar(
-        data_frame=df_potentially_dropped_series,
-        x='clean_title',
-        y='drops',
-        hover_data=['drops', 'content_id'],
-        labels={'clean_title': 'Nombre de la serie',
-                'drops': 'Drops'},
-        template='flow_theme',
-        title=f'Series más dropeadas* el {parsed_date}',
-    )
-
-
-    return daily_series, daily_episodes, daily_movies, daily_shows, daily_device_used, daily_category_per_showtype, daily_potentially_dropped_movies, daily_potentially_dropped_series
\ No newline at end of file
+    # Rankings are computed once per day from its pre-counted views, and the browser slices them for the selected amount
+    rankings = get_rankings('daily', date_slctd, MAX_AMOUNT)
+
+    df_daily_movies = rankings['movies']
+    df_daily_series = rankings['series']
+    df_daily_shows = rankings['shows']
+    df_daily_episodes = rankings['episodes']
+    df_daily_device_used = rankings['device_used']
+    df_daily_concurrency = rankings['concurrency']
+    # Minute with the most streams active at the same time, over all the devices
+    peak = rankings['peak_concurrency'].iloc[0]
+    peak_streams = peak['streams']
+    peak_time = peak['time'].strftime('%H:%M') if peak_streams else '-'
+    df_daily_category_per_showtype = rankings['category_per_showtype']
+    df_potentially_dropped_movies = rankings['dropped_movies']
+    df_potentially_dropped_series = rankings['dropped_series']
+
+    # The figures don't depend on each other, so they are built through the executor
+    figures = run_tasks({
+        'daily_movies': functools.partial(build_figure, 'bar',
+            data_frame=df_daily_movies,
+            x='title',
+            y='views',
+            hover_data=['views', 'asset_id'],
+            labels={'title': 'Nombre de la película',
+                    'views': 'Visualizaciones'},
+            template='flow_theme',
+            title=f'Películas más vistas el {parsed_date}'
+        ),
+
+        'daily_series': functools.partial(build_figure, 'bar',
+            data_frame=df_daily_series,
+            x='clean_title',
+            y='views',
+            hover_data=['views', 'serie_id'],
+            labels={'clean_title': 'Nombre de la serie',
+                    'views': 'Visualizaciones',
+                    'serie_id': 'asset_id'},
+            template='flow_theme',
+            title=f'Series más vistas el {parsed_date}'
+        ),
+
+        'daily_shows': functools.partial(build_figure, 'bar',
+            data_frame=df_daily_shows,
+            x='title',
+            y='views',
+            hover_data=['views', 'episode_title', 'show_id'],
+            labels={'title': 'Nombre del show',
+                    'episode_title': 'Título',
+                    'views': 'Visualizaciones',
+                    'show_id': 'asset_id'},
+            template='flow_theme',
+            title=f'Shows de TV más vistos el {parsed_date}'
+        ),
+
+        'daily_episodes': functools.partial(build_figure, 'bar',
+            data_frame=df_daily_episodes,
+            x='title',
+            y='views',
+            hover_data=['views', 'episode_title', 'serie_id'],
+            labels={'title': 'Nombre del episodio',
+                    'episode_title': 'Título',
+                    'views': 'Visualizaciones',
+                    'serie_id': 'asset_id'},
+            template='flow_theme',
+            title=f'Episodios con más visualizaciones el {parsed_date}'
+        ),
+
+        'daily_device_used': functools.partial(build_figure, 'line',
+            data_frame=df_daily_device_used,
+            x='hour',
+            y='views',
+            color='device',
+            template='flow_theme',
+            hover_data=['device', 'hour', 'views'],
+            labels={'device': 'Dispositivo',
+                    'hour': 'Horario',
+                    'views': 'Visualizaciones'},
+            title=f'Consumo de contenido por dispositivo el {parsed_date}'
+        ),
+
+        'daily_concurrency': functools.partial(build_figure, 'line',
+            data_frame=df_daily_concurrency,
+            x='time',
+            y='streams',
+            color='device',
+            template='flow_theme',
+            hover_data=['device', 'time', 'streams'],
+            labels={'device': 'Dispositivo',
+                    'time': 'Horario',
+                    'streams': 'Streams simultáneos'},
+            title=f'Pico de streams simultáneos cada 15 minutos el {parsed_date}: {peak_streams} a las {peak_time}'
+        ),
+
+        'daily_category_per_showtype': functools.partial(build_figure, 'bar',
+            data_frame=df_daily_category_per_showtype,
+            x='category',
+            y='views',
+            color='show_type',
+            template='flow_theme',
+            hover_data=['category', 'show_type', 'views'],
+            labels={'category': 'Categoría',
+                    'show_type': 'Tipo de show',
+                    'views': 'Visualizaciones'},
+            title=f'Categorías con más visualizaciones el {parsed_date}'
+        ),
+
+        'daily_potentially_dropped_movies': functools.partial(build_figure, 'bar',
+            data_frame=df_potentially_dropped_movies,
+            x='title',
+            y='drops',
+            hover_data=['drops', 'content_id'],
+            labels={'title': 'Nombre de la película',
+                    'drops': 'Drops'},
+            template='flow_theme',
+            title=f'Películas más dropeadas* el {parsed_date}',
+        ),
+
+        'daily_potentially_dropped_series': functools.partial(build_figure, 'bar',
+            data_frame=df_potentially_dropped_series,
+            x='clean_title',
+            y='drops',
+            hover_data=['drops', 'content_id'],
+            labels={'clean_title': 'Nombre de la serie',
+                    'drops': 'Drops'},
+            template='flow_theme',
+            title=f'Series más dropeadas* el {parsed_date}',
+        )
+    })
+
+    # In the same order as the outputs of the clientside callback
+    order = [('daily_series', 'series'), ('daily_episodes', 'episodes'), ('daily_movies', 'movies'), ('daily_shows', 'shows'),
+             ('daily_device_used', 'device_used'), ('daily_concurrency', 'concurrency'),
+             ('daily_category_per_showtype', 'category_per_showtype'),
+             ('daily_potentially_dropped_movies', 'dropped_movies'), ('daily_potentially_dropped_series', 'dropped_series')]
+
+    return {'figures': [figures[figure] for figure, _ in order],
+            'slicing': [get_slicing(ranking, rankings[ranking]) for _, ranking in order]}
\ No newline at end of file
@@ -0,0 +1,252 @@
+import functools
+
+from datetime import datetime, timedelta
+
+import dash_core_components as dcc
+import dash_html_components as html
+from dash.dependencies import ClientsideFunction, Input, Output, State
+from dash.exceptions import PreventUpdate
+
+from cache import memoize_figures
+from executor import run_tasks
+
+from app import app
+
+
+########################################
+# 1. First let's import the data
+########################################
+
+# The totals of any range of days come from the prefix sums of the aggregates of the store, so
+# a range costs the same whatever the amount of days it spans (see cube.PrefixSums)
+
+# Range selected when the page is opened, ending on the last day with views
+DEFAULT_RANGE_DAYS = 7
+
+
+########################################
+# 2. App layout
+########################################
+
+def get_layout():
+    from datastore import get_store
+
+    # The layout is built on every visit, so the dates picked up by appended views are offered
+    store = get_store()
+    first_date = store.first_date
+    last_date = store.last_date
+
+    return html.Div([
+        html.H1('Estadísticas por rango de fechas', className='section-title'),
+        # Inputs
+        html.Div([
+            html.Div([
+                html.H2('Rango:'),
+                dcc.DatePickerRange(
+                    id='date-picker-range',
+                    min_date_allowed=first_date,
+                    max_date_allowed=last_date,
+                    start_date=max(first_date, last_date - timedelta(days=DEFAULT_RANGE_DAYS - 1)),
+                    end_date=last_date,
+                    display_format='DD/MM/YYYY'
+                    )],
+                className='selector-container'),
+            html.Div([
+                html.H2('Cantidad:'),
+                dcc.Dropdown(
+                    id='slct_amount_range',
+                    options=[
+                        {'label': 'Top 3', 'value': 3},
+                        {'label': 'Top 5', 'value': 5},
+                        {'label': 'Top 10', 'value': 10}],
+                    multi=False,
+                    clearable=False,
+                    value=5,
+                    style={'width': '40%'}
+                    )],
+                className='selector-container')
+        ], className='main-selector'),
+        # Plots
+        html.Br(),
+        dcc.Graph(id='range_movies', figure={}),
+        html.Br(),
+        html.Div([
+            dcc.Graph(id='range_series', figure={}),
+            dcc.Graph(id='range_shows', figure={})
+            ], className='graph-container'),
+        html.Br(),
+        dcc.Graph(id='range_device_used', figure={}),
+        html.Br(),
+        dcc.Graph(id='range_concurrency', figure={}),
+        html.Br(),
+        dcc.Graph(id='range_category_per_showtype', figure={}),
+        html.Br(),
+        dcc.Graph(id='range_country_of_views', figure={}),
+        # Figures of the range, without their template
+        dcc.Store(id='range_figures')
+    ])
+
+
+########################################
+# 3. Callbacks
+########################################
+
+# The figures of a range are sent once to a store with their Top 10 and without their template.
+# The browser slices them for the selected amount and adds the template every client receives once
+# with the layout, so changing the amount doesn't reach the server (see assets/figures.js)
+app.clientside_callback(
+    ClientsideFunction(namespace='flow', function_name='slice_figures'),
+    [Output(component_id='range_movies', component_property='figure'),
+     Output(component_id='range_series', component_property='figure'),
+     Output(component_id='range_shows', component_property='figure'),
+     Output(component_id='range_device_used', component_property='figure'),
+     Output(component_id='range_concurrency', component_property='figure'),
+     Output(component_id='range_category_per_showtype', component_property='figure'),
+     Output(component_id='range_country_of_views', component_property='figure')],
+    [Input(component_id='range_figures', component_property='data'),
+     Input(component_id='slct_amount_range', component_property='value')],
+    [State(component_id='flow_template', component_property='data')]
+)
+
+
+def get_range(start_date, end_date):
+    # helpers loads pandas, so like the data modules it's imported on first use
+    from helpers import format_range
+
+    # The picker clears the end of the range while a new one is being picked
+    if not start_date or not end_date:
+        raise PreventUpdate
+
+    return format_range(start_date, end_date)
+
+
+@app.callback(
+    Output(component_id='range_figures', component_property='data'),
+    [Input(component_id='date-picker-range', component_property='start_date'),
+     Input(component_id='date-picker-range', component_property='end_date')]
+)
+@memoize_figures('range', get_period=get_range)
+def update_graph(start_date, end_date):
+    import plotly.express as px
+    from assets.template import register_flow_template
+    from figures import build_figure
+    from rankings import MAX_AMOUNT, get_rankings, get_slicing
+
+    register_flow_template()
+
+    parsed_range = ' al '.join(datetime.strptime(date[:10], '%Y-%m-%d').strftime('%d/%m/%Y') for date in [start_date, end_date])
+
+    # Rankings are computed once per range from the totals of its days, and the browser slices them for the selected amount
+    rankings = get_rankings('range', get_range(start_date, end_date), MAX_AMOUNT)
+
+    df_range_movies = rankings['movies']
+    df_range_series = rankings['series']
+    df_range_shows = rankings['shows']
+    df_range_device_used = rankings['device_used']
+    df_range_concurrency = rankings['concurrency']
+    # Minute with the most streams active at the same time, over all the devices
+    peak = rankings['peak_concurrency'].iloc[0]
+    peak_streams = peak['streams']
+    peak_time = peak['time'].strftime('%d/%m/%Y %H:%M') if peak_streams else '-'
+    df_range_category_per_showtype = rankings['category_per_showtype']
+    # Countries already come with the ISO alpha_3 codes the choropleth locates them by
+    df_country_from_watched_content = rankings['country']
+
+    # The figures don't depend on each other, so they are built through the executor
+    figures = run_tasks({
+        'range_movies': functools.partial(build_figure, 'bar',
+            data_frame=df_range_movies,
+            x='title',
+            y='views',
+            hover_data=['views', 'asset_id'],
+            labels={'title': 'Nombre de la película',
+                    'views': 'Visualizaciones'},
+            template='flow_theme',
+            title=f'Películas más vistas del {parsed_range}'
+        ),
+
+        'range_series': functools.partial(build_figure, 'bar',
+            data_frame=df_range_series,
+            x='clean_title',
+            y='views',
+            hover_data=['views', 'serie_id'],
+            labels={'clean_title': 'Nombre de la serie',
+                    'views': 'Visualizaciones',
+                    'serie_id': 'asset_id'},
+            template='flow_theme',
+            title=f'Series más vistas del {parsed_range}'
+        ),
+
+        'range_shows': functools.partial(build_figure, 'bar',
+            data_frame=df_range_shows,
+            x='title',
+            y='views',
+            hover_data=['views', 'episode_title', 'show_id'],
+            labels={'title': 'Nombre del show',
+                    'episode_title': 'Título',
+                    'views': 'Visualizaciones',
+                    'show_id': 'asset_id'},
+            template='flow_theme',
+            title=f'Shows de TV más vistos del {parsed_range}'
+        ),
+
+        'range_device_used': functools.partial(build_figure, 'line',
+            data_frame=df_range_device_used,
+            x='hour',
+            y='views',
+            color='device',
+            template='flow_theme',
+            hover_data=['device', 'hour', 'views'],
+            labels={'device': 'Dispositivo',
+                    'hour': 'Horario',
+                    'views': 'Visualizaciones'},
+            title=f'Consumo de contenido por dispositivo del {parsed_range}'
+        ),
+
+        'range_concurrency': functools.partial(build_figure, 'line',
+            data_frame=df_range_concurrency,
+            x='time',
+            y='streams',
+            color='device',
+            template='flow_theme',
+            hover_data=['device', 'time', 'streams'],
+            labels={'device': 'Dispositivo',
+                    'time': 'Horario',
+                    'streams': 'Streams simultáneos'},
+            title=f'Pico de streams simultáneos cada hora del {parsed_range}: {peak_streams} a las {peak_time}'
+        ),
+
+        'range_category_per_showtype': functools.partial(build_figure, 'bar',
+            data_frame=df_range_category_per_showtype,
+            x='category',
+            y='views',
+            color='show_type',
+            template='flow_theme',
+            hover_data=['category', 'show_type', 'views'],
+            labels={'category': 'Categoría',
+                    'show_type': 'Tipo de show',
+                    'views': 'Visualizaciones'},
+            title=f'Categorías con más visualizaciones del {parsed_range}'
+        ),
+
+        'range_map_contentorigin': functools.partial(build_figure, 'choropleth',
+            data_frame=df_country_from_watched_content,
+            locations='iso_alpha',
+            color='views',
+            hover_name='country',
+            template='flow_theme',
+            labels={'iso_alpha': 'Cod. ISO',
+                    'views': 'Visualizaciones de contenido'},
+            color_continuous_scale=px.colors.sequential.Greens,
+            title=f'País de origen de cada visualizacion individual de contenido del {parsed_range}'
+        )
+    })
+
+    # In the same order as the outputs of the clientside callback
+    order = [('range_movies', 'movies'), ('range_series', 'series'), ('range_shows', 'shows'),
+             ('range_device_used', 'device_used'), ('range_concurrency', 'concurrency'),
+             ('range_category_per_showtype', 'category_per_showtype'),
+             ('range_map_contentorigin', 'country')]
+
+    return {'figures': [figures[figure] for figure, _ in order],
+            'slicing': [get_slicing(ranking, rankings[ranking]) for _, ranking in order]}
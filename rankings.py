@@ -0,0 +1,258 @@
+import functools
+import os
+
+import pandas as pd
+
+from datastore import get_store
+from executor import run_tasks
+from filters import get_movie_views, get_series_views, get_shows_watch, get_mostwatched_episodes, get_device_used, get_category_per_showtype, get_country_from_watched_content, get_most_dropped_content_per_showtype, get_concurrent_streams, get_peak_concurrency, get_season_views
+from helpers import parse_range
+from metrics import timed
+
+
+# Options of the Top-N dropdowns. Rankings are computed once for the largest one, and the
+# smaller ones are sliced from it
+AMOUNTS = [3, 5, 10]
+MAX_AMOUNT = max(AMOUNTS)
+
+# Columns of the rankings built from lists of dictionaries, which would be lost for periods without views
+LIST_RANKING_COLUMNS = {'movies': ['asset_id', 'title', 'views'],
+                        'device_used': ['device', 'hour', 'views'],
+                        'category_per_showtype': ['category', 'show_type', 'views'],
+                        'country': ['iso_alpha', 'country', 'views'],
+                        'concurrency': ['time', 'device', 'streams'],
+                        'peak_concurrency': ['time', 'streams']}
+
+# Amount of periods whose rankings are kept in memory by every worker
+RANKINGS_CACHE_SIZE = int(os.environ.get('FLOW_RANKINGS_CACHE_SIZE', 128))
+
+
+def add_title_fields(ranking, title_index, columns):
+  '''
+  Returns the entered ranking with the entered columns of the title index added for the asset of
+  every row, like the serie title without season and episode.
+
+  Arguments:
+  ranking(Pandas DataFrame): ranking with an 'asset_id' column.
+  title_index(Pandas DataFrame): content id, serie title, season and episode of every asset, built by the DataStore.
+  columns(list): columns of the title index to add.
+  '''
+  df_titles = title_index.reindex(ranking['asset_id'])
+
+  return ranking.assign(**{column: df_titles[column].to_numpy() for column in columns})
+
+
+# Rankings of every page, computed by compute_rankings. The drops of movies and series are counted
+# together, and split into 'dropped_movies' and 'dropped_series'
+PAGE_RANKINGS = {
+    'daily': ['movies', 'series', 'shows', 'concurrency', 'peak_concurrency', 'episodes', 'device_used',
+              'category_per_showtype', 'dropped'],
+    'monthly': ['movies', 'series', 'shows', 'country'],
+    'range': ['movies', 'series', 'shows', 'device_used', 'category_per_showtype', 'country', 'concurrency',
+              'peak_concurrency']}
+# Rankings only served by the API, computed on their own when requested
+API_ONLY_RANKINGS = ['seasons']
+
+
+@timed('rankings')
+def compute_rankings(cube_slice, store, names, df_streams=None, frequency=None):
+  '''
+  Returns a dictionary with the DataFrames of the entered rankings, ranked up to MAX_AMOUNT. The
+  rankings are independent from each other, so they are computed through the executor.
+
+  Arguments:
+  cube_slice(CubeSlice): aggregates of the period.
+  store(DataStore): store holding the metadata lookups.
+  names(list): rankings to compute, as listed in PAGE_RANKINGS.
+  df_streams(Pandas DataFrame): active streams per minute of the period, needed by the concurrency rankings.
+  frequency(str): Pandas frequency the concurrency is shown at, like '15min' or '1H'.
+  '''
+  df_assets = cube_slice.assets
+
+  tasks = {
+      'movies': functools.partial(get_movie_views, df_assets, MAX_AMOUNT),
+      'series': functools.partial(get_series_views, df_assets, store.content_lookup, MAX_AMOUNT),
+      'shows': functools.partial(get_shows_watch, df_assets, store.content_lookup, MAX_AMOUNT),
+      'episodes': functools.partial(get_mostwatched_episodes, df_assets, store.asset_lookup, MAX_AMOUNT),
+      'seasons': functools.partial(get_season_views, df_assets, store.title_index, MAX_AMOUNT),
+      'device_used': functools.partial(get_device_used, cube_slice.devices, store.devices),
+      'category_per_showtype': functools.partial(get_category_per_showtype, df_assets, MAX_AMOUNT),
+      'country': functools.partial(get_country_from_watched_content, df_assets),
+      'concurrency': functools.partial(get_concurrent_streams, df_streams, store.devices, frequency),
+      'peak_concurrency': functools.partial(get_peak_concurrency, df_streams),
+      # Counted from the duration histograms of the period
+      'dropped': functools.partial(get_most_dropped_content_per_showtype, cube_slice.durations, store.content_lookup, MAX_AMOUNT, ['Película', 'Serie'])}
+
+  rankings = run_tasks({name: tasks[name] for name in names})
+
+  if 'dropped' in rankings:
+    dropped = rankings.pop('dropped')
+    rankings['dropped_movies'], rankings['dropped_series'] = dropped['Película'], dropped['Serie']
+
+  for name in LIST_RANKING_COLUMNS:
+    if name in rankings:
+      rankings[name] = pd.DataFrame(rankings[name], columns=LIST_RANKING_COLUMNS[name])
+  # The series include season and episode in every title, so the clean one is looked up for display in a new column:
+  for name in ['series', 'dropped_series']:
+    if name in rankings:
+      rankings[name] = add_title_fields(rankings[name], store.title_index, ['clean_title'])
+  if 'episodes' in rankings:
+    rankings['episodes'] = add_title_fields(rankings['episodes'], store.title_index, ['clean_title', 'season', 'episode'])
+
+  return rankings
+
+
+def compute_daily_rankings(cube_slice, store, day):
+  '''
+  Returns a dictionary with the DataFrames of every chart of the daily page, ranked up to MAX_AMOUNT.
+
+  Arguments:
+  cube_slice(CubeSlice): aggregates of the day.
+  store(DataStore): store holding the metadata lookups.
+  day(str): day in 'YYYY-MM-DD' format.
+  '''
+  return compute_rankings(cube_slice, store, PAGE_RANKINGS['daily'], store.cube.get_streams(day, day), '15min')
+
+
+def compute_monthly_rankings(cube_slice, store):
+  '''
+  Returns a dictionary with the DataFrames of every chart of the monthly page, ranked up to MAX_AMOUNT.
+
+  Arguments:
+  cube_slice(CubeSlice): per day aggregates of the month.
+  store(DataStore): store holding the metadata lookups.
+  '''
+  return compute_rankings(cube_slice, store, PAGE_RANKINGS['monthly'])
+
+
+def compute_range_rankings(cube_slice, store, start, end):
+  '''
+  Returns a dictionary with the DataFrames of every chart of the range page, ranked up to MAX_AMOUNT.
+
+  Arguments:
+  cube_slice(CubeSlice): totals of the range of days, one row per asset and per device and hour.
+  store(DataStore): store holding the metadata lookups.
+  start(str): first day of the range, in 'YYYY-MM-DD' format.
+  end(str): last day of the range, in 'YYYY-MM-DD' format.
+  '''
+  return compute_rankings(cube_slice, store, PAGE_RANKINGS['range'], store.cube.get_streams(start, end), '1H')
+
+
+def slice_ranking(name, ranking, amount):
+  '''
+  Returns the first amount of entries of a ranking computed up to MAX_AMOUNT.
+
+  Arguments:
+  name(str): name of the ranking, one of the keys returned by compute_rankings.
+  ranking(Pandas DataFrame): the ranking computed up to MAX_AMOUNT.
+  amount(int): amount of entries to return.
+  '''
+  if name in ['device_used', 'country', 'concurrency', 'peak_concurrency']:
+    return ranking
+
+  if name == 'category_per_showtype':
+    if ranking.empty:
+      return ranking
+    # Every show type of the top categories is present, so their totals give the category ranking back
+    top_categories = ranking.groupby('category', sort=False)['views'].sum().nlargest(amount).index
+    return ranking[ranking['category'].isin(top_categories)]
+
+  return ranking.head(amount)
+
+
+def get_slicing(name, ranking):
+  '''
+  Returns how the browser slices the figure of a ranking computed up to MAX_AMOUNT, the same way
+  slice_ranking does: None when it's shown whole, 'head' when every trace keeps its first entries,
+  or a dictionary with the x values ranked, of which every trace keeps the first ones, and the
+  order of the traces left for every amount of AMOUNTS.
+
+  Arguments:
+  name(str): name of the ranking, one of the keys returned by compute_rankings.
+  ranking(Pandas DataFrame): the ranking computed up to MAX_AMOUNT.
+  '''
+  if name in ['device_used', 'country', 'concurrency', 'peak_concurrency']:
+    return None
+
+  if name == 'category_per_showtype':
+    if ranking.empty:
+      return {'x': [], 'traces': {str(amount): [] for amount in AMOUNTS}}
+    totals = ranking.groupby('category', sort=False)['views'].sum()
+    # Plotly express orders and colors the traces by the first row of every show type, which
+    # may be sliced away for smaller amounts
+    return {'x': totals.nlargest(len(totals)).index.to_list(),
+            'traces': {str(amount): slice_ranking(name, ranking, amount)['show_type'].unique().tolist() for amount in AMOUNTS}}
+
+  return 'head'
+
+
+def slice_period(store, page, period):
+  '''
+  Returns the slice of the cube with the aggregates of the period of a page.
+
+  Arguments:
+  store(DataStore): store holding the AggregateCube.
+  page(str): 'daily', 'monthly' or 'range'.
+  period(str): day in 'YYYY-MM-DD' format, month in 'YYYY-MM' format, or range built by format_range.
+  '''
+  if page == 'daily':
+    return store.cube.slice_day(period)
+
+  if page == 'range':
+    return store.cube.slice_range(*parse_range(period))
+
+  return store.cube.slice_month(period)
+
+
+@functools.lru_cache(maxsize=RANKINGS_CACHE_SIZE)
+def _get_rankings(page, period, version):
+  store = get_store()
+  cube_slice = slice_period(store, page, period)
+
+  if page == 'daily':
+    return compute_daily_rankings(cube_slice, store, period)
+
+  if page == 'range':
+    return compute_range_rankings(cube_slice, store, *parse_range(period))
+
+  return compute_monthly_rankings(cube_slice, store)
+
+
+@functools.lru_cache(maxsize=RANKINGS_CACHE_SIZE)
+def _get_api_only_ranking(page, period, version, name):
+  store = get_store()
+
+  return compute_rankings(slice_period(store, page, period), store, [name])[name]
+
+
+def get_rankings(page, period, amount):
+  '''
+  Returns a dictionary with the DataFrames of every chart of a page for the entered period and
+  amount. Rankings are computed once per period and version of its data, and sliced for every amount.
+
+  Arguments:
+  page(str): 'daily', 'monthly' or 'range'.
+  period(str): day in 'YYYY-MM-DD' format, month in 'YYYY-MM' format, or range built by format_range.
+  amount(int): amount of entries of every ranking, at most MAX_AMOUNT.
+  '''
+  rankings = _get_rankings(page, str(period), get_store().get_version(period))
+
+  return {name: slice_ranking(name, ranking, amount) for name, ranking in rankings.items()}
+
+
+def get_ranking(page, period, amount, name):
+  '''
+  Returns the DataFrame of one ranking of a page for the entered period and amount. The rankings in
+  API_ONLY_RANKINGS aren't shown by the pages, so they're computed and cached apart from the others.
+
+  Arguments:
+  page(str): 'daily', 'monthly' or 'range'.
+  period(str): day in 'YYYY-MM-DD' format, month in 'YYYY-MM' format, or range built by format_range.
+  amount(int): amount of entries of the ranking, at most MAX_AMOUNT.
+  name(str): name of the ranking, as listed by the API.
+  '''
+  if name in API_ONLY_RANKINGS:
+    ranking = _get_api_only_ranking(page, str(period), get_store().get_version(period), name)
+    return slice_ranking(name, ranking, amount)
+
+  return get_rankings(page, period, amount)[name]
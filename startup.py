@@ -0,0 +1,109 @@
+import contextlib
+import gc
+import logging
+import os
+import time
+
+
+# Setting FLOW_PRELOAD=1 loads the data and the plotting modules while the app starts, instead of
+# on the first request that needs them
+PRELOAD = os.environ.get('FLOW_PRELOAD', '0') == '1'
+
+logger = logging.getLogger(__name__)
+
+# Seconds taken by every phase of the startup, in the order they ran
+phases = {}
+
+# Threads of the background jobs of this process, or None for the disabled ones
+jobs = {'warmup': None, 'watcher': None}
+
+# Set by gunicorn.conf.py while the master preloads the app. Threads don't survive a fork, so the
+# background jobs are started by every worker once it's forked, with the callbacks kept here
+defer_jobs = False
+_deferred_callbacks = {}
+
+
+@contextlib.contextmanager
+def timed_phase(name):
+  '''
+  Context manager that records and logs the seconds taken by a phase of the startup.
+
+  Arguments:
+  name(str): name of the phase.
+  '''
+  start = time.perf_counter()
+  try:
+    yield
+  finally:
+    phases[name] = round(time.perf_counter() - start, 3)
+    logger.info('Startup phase %s took %.3fs', name, phases[name])
+
+
+def preload():
+  '''
+  Loads everything the pages would otherwise load on their first request: the plotting modules
+  and template, the datasets and their aggregates, and the country reference. It can run once per
+  worker, or once in a gunicorn master started with --preload, so forked workers share the data.
+  The running sums of the date ranges and streams are built here too, for the same reason.
+  '''
+  with timed_phase('import plotting'):
+    import plotly.express
+    from assets.template import register_flow_template
+    register_flow_template()
+
+  with timed_phase('import rankings'):
+    import rankings
+
+  with timed_phase('load data'):
+    from datastore import get_store
+    get_store().cube.build_sums()
+
+  with timed_phase('load countries'):
+    from countries import get_countries
+    get_countries()
+
+
+def freeze_heap():
+  '''
+  Collects the garbage left by the preload and moves every remaining object to the permanent
+  generation of the garbage collector. Forked workers share the pages of the master until they
+  write to them, and every collection writes to the headers of the objects it tracks, so without
+  this each worker would end up with its own copy of the preloaded modules and lookups.
+  '''
+  gc.collect()
+  gc.freeze()
+
+
+def start_background_jobs(callbacks):
+  '''
+  Starts the warm up of the figure cache and the watcher of CSV drops, when they are enabled, and
+  returns the jobs dictionary with their threads, or None for the disabled ones. Their modules are
+  only imported when they are enabled. While defer_jobs is set they are only started by a later
+  call to start_deferred_jobs.
+
+  Arguments:
+  callbacks(dict): memoized update_graph functions, by page.
+  '''
+  if defer_jobs:
+    _deferred_callbacks.update(callbacks)
+    return jobs
+
+  if os.environ.get('FLOW_WARMUP', '0') == '1':
+    from warmup import start_warmup
+    jobs['warmup'] = start_warmup(callbacks)
+
+  if os.environ.get('FLOW_DROP_DIR'):
+    from datastore import DROP_DIR, watch_drops
+    jobs['watcher'] = watch_drops(DROP_DIR)
+
+  return jobs
+
+
+def start_deferred_jobs():
+  '''
+  Starts the background jobs deferred while the master preloaded the app, from a forked worker.
+  '''
+  global defer_jobs
+
+  defer_jobs = False
+  return start_background_jobs(_deferred_callbacks)
@@ -0,0 +1,115 @@
+import io
+import os
+import sys
+
+import flask
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import datastore
+import rankings
+from api import iter_json, register_api
+from datastore import DataStore
+
+####################
+# Mocks
+####################
+
+mock_train = pd.DataFrame([
+    {'customerid': 1, 'device_type': 'STB', 'asset_id': 10, 'tunein': '2021-02-18 23:52:00.0', 'tuneout': '2021-02-19 00:52:00.0'},
+    {'customerid': 2, 'device_type': 'CLOUD', 'asset_id': 11, 'tunein': '2021-02-18 22:52:00.0', 'tuneout': '2021-02-18 22:59:00.0'},
+    {'customerid': 3, 'device_type': 'STB', 'asset_id': 10, 'tunein': '2021-02-18 10:00:00.0', 'tuneout': '2021-02-18 10:03:00.0'}
+    ]).astype({'tunein': 'datetime64[ns]', 'tuneout': 'datetime64[ns]'})
+
+mock_metadata = pd.DataFrame([
+    {'asset_id': 10, 'content_id': 1, 'title': 'ABC', 'show_type': 'Película', 'category': 'Drama/Romance', 'country_of_origin': 'AR'},
+    {'asset_id': 11, 'content_id': 2, 'title': 'T:1 Ep:01 DEF', 'show_type': 'Serie', 'category': 'Acción', 'country_of_origin': 'US'}
+    ])
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(datastore, '_store', DataStore.from_frames(mock_train, mock_metadata, version='mock'))
+    rankings._get_rankings.cache_clear()
+    rankings._get_api_only_ranking.cache_clear()
+
+    server = flask.Flask(__name__)
+    register_api(server)
+
+    yield server.test_client()
+
+    rankings._get_rankings.cache_clear()
+    rankings._get_api_only_ranking.cache_clear()
+
+
+####################
+# Tests
+####################
+
+def test_api_serves_rankings_as_json(client):
+
+    response = client.get('/api/daily/movies?period=2021-02-18&amount=3')
+    body = response.get_json()
+
+    assert response.status_code == 200
+    assert body['columns'] == ['asset_id', 'title', 'views']
+    assert body['data'] == [[1, 'ABC', 2]]
+    assert client.get('/api/monthly/seasons?period=2021-02').get_json()['data'] == [[2, 'DEF', 1, 1]]
+    assert 'seasons' not in rankings._get_rankings('monthly', '2021-02', 'mock')
+    assert client.get('/api/range/concurrency?period=2021-02-18/2021-02-19').get_json()['columns'] == ['time', 'device', 'streams']
+
+
+def test_api_serves_rankings_as_arrow(client):
+
+    response = client.get('/api/monthly/series?period=2021-02&format=arrow')
+    output = pa.ipc.open_stream(io.BytesIO(response.data)).read_pandas()
+
+    assert response.mimetype == 'application/vnd.apache.arrow.stream'
+    assert output['views'].to_list() == [1]
+    assert output['title'].to_list() == ['T:1 Ep:01 DEF']
+
+
+def test_api_answers_unchanged_data_with_not_modified(client):
+
+    etag = client.get('/api/daily/movies?period=2021-02-18').headers['ETag']
+    rankings._get_rankings.cache_clear()
+
+    assert client.get('/api/daily/movies?period=2021-02-18', headers={'If-None-Match': etag}).status_code == 304
+    assert rankings._get_rankings.cache_info().currsize == 0
+    assert client.get('/api/daily/movies?period=2021-02-18&amount=5', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_api_rejects_invalid_queries(client):
+
+    assert client.get('/api/weekly/movies?period=2021-02-18').status_code == 404
+    assert client.get('/api/monthly/episodes?period=2021-02').status_code == 404
+    assert client.get('/api/daily/movies?period=2021-02').status_code == 400
+    assert client.get('/api/daily/movies?period=2021-02-18&amount=50').status_code == 400
+    assert client.get('/api/daily/movies?period=2021-02-18&format=csv').status_code == 400
+    assert client.get('/api/daily/concurrency?period=2021-13-45').status_code == 400
+    assert client.get('/api/daily/movies?period=2021-02-30').status_code == 400
+    assert client.get('/api/monthly/movies?period=2021-13').status_code == 400
+    assert client.get('/api/range/movies?period=2021-02-19/2021-02-18').status_code == 400
+    assert client.get('/api/range/movies?period=1990-01-01/2060-12-31').status_code == 400
+    assert client.get('/api/range/movies?period=2020-01-01/2020-01-31').status_code == 400
+    assert client.get('/api/range/movies?period=2021-02-01/2021-02-28').status_code == 200
+    assert client.get('/api/range/movies?period=2021-02-18/2021-02-18').status_code == 200
+
+
+def test_api_keeps_the_columns_of_empty_rankings(client):
+
+    for name in ['movies', 'country']:
+        body = client.get(f'/api/monthly/{name}?period=2021-05').get_json()
+
+        assert body['columns'] and body['data'] == []
+
+
+def test_iter_json_streams_batches():
+
+    chunks = list(iter_json(pd.DataFrame({'a': range(5), 'b': list('vwxyz')}), batch_rows=2))
+
+    assert len(chunks) == 5
+    assert ''.join(chunks) == '{"columns":["a","b"],"data":[[0,"v"],[1,"w"],[2,"x"],[3,"y"],[4,"z"]]}'
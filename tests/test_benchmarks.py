@@ -0,0 +1,41 @@
+import os
+import sys
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_suite import compare_to_baseline, get_digest, measure
+
+####################
+# Mocks
+####################
+
+mock_baseline = {'1000': {'get_movie_views': {'seconds': 0.1, 'peak_bytes': 2**21, 'digest': 'abc'},
+                          'peak rss': {'peak_bytes': 2**21}}}
+
+
+####################
+# Tests
+####################
+
+def test_measure_records_time_memory_and_result():
+
+    measurement = measure(lambda: pd.DataFrame({'views': range(1000)}), repeat=2)
+
+    assert measurement['seconds'] >= 0
+    assert measurement['peak_bytes'] > 0
+    assert measurement['digest'] == get_digest(pd.DataFrame({'views': range(1000)}))
+    assert measurement['digest'] != get_digest(pd.DataFrame({'views': range(1001)}))
+
+
+def test_compare_to_baseline_reports_regressions():
+
+    unchanged = {'1000': {'get_movie_views': {'seconds': 0.105, 'peak_bytes': 2**21 + 1000, 'digest': 'abc'},
+                          'peak rss': {'peak_bytes': 2**21 + 2000},
+                          'get_device_used': {'seconds': 5, 'peak_bytes': 10**9, 'digest': 'new'}}}
+    regressed = {'1000': {'get_movie_views': {'seconds': 0.2, 'peak_bytes': 2**22, 'digest': 'def'},
+                          'peak rss': {'peak_bytes': 2**22}}}
+
+    assert compare_to_baseline(unchanged, mock_baseline) == []
+    assert len(compare_to_baseline(regressed, mock_baseline)) == 4
+    assert compare_to_baseline(regressed, mock_baseline, tolerance=10)[-1].endswith('result changed')
@@ -0,0 +1,79 @@
+import os
+import pathlib
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache import FigureCache
+
+
+####################
+# Tests
+####################
+
+def test_cache_hits_and_misses():
+
+    cache = FigureCache(max_entries=2)
+
+    assert cache.get(('daily', '2021-01-01', 5)) is None
+    cache.set(('daily', '2021-01-01', 5), '[]')
+
+    assert cache.get(('daily', '2021-01-01', 5)) == '[]'
+    assert cache.get_stats()['hits'] == 1
+    assert cache.get_stats()['misses'] == 1
+
+
+def test_cache_evicts_least_recently_used():
+
+    cache = FigureCache(max_entries=2)
+    cache.set('a', '1')
+    cache.set('b', '2')
+    cache.get('a')
+    cache.set('c', '3')
+
+    assert cache.get('a') == '1'
+    assert cache.get('b') is None
+    assert cache.get('c') == '3'
+
+
+def test_cache_expires_entries():
+
+    cache = FigureCache(ttl=-1)
+    cache.set('a', '1')
+
+    assert cache.get('a') is None
+    assert cache.get_stats()['entries'] == 0
+
+
+def test_file_system_cache_is_shared(tmp_path):
+
+    writer = FigureCache(directory=tmp_path)
+    reader = FigureCache(directory=tmp_path)
+    writer.set(('monthly', '2021-03', 10, 'v1'), '{"data": []}')
+
+    assert reader.get(('monthly', '2021-03', 10, 'v1')) == '{"data": []}'
+    assert reader.get(('monthly', '2021-03', 10, 'v2')) is None
+
+
+def test_file_system_cache_is_bounded(tmp_path):
+
+    cache = FigureCache(max_entries=2, directory=tmp_path)
+    for key in range(5):
+        cache.set(key, str(key))
+
+    assert cache.get_stats()['entries'] == 2
+    assert cache.get(4) == '4'
+
+
+def test_file_system_cache_skips_files_evicted_by_other_workers(tmp_path, monkeypatch):
+
+    cache = FigureCache(max_entries=1, directory=tmp_path)
+    cache.set(0, '0')
+    glob = pathlib.Path.glob
+    # A file listed by the cache but deleted by another worker before its stat
+    monkeypatch.setattr(pathlib.Path, 'glob', lambda self, pattern: [*glob(self, pattern), self / 'evicted.json'])
+
+    cache.set(1, '1')
+
+    assert cache.get(1) == '1'
+    assert cache.get(0) is None
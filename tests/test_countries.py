@@ -0,0 +1,38 @@
+import os
+import sys
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from countries import get_countries, map_countries
+
+####################
+# Mocks
+####################
+
+mock_codes = pd.Series(['AR', 'US', 'NA', 'XK', 'ZZ', 'AR']).astype('category')
+
+
+####################
+# Tests
+####################
+
+def test_countries_reference():
+
+    df_countries = get_countries()
+
+    assert df_countries.index.is_unique
+    assert df_countries.loc['AR', 'alpha_3'] == 'ARG'
+    assert df_countries.loc['NA', 'name'] == 'Namibia'
+    assert df_countries.loc['ES', 'name'] == 'España'
+    assert get_countries() is df_countries
+
+
+def test_map_countries(caplog):
+
+    output = map_countries(mock_codes)
+
+    assert output['alpha_3'].to_list()[:4] == ['ARG', 'USA', 'NAM', 'XKX']
+    assert output['name'].to_list() == ['Argentina', 'Estados Unidos', 'Namibia', 'Kosovo', 'ZZ', 'Argentina']
+    assert pd.isna(output['alpha_3'].iloc[4])
+    assert "['ZZ']" in caplog.text
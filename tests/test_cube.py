@@ -0,0 +1,157 @@
+import os
+import sys
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cube import AggregateCube, aggregate_views, merge_cube_slices
+from filters import get_movie_views, get_series_views, get_mostwatched_episodes, get_device_used, get_category_per_showtype, get_potential_most_dropped_content, get_country_from_watched_content, get_most_dropped_content_per_showtype
+
+####################
+# Mocks
+####################
+
+mock_df = pd.DataFrame([
+    {'asset_id': 'A', 'show_type': 'Película', 'title': 'ABC', 'content_id': '1', 'device_type': 'STATIONARY', 'tunein': '2021-02-18 23:52:00.0', 'tuneout': '2021-02-19 00:52:00.0', 'category': 'Drama/Romance', 'country_of_origin': 'AR'},
+    {'asset_id': 'A', 'show_type': 'Película', 'title': 'ABC', 'content_id': '1', 'device_type': 'STB', 'tunein': '2021-02-18 10:00:00.0', 'tuneout': '2021-02-18 10:02:00.0', 'category': 'Drama/Romance', 'country_of_origin': 'AR'},
+    {'asset_id': 'B', 'show_type': 'Serie', 'title': 'DEF', 'content_id': '2', 'device_type': 'STATIONARY', 'tunein': '2021-02-18 22:52:00.0', 'tuneout': '2021-02-18 22:59:00.0', 'category': 'Drama/Crimen', 'country_of_origin': 'AR'},
+    {'asset_id': 'C', 'show_type': 'Web', 'title': 'GHI', 'content_id': '3', 'device_type': 'STB', 'tunein': '2021-02-19 22:52:00.0', 'tuneout': '2021-02-19 22:56:00.0', 'category': 'Infantil', 'country_of_origin': 'US'},
+    {'asset_id': 'C', 'show_type': 'Web', 'title': 'GHI', 'content_id': '3', 'device_type': 'STB', 'tunein': '2021-03-01 09:52:00.0', 'tuneout': '2021-03-01 09:56:00.0', 'category': 'Infantil', 'country_of_origin': 'US'},
+    {'asset_id': 'E', 'show_type': 'TV', 'title': 'MNO', 'content_id': '5', 'device_type': 'STB', 'tunein': '2021-03-11 22:52:00.0', 'tuneout': '2021-03-11 22:53:00.0', 'category': 'Suspenso', 'country_of_origin': 'BR'}
+    ]).astype({'tunein': 'datetime64[ns]', 'tuneout': 'datetime64[ns]', 'device_type': 'category'})
+
+mock_amount = 5
+
+mock_cube = AggregateCube(aggregate_views(mock_df, mock_df))
+
+
+####################
+# Tests
+####################
+
+def test_aggregate_views():
+
+    output = aggregate_views(mock_df, mock_df)
+
+    assert output.assets['views'].sum() == mock_df.shape[0]
+    assert output.devices['views'].sum() == mock_df.shape[0]
+    assert output.durations['views'].sum() == mock_df.shape[0]
+    assert output.assets['day'].is_monotonic_increasing
+    assert output.assets[output.assets['asset_id'] == 'A']['views'].to_list() == [2]
+
+
+def test_merge_cube_slices_matches_whole_aggregates():
+
+    output = merge_cube_slices([aggregate_views(mock_df.iloc[:3], mock_df), aggregate_views(mock_df.iloc[3:], mock_df)], mock_df)
+    expected = aggregate_views(mock_df, mock_df)
+
+    assert output.assets.sort_values(['day', 'asset_id'])[['asset_id', 'views', 'drops', 'title']].values.tolist() == expected.assets.sort_values(['day', 'asset_id'])[['asset_id', 'views', 'drops', 'title']].values.tolist()
+    assert output.devices['views'].sum() == expected.devices['views'].sum()
+    assert output.assets['day'].is_monotonic_increasing
+
+
+def test_cube_append_matches_whole_cube():
+
+    output = AggregateCube(aggregate_views(mock_df.iloc[:4], mock_df)).append(aggregate_views(mock_df.iloc[4:], mock_df), mock_df)
+
+    assert output.slice_month('2021-03').assets['views'].sum() == mock_cube.slice_month('2021-03').assets['views'].sum()
+    assert output.slice_day('2021-02-18').assets['views'].sum() == 3
+    assert list(output.indexes[('assets', 'month')]) == ['2021-02', '2021-03']
+
+
+def test_cube_slices():
+
+    assert mock_cube.slice_day('2021-02-18').assets['views'].sum() == 3
+    assert mock_cube.slice_day('2021-02-20').assets.empty
+    assert mock_cube.slice_month('2021-02').assets['views'].sum() == 4
+    assert mock_cube.slice_month('2021-03').devices['views'].sum() == 2
+
+
+def test_cube_slice_range_matches_months():
+
+    for start, end, month in [('2021-02-01', '2021-02-28', '2021-02'), ('2021-03-01', '2021-03-31', '2021-03')]:
+        output = mock_cube.slice_range(start, end)
+        expected = mock_cube.slice_month(month)
+
+        assert output.assets.sort_values('asset_id')['views'].to_list() == expected.assets.groupby('asset_id', observed=True)['views'].sum().to_list()
+        assert output.devices['views'].sum() == expected.devices['views'].sum()
+
+    assert mock_cube.slice_range('2021-02-19', '2021-03-01').assets.set_index('asset_id')['views'].to_dict() == {'C': 2}
+    assert mock_cube.slice_range('2021-02-20', '2021-02-28').assets.empty
+    assert mock_cube.slice_range('2020-01-01', '2022-01-01').assets['views'].sum() == mock_df.shape[0]
+
+
+def test_filters_from_cube_match_raw_views():
+
+    cube_slice = mock_cube.slice_month('2021-02')
+    df_raw = mock_df[mock_df['tunein'] < '2021-03-01']
+
+    assert get_movie_views(cube_slice.assets, mock_amount) == get_movie_views(df_raw, mock_amount)
+    assert get_series_views(cube_slice.assets, mock_df, mock_amount)['views'].to_list() == get_series_views(df_raw, mock_df, mock_amount)['views'].to_list()
+    assert get_mostwatched_episodes(cube_slice.assets, mock_df, mock_amount)['serie_id'].to_list() == get_mostwatched_episodes(df_raw, mock_df, mock_amount)['serie_id'].to_list()
+    assert get_device_used(cube_slice.devices, ['STB', 'STATIONARY']) == get_device_used(df_raw, ['STB', 'STATIONARY'])
+    assert sorted(get_category_per_showtype(cube_slice.assets, mock_amount), key=str) == sorted(get_category_per_showtype(df_raw, mock_amount), key=str)
+    assert get_country_from_watched_content(cube_slice.assets) == get_country_from_watched_content(df_raw)
+    assert get_potential_most_dropped_content(cube_slice.assets, mock_df, mock_amount)['drops'].to_list() == get_potential_most_dropped_content(df_raw, mock_df, mock_amount)['drops'].to_list()
+
+
+def test_drops_from_duration_histograms_match_raw_views():
+
+    cube_slice = mock_cube.slice_month('2021-02')
+    df_raw = mock_df[mock_df['tunein'] < '2021-03-01']
+
+    for window in [(60, 300), (0, 120), (120, 3600)]:
+        output = get_most_dropped_content_per_showtype(cube_slice.durations, mock_df, mock_amount, ['Película', 'Serie', 'Web'], window)
+        expected = get_most_dropped_content_per_showtype(df_raw, mock_df, mock_amount, ['Película', 'Serie', 'Web'], window)
+
+        for show_type in output:
+            assert output[show_type][['content_id', 'drops']].values.tolist() == expected[show_type][['content_id', 'drops']].values.tolist()
+
+    assert get_potential_most_dropped_content(cube_slice.durations, mock_df, mock_amount)['drops'].to_list() == get_potential_most_dropped_content(cube_slice.assets, mock_df, mock_amount)['drops'].to_list()
+
+
+def test_cube_streams_match_active_views():
+
+    output = mock_cube.get_streams('2021-02-18', '2021-02-19')
+
+    assert output.shape == (2 * 24 * 60, 2)
+    assert output.loc['2021-02-18 10:02'].to_dict() == {'STATIONARY': 0, 'STB': 1}
+    assert output.loc['2021-02-18 10:03'].sum() == 0
+    # Views crossing midnight are active on both days
+    assert output.loc['2021-02-18 23:55'].to_dict() == {'STATIONARY': 1, 'STB': 0}
+    assert output.loc['2021-02-19 00:52', 'STATIONARY'] == 1 and output.loc['2021-02-19 00:53', 'STATIONARY'] == 0
+    assert mock_cube.get_streams('2020-01-01', '2020-01-01').empty
+    # Days outside the events are left out, however long the range is
+    assert mock_cube.get_streams('1990-01-01', '2060-12-31').equals(mock_cube.get_streams('2021-02-18', '2021-03-11'))
+
+
+def test_cube_append_matches_whole_streams():
+
+    output = AggregateCube(aggregate_views(mock_df.iloc[:1], mock_df)).append(aggregate_views(mock_df.iloc[1:], mock_df), mock_df)
+
+    assert output.get_streams('2021-02-18', '2021-03-11').equals(mock_cube.get_streams('2021-02-18', '2021-03-11'))
+
+
+def test_cube_build_sums_matches_lazy_sums():
+
+    cube = AggregateCube(aggregate_views(mock_df, mock_df))
+    cube.build_sums()
+    prefix_sums, concurrency = cube._prefix_sums, cube._concurrency
+
+    assert cube.slice_range('2021-02-18', '2021-03-11').assets.equals(mock_cube.slice_range('2021-02-18', '2021-03-11').assets)
+    assert cube.get_streams('2021-02-18', '2021-02-19').equals(mock_cube.get_streams('2021-02-18', '2021-02-19'))
+    assert (cube._prefix_sums, cube._concurrency) == (prefix_sums, concurrency)
+
+
+def test_cube_sums_only_keep_the_days_and_minutes_with_views():
+
+    df_views = pd.concat([mock_df.iloc[:1].assign(tunein=pd.Timestamp('1971-01-01 10:00'), tuneout=pd.Timestamp('1971-01-01 10:05')), mock_df], ignore_index=True)
+    cube = AggregateCube(aggregate_views(df_views, df_views))
+    cube.build_sums()
+
+    assert len(cube._concurrency.streams) == cube.streams['minute'].nunique() <= 2 * df_views.shape[0]
+    assert [len(prefix_sums.days) for prefix_sums in cube._prefix_sums] == [cube.assets['day'].nunique(), cube.devices['day'].nunique()]
+    assert cube.slice_range('1971-01-01', '2021-03-11').assets['views'].sum() == df_views.shape[0]
+    assert cube.slice_range('1971-01-02', '2021-02-18').assets['views'].sum() == 3
+    assert cube.get_streams('1971-01-01', '1971-01-01').loc['1971-01-01 10:05', 'STATIONARY'] == 1
+    assert cube.get_streams('2021-02-18', '2021-02-19').equals(mock_cube.get_streams('2021-02-18', '2021-02-19'))
@@ -0,0 +1,263 @@
+import os
+import sys
+import threading
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import datastore
+from datastore import DataStore, DropWatcher, Ingestion, build_cache, build_views, get_cache_path, get_dataset_version, is_cache_fresh, load_train
+
+####################
+# Mocks
+####################
+
+mock_train = pd.DataFrame([
+    {'customerid': 1, 'device_type': 'STB', 'asset_id': 10, 'tunein': '2021-02-18 23:52:00.0', 'tuneout': '2021-02-19 00:52:00.0'},
+    {'customerid': 2, 'device_type': 'CLOUD', 'asset_id': 11, 'tunein': '2021-03-18 22:52:00.0', 'tuneout': '2021-03-18 22:59:00.0'},
+    {'customerid': 3, 'device_type': 'STB', 'asset_id': 10, 'tunein': '2021-03-19 10:00:00.0', 'tuneout': '2021-03-19 10:03:00.0'}
+    ])
+
+mock_metadata = pd.DataFrame([
+    {'asset_id': 10, 'content_id': 1, 'title': 'ABC', 'show_type': 'Película', 'category': 'Drama/Romance', 'country_of_origin': 'AR'},
+    {'asset_id': 11, 'content_id': 2, 'title': 'T:1 Ep:01 DEF', 'show_type': 'Serie', 'category': 'Acción', 'country_of_origin': 'US'}
+    ])
+
+
+def get_mock_store(tmp_path):
+    mock_train.to_csv(tmp_path / 'train.csv', index=False)
+    mock_metadata.to_csv(tmp_path / 'metadata.csv', sep=';', index=False)
+
+    return DataStore(tmp_path)
+
+
+####################
+# Tests
+####################
+
+def test_datastore_dtypes(tmp_path):
+
+    store = get_mock_store(tmp_path)
+
+    assert store.train['device_type'].dtype == 'category'
+    assert store.train['tunein'].dtype == 'datetime64[ns]'
+    assert store.train['tuneout'].dtype == 'datetime64[ns]'
+    assert store.metadata['show_type'].dtype == 'category'
+    assert store.metadata['country_of_origin'].dtype == 'category'
+
+
+def test_datastore_loads_once(tmp_path):
+
+    store = get_mock_store(tmp_path)
+
+    assert store.train is store.train
+    assert store.metadata is store.metadata
+
+
+def test_datastore_dates(tmp_path):
+
+    store = get_mock_store(tmp_path)
+
+    assert str(store.first_date) == '2021-02-18'
+    assert str(store.last_date) == '2021-03-19'
+    assert store.months == ['2021-02', '2021-03']
+
+
+def test_datastore_report(tmp_path):
+
+    store = get_mock_store(tmp_path)
+    store.train
+    store.metadata
+
+    report = store.report()
+
+    assert report['train']['rows'] == 3
+    assert report['metadata']['rows'] == 2
+    assert report['total_bytes'] == report['train']['bytes'] + report['metadata']['bytes']
+
+
+def test_cache_is_built_and_matches_csv(tmp_path):
+
+    get_mock_store(tmp_path)
+
+    assert not is_cache_fresh(tmp_path)
+
+    output = load_train(tmp_path)
+
+    assert is_cache_fresh(tmp_path)
+    assert output.shape == mock_train.shape
+    assert output['device_type'].dtype == 'category'
+    assert output['tunein'].dtype == 'datetime64[ns]'
+
+
+def test_cache_is_rebuilt_when_csv_is_newer(tmp_path):
+
+    get_mock_store(tmp_path)
+    build_cache(tmp_path)
+
+    csv_mtime = (tmp_path / 'train.csv').stat().st_mtime
+    os.utime(get_cache_path(tmp_path), (csv_mtime - 10, csv_mtime - 10))
+
+    assert not is_cache_fresh(tmp_path)
+
+    load_train(tmp_path)
+
+    assert is_cache_fresh(tmp_path)
+
+
+def test_datastore_slices(tmp_path):
+
+    store = get_mock_store(tmp_path)
+
+    assert store.slice_day('2021-03-18')['asset_id'].to_list() == [11]
+    assert store.slice_day('2021-03-20').empty
+    assert store.slice_month('2021-03')['asset_id'].to_list() == [11, 10]
+    assert store.slice_month('2021-01').empty
+
+
+def test_datastore_views(tmp_path):
+
+    store = get_mock_store(tmp_path)
+
+    assert store.views.shape[0] == 3
+    assert store.views['tunein'].is_monotonic_increasing
+    assert store.views['title'].dtype == 'category'
+    assert store.views['show_type'].dtype == 'category'
+    assert store.views[store.views['asset_id'] == 11]['content_id'].to_list() == [2]
+    assert store.devices == ['STB', 'CLOUD']
+
+
+def test_datastore_lookups(tmp_path):
+
+    store = get_mock_store(tmp_path)
+    store.views
+
+    assert store.content_lookup.index.name == 'content_id'
+    assert store.content_lookup.index.is_unique
+    assert store.asset_lookup.loc[11, 'title'] == 'T:1 Ep:01 DEF'
+    assert store.title_index.loc[11, ['content_id', 'clean_title', 'season', 'episode']].to_list() == [2, 'DEF', 1, 1]
+    assert store.title_index.loc[10, ['clean_title', 'season', 'episode']].to_list() == ['ABC', -1, -1]
+
+
+def test_datastore_version_changes_with_data(tmp_path):
+
+    store = get_mock_store(tmp_path)
+    version = store.version
+
+    assert version == get_dataset_version(tmp_path)
+
+    mock_train.head(2).to_csv(tmp_path / 'train.csv', index=False)
+
+    assert get_dataset_version(tmp_path) != version
+
+
+def test_streaming_datastore_matches_eager_one(tmp_path):
+
+    store = get_mock_store(tmp_path)
+    streaming_store = DataStore(tmp_path, streaming=True, chunk_size=1)
+
+    assert streaming_store.cube.assets[['day', 'asset_id', 'views', 'drops']].values.tolist() == store.cube.assets[['day', 'asset_id', 'views', 'drops']].values.tolist()
+    assert (streaming_store.first_date, streaming_store.last_date, streaming_store.months) == (store.first_date, store.last_date, store.months)
+    assert streaming_store.devices == store.devices
+    assert streaming_store.version == store.version
+    assert 'views' not in streaming_store.stats
+    assert streaming_store.report()['cube']['rows_ingested'] == mock_train.shape[0]
+
+
+def test_ingestion_merges_chunks_in_batches(tmp_path, monkeypatch):
+
+    get_mock_store(tmp_path)
+    merges = []
+    merge_cube_slices = datastore.merge_cube_slices
+    monkeypatch.setattr(datastore, 'merge_cube_slices', lambda cube_slices, df_metadata: merges.append(len(cube_slices)) or merge_cube_slices(cube_slices, df_metadata))
+    chunks = [mock_train.assign(tunein=pd.to_datetime(mock_train['tunein']) + pd.Timedelta(days=day),
+                                tuneout=pd.to_datetime(mock_train['tuneout']) + pd.Timedelta(days=day)) for day in range(16)]
+
+    ingestion = Ingestion(DataStore(tmp_path).metadata)
+    for df_train in chunks:
+        ingestion.add_chunk(df_train)
+    output = ingestion.merge()
+    expected = Ingestion(ingestion.df_metadata)
+    expected.add_chunk(pd.concat(chunks, ignore_index=True))
+
+    assert len(merges) < len(chunks) // 2
+    assert output.assets[['day', 'asset_id', 'views', 'drops']].values.tolist() == expected.merge().assets[['day', 'asset_id', 'views', 'drops']].values.tolist()
+    assert output.streams[['minute', 'delta']].values.tolist() == expected.cube_slice.streams[['minute', 'delta']].values.tolist()
+
+
+def test_append_views_matches_full_load(tmp_path):
+
+    store = get_mock_store(tmp_path)
+    store.views, store.cube
+    (tmp_path / 'drops').mkdir()
+    mock_train.tail(1).to_csv(tmp_path / 'drops' / 'drop.csv', index=False)
+    mock_train.head(2).to_csv(tmp_path / 'train.csv', index=False)
+
+    for streaming in [False, True]:
+        partial_store = DataStore(tmp_path, streaming=streaming)
+        versions = {period: partial_store.get_version(period) for period in ['2021-02-18', '2021-03-19', '2021-03', '2021-02-01/2021-02-28', '2021-03-18/2021-03-19']}
+
+        assert partial_store.last_date.isoformat() == '2021-03-18'
+        assert DropWatcher(partial_store, tmp_path / 'drops').poll() == ['2021-03', '2021-03-19']
+        assert partial_store.last_date.isoformat() == '2021-03-19'
+        assert partial_store.cube.assets[['day', 'asset_id', 'views', 'drops']].values.tolist() == store.cube.assets[['day', 'asset_id', 'views', 'drops']].values.tolist()
+        assert partial_store.views['tunein'].to_list() == store.views['tunein'].to_list()
+        assert partial_store.slice_day('2021-03-19')['asset_id'].to_list() == [10]
+        assert partial_store.get_version('2021-02-18') == versions['2021-02-18']
+        assert partial_store.get_version('2021-03-19') != versions['2021-03-19']
+        assert partial_store.get_version('2021-03') != versions['2021-03']
+        assert partial_store.get_version('2021-02-01/2021-02-28') == versions['2021-02-01/2021-02-28']
+        assert partial_store.get_version('2021-03-18/2021-03-19') != versions['2021-03-18/2021-03-19']
+        assert partial_store.cube.slice_range('2021-03-19', '2021-03-19').assets['asset_id'].to_list() == [10]
+
+
+def test_datastore_from_frames_matches_files(tmp_path):
+
+    store = get_mock_store(tmp_path)
+    frames_store = DataStore.from_frames(store.train.copy(), store.metadata.copy(), version='mock')
+
+    assert frames_store.views.equals(store.views)
+    assert frames_store.cube.assets.equals(store.cube.assets)
+    assert frames_store.get_version('2021-03-18') == 'mock'
+
+
+def test_datastore_loads_once_from_concurrent_threads(tmp_path, monkeypatch):
+
+    store = get_mock_store(tmp_path)
+    loaded = []
+    load = store._load
+    monkeypatch.setattr(store, '_load', lambda name, loader: loaded.append(name) or load(name, loader))
+
+    threads = [threading.Thread(target=lambda: store.cube) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(loaded) == ['cube', 'metadata', 'train', 'views']
+
+
+def test_append_views_across_midnight_changes_the_next_day(tmp_path):
+
+    store = get_mock_store(tmp_path)
+    store.cube
+    versions = {period: store.get_version(period) for period in ['2021-02-28', '2021-03-01', '2021-03', '2021-03-02']}
+    df_drop = pd.DataFrame([{'customerid': 4, 'device_type': 'STB', 'asset_id': 10, 'tunein': '2021-02-28 23:50:00.0', 'tuneout': '2021-03-01 00:10:00.0'}])
+    df_drop.to_csv(tmp_path / 'drop.csv', index=False)
+
+    assert store.append_views(tmp_path / 'drop.csv') == ['2021-02', '2021-02-28', '2021-03', '2021-03-01']
+    assert store.get_version('2021-03-01') != versions['2021-03-01']
+    assert store.get_version('2021-03') != versions['2021-03']
+    assert store.get_version('2021-03-02') == versions['2021-03-02']
+    assert store.cube.get_streams('2021-03-01', '2021-03-01').to_numpy().max() == 1
+
+
+def test_build_views_leaves_out_broken_tune_ins(caplog):
+
+    df_train = pd.concat([mock_train, mock_train.iloc[:1].assign(tunein='1971-01-01 10:00:00.0'), mock_train.iloc[:1].assign(tunein='2099-01-01 10:00:00.0')],
+                         ignore_index=True).astype({'tunein': 'datetime64[ns]', 'tuneout': 'datetime64[ns]'})
+
+    output = build_views(df_train, DataStore.from_frames(mock_train, mock_metadata).metadata)
+
+    assert output['tunein'].to_list() == pd.to_datetime(mock_train['tunein']).sort_values().to_list()
+    assert 'Left out 2 views' in caplog.text
@@ -0,0 +1,46 @@
+import os
+import sys
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from encoding import decode, encode_like, encode_metadata
+from filters import count_views
+
+####################
+# Mocks
+####################
+
+mock_metadata = pd.DataFrame([
+    {'asset_id': 10, 'content_id': 1, 'title': 'ABC', 'episode_title': 'ABC', 'show_type': 'Película'},
+    {'asset_id': 11, 'content_id': 2, 'title': 'T:1 Ep:01 DEF', 'episode_title': 'Piloto', 'show_type': 'Serie'},
+    {'asset_id': 12, 'content_id': 2, 'title': 'T:1 Ep:02 DEF', 'episode_title': 'Segundo', 'show_type': 'Serie'}
+    ])
+
+mock_views = pd.DataFrame({'asset_id': [12, 10, 11, 12, 13, 10, 12]})
+
+
+####################
+# Tests
+####################
+
+def test_titles_share_a_single_string_table():
+
+    df_encoded = encode_metadata(mock_metadata)
+
+    assert df_encoded['title'].cat.categories is df_encoded['episode_title'].cat.categories
+    assert list(df_encoded['title'].cat.categories).count('ABC') == 1
+    assert df_encoded['asset_id'].cat.codes.dtype == 'int8'
+    assert encode_metadata(df_encoded) is df_encoded
+    assert decode(df_encoded).equals(mock_metadata)
+
+
+def test_encoded_views_are_counted_like_plain_ones():
+
+    df_encoded = encode_like(mock_views, encode_metadata(mock_metadata))
+
+    # Asset 13 is missing from the metadata, so it has no code
+    assert df_encoded['asset_id'].isna().sum() == 1
+    for amount in [None, 1, 2]:
+        expected = count_views(mock_views[mock_views['asset_id'] != 13], 'asset_id', amount=amount)
+        assert count_views(df_encoded, 'asset_id', amount=amount).equals(expected)
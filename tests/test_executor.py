@@ -0,0 +1,48 @@
+import functools
+import os
+import sys
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from executor import get_pool, run_tasks
+
+####################
+# Mocks
+####################
+
+def mock_task(value):
+    return value * 2
+
+
+def mock_thread_name():
+    return threading.current_thread().name
+
+
+mock_tasks = {name: functools.partial(mock_task, value) for name, value in [('c', 3), ('a', 1), ('b', 2)]}
+
+
+####################
+# Tests
+####################
+
+def test_run_tasks_keeps_order():
+
+    for mode in ['sequential', 'thread', 'process']:
+        results = run_tasks(mock_tasks, mode, 2)
+
+        assert list(results.keys()) == ['c', 'a', 'b']
+        assert list(results.values()) == [6, 2, 4]
+
+
+def test_sequential_fallback():
+
+    assert get_pool('sequential', 4) is None
+    assert get_pool('thread', 1) is None
+    assert run_tasks({'name': mock_thread_name}, 'sequential', 4)['name'] == threading.current_thread().name
+
+
+def test_thread_pool_is_shared():
+
+    assert get_pool('thread', 2) is get_pool('thread', 2)
+    assert run_tasks({'name': mock_thread_name}, 'thread', 2)['name'] != threading.current_thread().name
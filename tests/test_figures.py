@@ -0,0 +1,65 @@
+import json
+import os
+import sys
+import pandas as pd
+import plotly
+import plotly.express as px
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from figures import build_figure, get_custom_columns, trim_figure
+
+####################
+# Mocks
+####################
+
+mock_rankings = [
+    pd.DataFrame({'title': ['ABC', 'DEF', 'GHI'], 'views': [5, 3, 1], 'asset_id': ['A', 'B', 'C']}),
+    pd.DataFrame({'title': ['JKL', 'MNO'], 'views': [9, 2], 'asset_id': ['D', 'E']})
+    ]
+
+mock_devices = [
+    pd.DataFrame({'device': ['STB', 'STB', 'CLOUD', 'CLOUD'], 'hour': [0, 1, 0, 1], 'views': [4, 2, 1, 3]}),
+    pd.DataFrame({'device': ['STB', 'STB', 'CLOUD', 'CLOUD'], 'hour': [0, 1, 0, 1], 'views': [7, 8, 5, 6]})
+    ]
+
+mock_streams = [
+    pd.DataFrame({'time': pd.to_datetime(['2021-02-02 00:00', '2021-02-02 00:15'] * 2), 'device': ['STB', 'STB', 'Total', 'Total'], 'streams': [1, 2, 3, 4]}),
+    pd.DataFrame({'time': pd.to_datetime(['2021-02-03 00:00', '2021-02-03 00:15'] * 2), 'device': ['STB', 'STB', 'Total', 'Total'], 'streams': [5, 6, 7, 8]})
+    ]
+
+
+def to_json(figure):
+    return json.loads(json.dumps(figure, cls=plotly.utils.PlotlyJSONEncoder))
+
+
+####################
+# Tests
+####################
+
+def test_figures_match_plotly_express():
+
+    for kind, dataframes, arguments in [('bar', mock_rankings, {'x': 'title', 'y': 'views', 'hover_data': ['views', 'asset_id']}),
+                                        ('line', mock_devices, {'x': 'hour', 'y': 'views', 'color': 'device', 'hover_data': ['device', 'hour', 'views']}),
+                                        ('line', mock_streams, {'x': 'time', 'y': 'streams', 'color': 'device', 'hover_data': ['device', 'streams'], 'labels': {'device': 'Dispositivo'}})]:
+        for index, dataframe in enumerate(dataframes):
+            output = build_figure(kind, dataframe, f'Title {index}', **arguments)
+            expected = trim_figure(getattr(px, kind)(data_frame=dataframe, title=f'Title {index}', **arguments))
+
+            assert to_json(output) == to_json(expected)
+
+
+def test_figures_are_sent_without_template():
+
+    output = build_figure('bar', mock_rankings[0], 'Title', x='title', y='views')
+
+    assert 'template' not in output['layout']
+
+
+def test_skeletons_read_the_custom_data_columns_of_plotly_express():
+
+    skeleton = {'data': [{'hovertemplate': 'Dispositivo=%{customdata[1]}<br>hour=%{x}<br>asset_id=%{customdata[0]}<extra></extra>'}]}
+
+    assert get_custom_columns(skeleton, ['device', 'hour', 'asset_id'], {'device': 'Dispositivo'}) == ['asset_id', 'device']
+    assert get_custom_columns(skeleton, ['device', 'hour', 'asset_id'], {}) is None
+    assert get_custom_columns({'data': []}, ['device'], {}) == []
@@ -1,10 +1,12 @@
 import os
+import subprocess
 import sys
 import pandas as pd
+import pytest
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from filters import get_movie_views, get_series_views, get_shows_watch, get_mostwatched_episodes, get_device_used, get_category_per_showtype, get_potential_most_dropped_content, get_country_from_watched_content
+from filters import get_metadata_lookup, get_movie_views, get_series_views, get_shows_watch, get_mostwatched_episodes, get_device_used, get_category_per_showtype, get_potential_most_dropped_content, get_country_from_watched_content, get_watch_seconds, get_potential_drops, get_window_bins, get_most_dropped_content_per_showtype, get_concurrent_streams, get_peak_concurrency, get_season_views
 
 ####################
 # Mocks
@@ -88,4 +90,121 @@ def test_get_country_from_watched_content():
     output = get_country_from_watched_content(mock_df)
 
     assert type(output) == list
-    assert type(output[0]) == dict
\ No newline at end of file
+    assert type(output[0]) == dict
+    assert {'iso_alpha': 'BRA', 'country': 'Brasil', 'views': 1} in output
+
+
+def test_filters_accept_metadata_lookups():
+
+    content_lookup = get_metadata_lookup(mock_df, 'content_id')
+    asset_lookup = get_metadata_lookup(mock_df, 'asset_id')
+
+    assert get_metadata_lookup(content_lookup, 'content_id') is content_lookup
+    assert get_series_views(mock_df, content_lookup, mock_amount)['title'].to_list() == get_series_views(mock_df, mock_df, mock_amount)['title'].to_list()
+    assert get_shows_watch(mock_df, content_lookup, mock_amount)['title'].to_list() == ['MNO']
+    assert get_mostwatched_episodes(mock_df, asset_lookup, mock_amount)['serie_id'].to_list() == get_mostwatched_episodes(mock_df, mock_df, mock_amount)['serie_id'].to_list()
+    assert get_device_used(mock_df, ['STB', 'STATIONARY']) == get_device_used(mock_df, mock_df)
+
+
+
+def test_get_device_used_hours():
+
+    output = get_device_used(mock_df, mock_df)
+
+    assert {'device': 'STATIONARY', 'hour': 23, 'views': 1} in output
+    assert {'device': 'STB', 'hour': 22, 'views': 3} in output
+    assert sum(entry['views'] for entry in output) == mock_df.shape[0]
+
+
+def test_get_potential_most_dropped_content_durations():
+
+    output = get_potential_most_dropped_content(mock_df, mock_df, mock_amount)
+
+    assert output['content_id'].to_list() == ['3']
+    assert output['drops'].to_list() == [1]
+
+
+def test_get_category_per_showtype_main_category():
+
+    output = get_category_per_showtype(mock_df, mock_amount)
+
+    assert {'category': 'Drama', 'show_type': 'Película', 'views': 1} in output
+    assert {'category': 'Drama', 'show_type': 'Serie', 'views': 1} in output
+
+
+def test_get_watch_seconds_spans():
+
+    spans = pd.DataFrame({'tunein': ['2021-02-18 10:00:30', '2021-02-18 10:00:00', '2021-02-18 10:00:00'],
+                          'tuneout': ['2021-02-18 10:02:10', '2021-02-18 09:58:00', '2021-02-19 10:02:00']})
+
+    assert get_watch_seconds(spans).to_list() == [120, -120, 86520]
+    # Negative and multi-day spans aren't wrapped into a day
+    assert get_potential_drops(spans).to_list() == [True, False, False]
+
+
+def test_get_window_bins():
+
+    assert get_window_bins((60, 300)).sum() == 3
+    assert get_window_bins((0, 3600)).sum() == 31
+    with pytest.raises(ValueError):
+        get_window_bins((60, 3000))
+
+
+
+def test_invalid_drop_window_stops_the_import():
+
+    env = {**os.environ, 'FLOW_DROP_MAX_SECONDS': '3000'}
+    output = subprocess.run([sys.executable, '-c', 'import filters'], cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            env=env, capture_output=True, text=True)
+
+    assert output.returncode != 0
+    assert 'splits a bin' in output.stderr
+
+
+def test_get_most_dropped_content_per_showtype():
+
+    output = get_most_dropped_content_per_showtype(mock_df, mock_df, mock_amount, ['Web', 'Serie'])
+
+    assert output['Web']['content_id'].to_list() == get_potential_most_dropped_content(mock_df[mock_df['show_type'] == 'Web'], mock_df, mock_amount)['content_id'].to_list()
+    assert output['Serie'].empty
+    assert get_most_dropped_content_per_showtype(mock_df, mock_df, mock_amount, ['Serie'], window=(300, 600))['Serie']['drops'].to_list() == [1]
+
+    # Assets of a content may have different show types, and their drops are counted apart
+    mixed_df = pd.concat([mock_df, mock_df.iloc[[2]].assign(asset_id='F', show_type='Serie')], ignore_index=True)
+    output = get_most_dropped_content_per_showtype(mixed_df, mock_df, mock_amount, ['Web', 'Serie'])
+
+    assert output['Web']['drops'].to_list() == [1] and output['Serie']['content_id'].to_list() == ['3']
+
+
+def test_get_concurrent_streams_peaks():
+
+    df_streams = pd.DataFrame({'STB': [1, 3, 0, 2], 'PHONE': [2, 0, 0, 2]}, index=pd.date_range('2021-02-18', periods=4, freq='min'))
+    output = get_concurrent_streams(df_streams, ['STB', 'PHONE', 'TABLET'], '2min')
+
+    assert {'time': pd.Timestamp('2021-02-18 00:00'), 'device': 'STB', 'streams': 3} in output
+    assert {'time': pd.Timestamp('2021-02-18 00:00'), 'device': 'Total', 'streams': 3} in output
+    assert {'time': pd.Timestamp('2021-02-18 00:02'), 'device': 'Total', 'streams': 4} in output
+    assert {'time': pd.Timestamp('2021-02-18 00:02'), 'device': 'TABLET', 'streams': 0} in output
+    assert get_peak_concurrency(df_streams) == [{'time': pd.Timestamp('2021-02-18 00:03'), 'streams': 4}]
+
+
+def test_get_season_views():
+
+    df_views = pd.DataFrame({'asset_id': ['B', 'C', 'C', 'D', 'E', 'F', 'F', 'F', 'F'], 'content_id': ['2', '2', '2', '2', '5', '6', '6', '6', '6'],
+                             'show_type': ['Serie', 'Serie', 'Serie', 'Serie', 'TV', 'Serie', 'Serie', 'Serie', 'Serie']})
+    title_index = pd.DataFrame({'content_id': ['2', '2', '2', '5', '6'], 'clean_title': ['DEF', 'DEF', 'DEF', 'MNO', 'Peaky Blinders'],
+                                'season': [1, 2, 2, -1, -1], 'episode': [1, 1, 2, -1, 4]}, index=pd.Index(['B', 'C', 'D', 'E', 'F'], name='asset_id'))
+
+    output = get_season_views(df_views, title_index, mock_amount)
+
+    assert output.values.tolist() == [['2', 'DEF', 2, 3], ['2', 'DEF', 1, 1]]
+    assert get_season_views(df_views, title_index, 1).shape[0] == 1
+
+
+def test_data_modules_do_not_load_plotly_express():
+
+    code = 'import sys, api, cube, datastore, filters; print("plotly.express" in sys.modules)'
+    output = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            capture_output=True, text=True)
+
+    assert output.stdout.strip() == 'False'
@@ -1,11 +1,56 @@
 import os
 import sys
+import pandas as pd
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from helpers import get_clean_serie_name
+from helpers import build_date_index, format_range, parse_range, get_clean_serie_name, get_clean_serie_names, map_strings, parse_serie_titles
 
 def test_get_clean_serie_name():
     assert get_clean_serie_name('T:3 Ep:02 Attack on Titan') == 'Attack on Titan'
     assert get_clean_serie_name('T:0 Ep:01 Loki') == 'Loki'
-    assert get_clean_serie_name('Ep:04 Peaky Blinders') == 'Peaky Blinders'
\ No newline at end of file
+    assert get_clean_serie_name('Ep:04 Peaky Blinders') == 'Peaky Blinders'
+
+def test_get_clean_serie_names():
+    titles = pd.Series(['T:3 Ep:02 Attack on Titan', 'T:0 Ep:01 Loki', 'Ep:04 Peaky  Blinders', 'Dark'])
+    expected = [get_clean_serie_name(title) for title in titles]
+
+    assert get_clean_serie_names(titles).to_list() == expected
+    assert get_clean_serie_names(titles.astype('category')).to_list() == expected
+
+
+def test_parse_serie_titles():
+    titles = pd.Series(['T:3 Ep:02 Attack on Titan', 'T:0 Ep:01 Loki', 'Ep:04 Peaky  Blinders', 'Dark'], dtype='category')
+
+    output = parse_serie_titles(titles)
+
+    assert output['clean_title'].to_list() == get_clean_serie_names(titles).to_list()
+    assert output['season'].to_list() == [3, 0, -1, -1]
+    assert output['episode'].to_list() == [2, 1, 4, -1]
+    assert output['season'].dtype == 'int16'
+
+
+def test_map_strings_on_categoricals():
+    categories = pd.Series(['Drama/Romance', None, 'Infantil', 'Drama/Romance'], dtype='category')
+
+    output = map_strings(categories, lambda values: values.str.split('/').str[0])
+
+    assert output[0] == 'Drama' and output[2] == 'Infantil' and output[3] == 'Drama'
+    assert pd.isna(output[1])
+
+
+def test_build_date_index():
+
+    tunein = pd.Series(pd.to_datetime(['2021-01-31 23:00', '2021-02-01 00:00', '2021-02-01 10:00', '2021-02-03 08:00']))
+
+    assert build_date_index(tunein, 'day') == {'2021-01-31': (0, 1), '2021-02-01': (1, 3), '2021-02-03': (3, 4)}
+    assert build_date_index(tunein, 'month') == {'2021-01': (0, 1), '2021-02': (1, 4)}
+
+
+def test_format_and_parse_range():
+
+    period = format_range('2021-03-01', pd.Timestamp('2021-03-07'))
+
+    assert period == '2021-03-01/2021-03-07'
+    assert parse_range(period) == ('2021-03-01', '2021-03-07')
+    assert parse_range('2021-03') is None
@@ -0,0 +1,48 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+from metrics import Histogram, timed
+
+####################
+# Mocks
+####################
+
+def mock_filter(amount):
+    return list(range(amount))
+
+
+####################
+# Tests
+####################
+
+def test_histogram_renders_cumulative_buckets():
+
+    histogram = Histogram('flow_test_seconds', 'Test.', ('step', 'name'), buckets=(0.1, 1))
+    histogram.observe(('filter', 'get_movie_views'), 0.05)
+    histogram.observe(('filter', 'get_movie_views'), 0.1)
+    histogram.observe(('filter', 'get_movie_views'), 2)
+
+    lines = histogram.render().splitlines()
+
+    assert lines[:2] == ['# HELP flow_test_seconds Test.', '# TYPE flow_test_seconds histogram']
+    assert 'flow_test_seconds_bucket{step="filter",name="get_movie_views",le="0.1"} 2' in lines
+    assert 'flow_test_seconds_bucket{step="filter",name="get_movie_views",le="1"} 2' in lines
+    assert 'flow_test_seconds_bucket{step="filter",name="get_movie_views",le="+Inf"} 3' in lines
+    assert 'flow_test_seconds_sum{step="filter",name="get_movie_views"} 2.15' in lines
+    assert 'flow_test_seconds_count{step="filter",name="get_movie_views"} 3' in lines
+
+
+def test_timed_only_wraps_when_enabled(monkeypatch):
+
+    monkeypatch.setattr(metrics, 'METRICS_ENABLED', False)
+    assert timed('filter')(mock_filter) is mock_filter
+
+    monkeypatch.setattr(metrics, 'METRICS_ENABLED', True)
+    metrics.step_seconds.clear()
+    wrapped = timed('filter')(mock_filter)
+
+    assert wrapped(3) == [0, 1, 2]
+    assert 'flow_step_seconds_count{step="filter",name="mock_filter"} 1' in metrics.step_seconds.render()
@@ -0,0 +1,72 @@
+import os
+import sys
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from filters import get_category_per_showtype, get_series_views
+from rankings import AMOUNTS, MAX_AMOUNT, get_slicing, slice_ranking
+
+####################
+# Mocks
+####################
+
+mock_df = pd.DataFrame(
+    [{'asset_id': 'A', 'show_type': 'Película', 'title': 'ABC', 'content_id': '1', 'category': 'Drama/Romance'}] * 4 +
+    [{'asset_id': 'B', 'show_type': 'Serie', 'title': 'DEF', 'content_id': '2', 'category': 'Drama/Crimen'}] * 3 +
+    [{'asset_id': 'C', 'show_type': 'Serie', 'title': 'GHI', 'content_id': '3', 'category': 'Infantil'}] * 5 +
+    [{'asset_id': 'D', 'show_type': 'TV', 'title': 'JKL', 'content_id': '4', 'category': 'Acción'}] * 2 +
+    [{'asset_id': 'E', 'show_type': 'Serie', 'title': 'MNO', 'content_id': '5', 'category': 'Suspenso'}] * 1
+    )
+
+
+####################
+# Tests
+####################
+
+def test_slice_ranking_matches_direct_ranking():
+
+    ranking = get_series_views(mock_df, mock_df, MAX_AMOUNT)
+
+    for amount in [1, 2, 3]:
+        assert slice_ranking('series', ranking, amount)['serie_id'].to_list() == get_series_views(mock_df, mock_df, amount)['serie_id'].to_list()
+
+
+def test_slice_category_ranking_matches_direct_ranking():
+
+    ranking = pd.DataFrame(get_category_per_showtype(mock_df, MAX_AMOUNT))
+
+    for amount in [1, 2, 3]:
+        expected = pd.DataFrame(get_category_per_showtype(mock_df, amount))
+        assert slice_ranking('category_per_showtype', ranking, amount).to_dict('records') == expected.to_dict('records')
+
+
+def test_slicing_sent_to_the_browser_matches_slice_ranking():
+
+    ranking = pd.DataFrame(get_category_per_showtype(mock_df, MAX_AMOUNT))
+    slicing = get_slicing('category_per_showtype', ranking)
+
+    for amount in AMOUNTS:
+        expected = slice_ranking('category_per_showtype', ranking, amount)
+        assert set(slicing['x'][:amount]) == set(expected['category'])
+        assert slicing['traces'][str(amount)] == expected['show_type'].unique().tolist()
+
+    assert get_slicing('series', get_series_views(mock_df, mock_df, MAX_AMOUNT)) == 'head'
+    assert get_slicing('device_used', ranking) is None
+
+
+def test_slicing_orders_the_traces_left_like_plotly_express():
+
+    # The first TV row is in the fourth category, so TV goes from second to last trace in the Top 3
+    ranking = pd.DataFrame([{'category': 'Infantil', 'show_type': 'Película', 'views': 13},
+                            {'category': 'Comedia', 'show_type': 'TV', 'views': 12},
+                            {'category': 'Drama', 'show_type': 'Serie', 'views': 11},
+                            {'category': 'Acción', 'show_type': 'Serie', 'views': 10},
+                            {'category': 'Drama', 'show_type': 'TV', 'views': 6},
+                            {'category': 'Acción', 'show_type': 'Película', 'views': 5}])
+    slicing = get_slicing('category_per_showtype', ranking)
+
+    assert slicing['x'] == ['Drama', 'Acción', 'Infantil', 'Comedia']
+    assert slicing['traces']['3'] == ['Película', 'Serie', 'TV']
+    assert slicing['traces']['5'] == ['Película', 'TV', 'Serie']
+    assert get_slicing('category_per_showtype', ranking.iloc[:0])['x'] == []
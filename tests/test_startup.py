@@ -0,0 +1,65 @@
+import gc
+import os
+import subprocess
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import startup
+from startup import freeze_heap, phases, start_background_jobs, start_deferred_jobs, timed_phase
+
+####################
+# Tests
+####################
+
+def test_timed_phase_records_seconds():
+
+    with timed_phase('mock phase'):
+        time.sleep(0.01)
+
+    assert phases['mock phase'] >= 0.01
+
+
+def test_background_jobs_are_disabled_by_default(monkeypatch):
+
+    monkeypatch.delenv('FLOW_WARMUP', raising=False)
+    monkeypatch.delenv('FLOW_DROP_DIR', raising=False)
+
+    assert start_background_jobs({}) == {'warmup': None, 'watcher': None}
+
+
+def test_background_jobs_are_deferred_until_fork(monkeypatch, tmp_path):
+
+    monkeypatch.delenv('FLOW_WARMUP', raising=False)
+    monkeypatch.setenv('FLOW_DROP_DIR', str(tmp_path))
+    monkeypatch.setattr(startup, 'defer_jobs', True)
+    monkeypatch.setattr(startup, 'jobs', {'warmup': None, 'watcher': None})
+    started = []
+    monkeypatch.setattr('datastore.watch_drops', started.append)
+
+    assert start_background_jobs({}) == {'warmup': None, 'watcher': None}
+    assert started == []
+
+    start_deferred_jobs()
+
+    assert not startup.defer_jobs
+    assert len(started) == 1
+
+
+def test_freeze_heap_moves_objects_to_permanent_generation():
+
+    try:
+        freeze_heap()
+        assert gc.get_freeze_count() > 0
+    finally:
+        gc.unfreeze()
+
+
+def test_registering_the_pages_does_not_load_the_data_modules():
+
+    code = 'import sys, index; print(sorted(name for name in ["pandas", "plotly.express"] if name in sys.modules))'
+    output = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            env={**os.environ, 'FLOW_PRELOAD': '0', 'FLOW_WARMUP': '0'}, capture_output=True, text=True)
+
+    assert output.stdout.strip().splitlines()[-1] == '[]'
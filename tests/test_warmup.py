@@ -0,0 +1,70 @@
+import datetime
+import os
+import sys
+import types
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from warmup import Warmup, get_warmup_jobs
+
+####################
+# Mocks
+####################
+
+mock_store = types.SimpleNamespace(first_date=datetime.date(2021, 2, 27),
+                                   last_date=datetime.date(2021, 3, 2),
+                                   months=['2021-02', '2021-03'])
+
+
+####################
+# Tests
+####################
+
+def test_warmup_jobs_cover_every_period():
+
+    jobs = get_warmup_jobs(mock_store)
+
+    assert len(jobs) == 4 + 2
+    assert jobs[0] == ('daily', '2021-03-02')
+    assert ('daily', '2021-02-28') in jobs
+    assert jobs[-1] == ('monthly', '2021-02')
+
+
+def test_warmup_jobs_fit_in_the_figure_cache():
+
+    jobs = get_warmup_jobs(mock_store, max_jobs=3)
+
+    assert jobs == [('daily', '2021-03-02'), ('monthly', '2021-03'), ('monthly', '2021-02')]
+
+
+def test_warmup_runs_every_job_and_skips_failures():
+
+    calls = []
+
+    def mock_callback(period):
+        calls.append(period)
+        if period == '2021-03-01':
+            raise ValueError(period)
+
+    warmup = Warmup({'daily': mock_callback, 'monthly': mock_callback}, get_warmup_jobs(mock_store))
+    assert warmup.get_progress()['done'] == 0
+
+    warmup.start()
+    warmup.join()
+
+    assert len(calls) == 6
+    assert warmup.get_progress() == {'done': 6, 'total': 6, 'errors': 1, 'finished': True,
+                                     'seconds': warmup.get_progress()['seconds']}
+
+
+def test_warmup_lists_jobs_from_the_thread():
+
+    calls = []
+    warmup = Warmup({'daily': lambda period: calls.append(period)}, lambda: [('daily', '2021-03-02')])
+    assert warmup.get_progress()['total'] is None
+
+    warmup.start()
+    warmup.join()
+
+    assert calls == ['2021-03-02']
+    assert warmup.get_progress()['total'] == 1
@@ -0,0 +1,103 @@
+import logging
+import os
+import threading
+import time
+
+import pandas as pd
+
+from cache import CACHE_SIZE
+from datastore import get_store
+
+
+logger = logging.getLogger(__name__)
+
+# Setting FLOW_WARMUP=1 precomputes the figures of every period in the background at server start
+WARMUP_ENABLED = os.environ.get('FLOW_WARMUP', '0') == '1'
+# Every how many jobs the progress is logged
+WARMUP_LOG_EVERY = int(os.environ.get('FLOW_WARMUP_LOG_EVERY', 50))
+
+
+def get_warmup_jobs(store, max_jobs=CACHE_SIZE):
+  '''
+  Returns a list of (page, period) tuples with every period of both pages. The amounts are sliced
+  in the browser, so every period is one job. The most recent periods go first, as those are the
+  ones picked the most. Jobs beyond the size of the figure cache would evict the first ones, so
+  only the most recent days that fit next to every month are kept.
+
+  Arguments:
+  store(DataStore): store holding the available dates and months.
+  max_jobs(int): maximum amount of jobs, the amount of entries of the figure cache.
+  '''
+  days = [day.strftime('%Y-%m-%d') for day in pd.date_range(store.first_date, store.last_date, freq='D')[::-1]]
+  months = store.months[::-1][:max_jobs]
+  days = days[:max_jobs - len(months)]
+
+  return [('daily', day) for day in days] + [('monthly', month) for month in months]
+
+
+class Warmup(threading.Thread):
+  '''
+  Background thread that runs the callbacks for every job, so their figures are stored in the
+  figure cache before anybody asks for them. Failed jobs are logged and skipped.
+
+  Arguments:
+  callbacks(dict): memoized update_graph functions, by page.
+  jobs(list): (page, period) tuples to run, or a function returning them, which is called
+  from the thread so listing the periods doesn't hold up the caller while the data loads.
+  log_every(int): every how many jobs the progress is logged.
+  '''
+
+  def __init__(self, callbacks, jobs, log_every=WARMUP_LOG_EVERY):
+    super().__init__(name='flow-warmup', daemon=True)
+    self.callbacks = callbacks
+    self.jobs = jobs
+    self.log_every = log_every
+    self.done = 0
+    self.errors = 0
+    self.started_at = None
+    self.finished_at = None
+
+  def run(self):
+    self.started_at = time.time()
+    if callable(self.jobs):
+      self.jobs = self.jobs()
+    logger.info('Warming up %s figures', len(self.jobs))
+
+    for page, period in self.jobs:
+      try:
+        self.callbacks[page](period)
+      except Exception:
+        self.errors += 1
+        logger.exception('Warm up of %s %s failed', page, period)
+      self.done += 1
+
+      if self.done % self.log_every == 0:
+        logger.info('Warmed up %s/%s figures in %.1fs', self.done, len(self.jobs), time.time() - self.started_at)
+
+    self.finished_at = time.time()
+    logger.info('Warm up finished: %s figures, %s errors in %.1fs',
+                self.done, self.errors, self.finished_at - self.started_at)
+
+  def get_progress(self):
+    '''
+    Returns a dictionary with the progress of the warm up.
+    '''
+    elapsed = ((self.finished_at or time.time()) - self.started_at) if self.started_at else 0
+    total = None if callable(self.jobs) else len(self.jobs)
+    return {'done': self.done, 'total': total, 'errors': self.errors,
+            'finished': self.finished_at is not None, 'seconds': round(elapsed, 1)}
+
+
+def start_warmup(callbacks, store=None):
+  '''
+  Starts warming up the figure cache in a background thread and returns it, without waiting for
+  it to finish.
+
+  Arguments:
+  callbacks(dict): memoized update_graph functions, by page.
+  store(DataStore): store holding the available periods, the shared one by default.
+  '''
+  warmup = Warmup(callbacks, lambda: get_warmup_jobs(store or get_store()))
+  warmup.start()
+
+  return warmup